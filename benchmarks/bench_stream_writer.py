@@ -0,0 +1,101 @@
+# bench_stream_writer.py
+"""
+对比旧的 iter_content(8192) 写入循环与 stream_writer.write_response 的下载写入性能。
+
+在本机启动一个 HTTP 服务器提供若干 MB 的数据，分别用两种方式下载到临时文件并边下载边计算 sha256，
+输出耗时、吞吐量和回调次数。用法（在项目根目录下）：
+
+    python benchmarks/bench_stream_writer.py [--size-mb 8] [--rounds 10]
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.scraper_utils.http_transport import http_get  # noqa: E402
+from utils.scraper_utils.stream_writer import write_response  # noqa: E402
+
+
+def start_server(payload):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/image.jpg"
+
+
+def old_loop(url, file_name):
+    """原来的写法：每 8KB 一个新的 bytes 对象"""
+    hasher = hashlib.sha256()
+    chunks = 0
+    with http_get(url) as response, open(file_name, 'wb') as file:
+        for chunk in response.iter_content(chunk_size=8192):
+            hasher.update(chunk)
+            file.write(chunk)
+            chunks += 1
+    return chunks
+
+
+def new_writer(url, file_name):
+    """复用缓冲区 + 自适应块大小"""
+    hasher = hashlib.sha256()
+    chunks = 0
+
+    def on_chunk(chunk):
+        nonlocal chunks
+        hasher.update(chunk)
+        chunks += 1
+
+    with http_get(url) as response, open(file_name, 'wb') as file:
+        write_response(response, file, on_chunk)
+    return chunks
+
+
+def run(name, func, url, file_name, rounds, size):
+    func(url, file_name)  # 预热连接池
+    started = time.perf_counter()
+    chunks = 0
+    for _ in range(rounds):
+        chunks = func(url, file_name)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<14} {elapsed / rounds * 1000:8.1f} ms/文件  {size * rounds / elapsed / 1024 ** 2:8.1f} MB/s  "
+          f"{chunks:6d} 块/文件")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 ** 2)
+    server, url = start_server(os.urandom(size))
+    file_name = os.path.join(tempfile.mkdtemp(), "image.jpg.part")
+    try:
+        print(f"文件大小 {args.size_mb} MB，每种方式 {args.rounds} 轮")
+        run("iter_content", old_loop, url, file_name, args.rounds, size)
+        run("write_response", new_writer, url, file_name, args.rounds, size)
+    finally:
+        server.shutdown()
+        os.remove(file_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,10 @@
+import multiprocessing
+
+if __name__ == '__main__':
+    # 近似重复检测等后处理使用进程池：Windows 和打包后的程序用 spawn 启动工作进程，工作进程会重新执行本文件，
+    # 必须在导入界面模块、初始化日志之前调用，工作进程在这里直接转去执行任务，不再重复界面和日志的初始化
+    multiprocessing.freeze_support()
+
 import time
 
 start_time = time.time()
@@ -42,9 +49,16 @@ log_time("PyQt6.QtGui QAction")
 from PyQt6.QtGui import QIcon, QPalette
 log_time("PyQt6.QtGui QIcon, QPalette")
 
-from PyQt6.QtCore import QSize
+from PyQt6.QtCore import QSize, QTimer, QThread, pyqtSignal
 log_time("PyQt6.QtCore QSize")
 
+from utils.scraper_utils.rate_governor import get_rate_governor
+log_time("rate_governor")
+
+from utils.scraper_utils.dead_letter import find_failed_runs
+from utils.scraper_utils.download_image import retry_failures
+log_time("dead_letter")
+
 from ui.archdaily_window import ArchdailyScraperApp as AS
 log_time("ui.archdaily_window")
 
@@ -72,62 +86,79 @@ print(f"所有包导入完成: {time.time() - start_time:.3f} seconds")
 current_version = '1.1.0'
 app_name = "DScraper爬虫工具箱"
 
-# 1. 确保日志目录在用户主目录下
-log_dir = os.path.join(os.path.expanduser("~"), "DScraper_logs")
-try:
-    os.makedirs(log_dir, exist_ok=True)
-except Exception as e:
-    print(f"无法创建日志目录 {log_dir}: {e}")
-
-# 2. 定义日志文件路径
-log_file = os.path.join(log_dir, "app.log")
-
-# 3. 自定义强制 flush 的 FileHandler
+# 自定义强制 flush 的 FileHandler
 class FlushFileHandler(logging.FileHandler):
     def emit(self, record):
         super().emit(record)
         self.flush()  # 强制写入，防止日志丢失
 
-# 4. 获取全局 logger
+# 全局 logger（处理器在 setup_logging 中添加）
 logger = logging.getLogger("DScraper")
 logger.setLevel(logging.DEBUG)
 
-# 5. 清理已存在的 handler，防止重复日志
-if logger.hasHandlers():
-    logger.handlers.clear()
 
-# 6. 定义日志格式
-formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+def setup_logging():
+    """初始化日志文件和控制台输出（只在主进程中调用，进程池的工作进程不需要）"""
+    # 1. 确保日志目录在用户主目录下
+    log_dir = os.path.join(os.path.expanduser("~"), "DScraper_logs")
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+    except Exception as e:
+        print(f"无法创建日志目录 {log_dir}: {e}")
+
+    # 2. 定义日志文件路径
+    log_file = os.path.join(log_dir, "app.log")
 
-# 7. 文件日志处理器
-try:
-    file_handler = FlushFileHandler(log_file, encoding="utf-8")
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-except Exception as e:
-    print(f"无法创建日志文件 {log_file}: {e}")
+    # 3. 清理已存在的 handler，防止重复日志
+    if logger.hasHandlers():
+        logger.handlers.clear()
 
-# 8. 控制台日志处理器
-stream_handler = logging.StreamHandler(sys.stdout)
-stream_handler.setFormatter(formatter)
-logger.addHandler(stream_handler)
+    # 4. 定义日志格式
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
 
-# 9. 兼容 PyInstaller，防止 stdout 丢失
-if getattr(sys, 'frozen', False):
+    # 5. 文件日志处理器
     try:
-        sys.stdout = open(os.path.join(log_dir, "stdout.log"), "w", encoding="utf-8")
-        sys.stderr = sys.stdout
+        file_handler = FlushFileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(formatter)
+        logger.addHandler(file_handler)
     except Exception as e:
-        logger.error(f"无法重定向 stdout/stderr: {e}")
+        print(f"无法创建日志文件 {log_file}: {e}")
+
+    # 6. 控制台日志处理器
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    logger.addHandler(stream_handler)
+
+    # 7. 兼容 PyInstaller，防止 stdout 丢失
+    if getattr(sys, 'frozen', False):
+        try:
+            sys.stdout = open(os.path.join(log_dir, "stdout.log"), "w", encoding="utf-8")
+            sys.stderr = sys.stdout
+        except Exception as e:
+            logger.error(f"无法重定向 stdout/stderr: {e}")
 
-logger.debug("日志系统初始化完成")
-print(f"日志系统初始化完成: {time.time()}")
+    logger.debug("日志系统初始化完成")
+    print(f"日志系统初始化完成: {time.time()}")
 
 AppName = "com.DScraper"
 
-# 获取系统是否为深色模式
-is_dark_mode = QApplication.palette().color(QPalette.Window).value() < 128
-print("Is dark mode:", is_dark_mode)  # 打印出当前模式
+# 系统是否为深色模式（在 main 中创建 QApplication 后获取）
+is_dark_mode = False
+
+
+class RetryFailuresThread(QThread):
+    """在后台把保存路径下所有运行中失败的下载任务作为一个批次重新下载"""
+    log_signal = pyqtSignal(str)
+    result_signal = pyqtSignal(int, int)
+
+    def __init__(self, base_dir):
+        super().__init__()
+        self.base_dir = base_dir
+
+    def run(self):
+        runs = find_failed_runs(self.base_dir)
+        retried, remaining = retry_failures(runs, self.log_signal) if runs else (0, 0)
+        self.result_signal.emit(retried, remaining)
 
 
 class MainApp(QMainWindow):
@@ -238,6 +269,17 @@ class MainApp(QMainWindow):
         # 将水平布局添加到主垂直布局中
         layout.addLayout(row1_layout)
 
+        # 各域名的实时请求速率和带宽占用（所有标签页共用同一个限速器）
+        self.network_status = QLabel(get_rate_governor().summary())
+        network_layout = QHBoxLayout()
+        network_layout.addWidget(QLabel("网络占用:"))
+        network_layout.addWidget(self.network_status, 1)
+        layout.addLayout(network_layout)
+
+        self.network_timer = QTimer(self)
+        self.network_timer.timeout.connect(self.update_network_status)
+        self.network_timer.start(1000)
+
     def create_path_ui(self, layout):
         """
         创建并添加路径选择框到布局
@@ -261,8 +303,14 @@ class MainApp(QMainWindow):
         open_folder_button.setIcon(qta.icon("mdi.folder-outline"))
         open_folder_button.setIconSize(QSize(20, 20))
 
+        # 创建重试失败下载按钮（重新下载之前放弃的图片，不重新爬取页面）
+        self.retry_button = QPushButton("重试失败下载")
+        self.retry_button.setIcon(qta.icon("mdi.download-outline"))
+        self.retry_button.setIconSize(QSize(20, 20))
+
         path_button.setStyleSheet(StyleSheetHelper.get_path_button_style(is_dark_mode))
         open_folder_button.setStyleSheet(StyleSheetHelper.get_path_button_style(is_dark_mode))
+        self.retry_button.setStyleSheet(StyleSheetHelper.get_path_button_style(is_dark_mode))
 
         # 定义选择文件夹功能
         def select_folder():
@@ -272,15 +320,32 @@ class MainApp(QMainWindow):
 
         path_button.clicked.connect(select_folder)
         open_folder_button.clicked.connect(lambda: open_folder(self.path_input.text()))
+        self.retry_button.clicked.connect(self.retry_failed_downloads)
 
         # 添加路径选择控件到布局
         path_layout.addWidget(path_label)
         path_layout.addWidget(self.path_input)
         path_layout.addWidget(path_button)
         path_layout.addWidget(open_folder_button)
+        path_layout.addWidget(self.retry_button)
 
         layout.addLayout(path_layout)
 
+    def retry_failed_downloads(self):
+        """重试保存路径下所有失败的下载任务"""
+        self.retry_button.setEnabled(False)
+        self.retry_thread = RetryFailuresThread(self.path_input.text())
+        self.retry_thread.log_signal.connect(logger.info)
+        self.retry_thread.result_signal.connect(self.on_retry_finished)
+        self.retry_thread.start()
+
+    def on_retry_finished(self, retried, remaining):
+        self.retry_button.setEnabled(True)
+        if not retried:
+            QMessageBox.information(self, "重试失败下载", "没有需要重试的失败任务")
+        else:
+            QMessageBox.information(self, "重试失败下载", f"重试 {retried} 个任务：成功 {retried - remaining} 个，仍然失败 {remaining} 个")
+
     def get_main_ui_elements(self):
         """
         返回包含 UI 元素的字典
@@ -311,14 +376,24 @@ class MainApp(QMainWindow):
     def update_xhs_status(self, status):
         self.xhs_status.setText(status)
 
+    def update_network_status(self):
+        self.network_status.setText(get_rate_governor().summary())
+
 # 主程序
 def main():
+    global is_dark_mode
+    setup_logging()
+
     # 设置高DPI缩放
     # QCoreApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
     # QCoreApplication.setAttribute(Qt.AA_UseHighDpiPixmaps)
 
     app = QApplication(sys.argv)
 
+    # 获取系统是否为深色模式
+    is_dark_mode = QApplication.palette().color(QPalette.Window).value() < 128
+    print("Is dark mode:", is_dark_mode)  # 打印出当前模式
+
     # 显示免责声明对话框
     disclaimer_dialog = DisclaimerDialog()
     result = disclaimer_dialog.exec_()
@@ -0,0 +1,34 @@
+# retry_failed_downloads.py
+"""
+重试之前运行中放弃的图片下载（死信记录），不需要重新爬取源页面。
+
+用法：
+    python retry_failed_downloads.py                 # 重试默认保存路径下所有运行的失败任务
+    python retry_failed_downloads.py <文件夹> ...     # 指定保存路径或某次运行的输出文件夹
+"""
+import sys
+import argparse
+from utils.file_utils.file_path_and_creat_folder import get_base_directory
+from utils.scraper_utils.dead_letter import find_failed_runs
+from utils.scraper_utils.download_image import retry_failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重试失败的图片下载")
+    parser.add_argument("folders", nargs="*", help="保存路径或运行输出文件夹，默认使用程序的默认保存路径")
+    args = parser.parse_args()
+
+    runs = []
+    for folder in args.folders or [get_base_directory()]:
+        runs += find_failed_runs(folder)
+    if not runs:
+        print("没有需要重试的失败任务")
+        return 0
+
+    print(f"在 {len(runs)} 次运行中发现失败任务")
+    _, remaining = retry_failures(runs)
+    return 1 if remaining else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,6 +15,7 @@ class HuabanScraperThreadClass(QThread):
     """
     def __init__(self, keyword, custom_base_dir):
         super().__init__()
+        self.is_running = True  # 点击停止时置为 False，爬虫在两个项目之间检查后自行结束
         self.keyword = keyword  # 用户输入的爬虫关键词
         self.custom_base_dir = custom_base_dir
 
@@ -27,6 +28,7 @@ class HuabanScraperThreadClass(QThread):
         try:
             # 直接调用爬虫函数，并传入页数参数
             scraper = Huabanscraper(self.keyword, self.log_signal)
+            scraper.thread_instance = self  # 让爬虫能检查是否已被停止
             scraper.scrape(custom_base_dir=self.custom_base_dir)  # 调用 scrape 方法启动爬虫
         except Exception as e:
             self.log_signal.emit(f"爬虫执行出错: {str(e)}")
@@ -50,7 +52,7 @@ class HuabanScraperApp(QWidget):
 
         self.scraper_thread = None  # 初始化爬虫线程为 None
         self.ui_elements = create_common_ui(
-            self, "花瓣网备份", "访问花瓣网", self.open_webside, exclude_elements=["page_input", "district_input", "max_links_input", "city_input"]
+            self, "花瓣网备份", "访问花瓣网", self.open_webside, exclude_elements=["page_input", "district_input", "max_links_input", "city_input", "dedup_checkbox", "postprocess_checkbox"]
         )  # 加载公共 UI 模板
 
         # 修改 PlaceholderText 为花瓣网特定的提示信息
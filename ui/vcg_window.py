@@ -13,11 +13,13 @@ class VcgScraperThreadClass(QThread):
     ScraperThreadClass 继承自 QThread，用于处理爬虫的后台线程。
     该类会在独立线程中执行爬虫任务，防止阻塞主界面，任务完成后会发出信号更新日志信息。
     """
-    def __init__(self, keyword, page_count, custom_base_dir):
+    def __init__(self, keyword, page_count, custom_base_dir, dedup=False):
         super().__init__()
+        self.is_running = True  # 点击停止时置为 False，爬虫在两个项目之间检查后自行结束
         self.keyword = keyword  # 用户输入的爬虫关键词
         self.page_count = page_count  # 用户输入的爬取页数
         self.custom_base_dir = custom_base_dir
+        self.dedup = dedup  # 是否在下载完成后剔除近似重复图片
         # self.log_signal = log_signal
 
     def run(self):
@@ -28,7 +30,8 @@ class VcgScraperThreadClass(QThread):
         """
         try:
             # 直接调用爬虫函数，并传入页数参数
-            scraper = VCGScraper(self.keyword, self.page_count, self.log_signal)
+            scraper = VCGScraper(self.keyword, self.page_count, self.log_signal, dedup=self.dedup)
+            scraper.thread_instance = self  # 让爬虫能检查是否已被停止
             scraper.scrape(custom_base_dir=self.custom_base_dir)  # 调用 scrape 方法启动爬虫
         except Exception as e:
             self.log_signal.emit(f"爬虫执行出错: {str(e)}")
@@ -51,7 +54,7 @@ class VcgScraperApp(QWidget):
 
         self.scraper_thread = None  # 初始化爬虫线程为 None
         self.ui_elements = create_common_ui(
-            self, "视觉中国", "访问视觉中国", self.open_webside, exclude_elements=["district_input", "max_links_input", "city_input"]
+            self, "视觉中国", "访问视觉中国", self.open_webside, exclude_elements=["district_input", "max_links_input", "city_input", "postprocess_checkbox"]
         )  # 加载公共 UI 模板
 
         # 修改文本
@@ -15,6 +15,7 @@ class ZnzmoScraperThreadClass(QThread):
     """
     def __init__(self, keyword, page_count, custom_base_dir):
         super().__init__()
+        self.is_running = True  # 点击停止时置为 False，爬虫在两个项目之间检查后自行结束
         self.keyword = keyword  # 用户输入的爬虫关键词
         self.page_count = page_count  # 用户输入的爬取页数
         self.custom_base_dir = custom_base_dir
@@ -29,6 +30,7 @@ class ZnzmoScraperThreadClass(QThread):
         try:
             # 直接调用爬虫函数，并传入页数参数
             scraper = ZnzmoScraper(self.keyword, self.page_count, self.log_signal)
+            scraper.thread_instance = self  # 让爬虫能检查是否已被停止
             scraper.scrape(custom_base_dir=self.custom_base_dir)  # 调用 scrape 方法启动爬虫
         except Exception as e:
             self.log_signal.emit(f"爬虫执行出错: {str(e)}")
@@ -51,7 +53,7 @@ class ZnzmoScraperApp(QWidget):
 
         self.scraper_thread = None  # 初始化爬虫线程为 None
         self.ui_elements = create_common_ui(
-            self, "知末效果图", "访问知末效果图", self.open_webside, exclude_elements=["district_input", "max_links_input", "city_input"]
+            self, "知末效果图", "访问知末效果图", self.open_webside, exclude_elements=["district_input", "max_links_input", "city_input", "dedup_checkbox", "postprocess_checkbox"]
         )  # 加载公共 UI 模板
 
         # 修改 page_label 的文本
@@ -1,9 +1,13 @@
 import re
 import uuid
+import json
 from datetime import datetime
 import os
 import platform
 
+# 每次爬取的输出文件夹中记录本次运行信息的文件（用于中断后续跑）
+RUN_INFO_FILE_NAME = ".run_info.json"
+
 def get_base_directory(custom_base_dir=None):
     """
     获取基础目录的路径。如果提供了自定义路径，则返回自定义路径，
@@ -39,8 +43,32 @@ def get_base_directory(custom_base_dir=None):
     return target_dir
 
 
-def create_output_folder(base_url, custom_base_dir=None):
-    """根据提供的 URL 创建一个带时间戳和域名的唯一文件夹，并返回文件夹路径"""
+def get_app_data_dir(*parts):
+    """
+    获取程序自身数据（cookies、驱动缓存等）的保存目录，按操作系统放在用户数据目录下。
+
+    参数:
+    parts: str - 可选的子路径
+    """
+    # 检测操作系统类型
+    if platform.system() == "Darwin":  # macOS
+        base_dir = os.path.expanduser("~/Library/Application Support/DScraper")
+    elif platform.system() == "Windows":  # Windows
+        base_dir = os.path.expandvars(r"%APPDATA%\DScraper")
+    else:  # Linux 或其他系统
+        base_dir = os.path.expanduser("~/.DScraper")
+    return os.path.join(base_dir, *parts)
+
+
+def create_output_folder(base_url, custom_base_dir=None, resume=False):
+    """
+    根据提供的 URL 创建一个带时间戳和域名的唯一文件夹，并返回文件夹路径。
+
+    参数:
+    base_url: str - 本次爬取的入口 URL
+    custom_base_dir: str - 可选的自定义基础目录路径
+    resume: bool - 为 True 时，如果同一 URL 上一次运行没有正常结束（中断/崩溃），则继续使用那次的文件夹
+    """
     # 提取域名特征（如 gooood.cn）
     domain_match = re.search(r"https?://(www\.)?([a-zA-Z0-9.-]+)", base_url)
     domain_name = domain_match.group(2).replace(".", "_") if domain_match else "爬取内容"
@@ -48,6 +76,11 @@ def create_output_folder(base_url, custom_base_dir=None):
     # 获取基础目录
     base_dir = get_base_directory(custom_base_dir)
 
+    if resume:
+        unfinished_folder = find_unfinished_output_folder(base_dir, domain_name, base_url)
+        if unfinished_folder:
+            return unfinished_folder
+
     # 使用当前时间或者项目名创建文件夹
     folder_name = f"爬取内容{domain_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
     folder_path = os.path.join(base_dir, folder_name)
@@ -56,9 +89,48 @@ def create_output_folder(base_url, custom_base_dir=None):
     if not os.path.exists(folder_path):
         os.makedirs(folder_path)
 
+    # 记录本次运行信息，运行正常结束后由 mark_output_folder_finished 标记完成
+    with open(os.path.join(folder_path, RUN_INFO_FILE_NAME), 'w', encoding='utf-8') as f:
+        json.dump({"base_url": base_url, "finished": False}, f, ensure_ascii=False)
+
     return folder_path
 
 
+def read_run_info(folder_path):
+    """读取输出文件夹中的运行信息，不存在或损坏时返回 None"""
+    try:
+        with open(os.path.join(folder_path, RUN_INFO_FILE_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def find_unfinished_output_folder(base_dir, domain_name, base_url):
+    """查找同一 URL 最近一次未正常结束的输出文件夹"""
+    prefix = f"爬取内容{domain_name}_"
+    try:
+        candidates = sorted((name for name in os.listdir(base_dir) if name.startswith(prefix)), reverse=True)
+    except OSError:
+        return None
+
+    for name in candidates:
+        folder_path = os.path.join(base_dir, name)
+        run_info = read_run_info(folder_path)
+        if run_info and run_info.get("base_url") == base_url:
+            # 只看同一 URL 最近的一次运行
+            return None if run_info.get("finished") else folder_path
+    return None
+
+
+def mark_output_folder_finished(folder_path):
+    """标记输出文件夹对应的运行已正常结束，之后的运行不会再续用它"""
+    run_info = read_run_info(folder_path) or {}
+    run_info["finished"] = True
+    run_info["finished_at"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with open(os.path.join(folder_path, RUN_INFO_FILE_NAME), 'w', encoding='utf-8') as f:
+        json.dump(run_info, f, ensure_ascii=False)
+
+
 def open_folder(folder_path):
     """打开指定文件夹路径"""
     try:
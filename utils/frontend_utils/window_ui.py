@@ -1,6 +1,6 @@
 # window_ui.py
 import qtawesome as qta
-from PyQt6.QtWidgets import QVBoxLayout, QLabel, QLineEdit, QPushButton, QSpinBox, QHBoxLayout, QTextEdit, QCompleter, QMessageBox, QApplication
+from PyQt6.QtWidgets import QVBoxLayout, QLabel, QLineEdit, QPushButton, QSpinBox, QHBoxLayout, QTextEdit, QCompleter, QMessageBox, QApplication, QCheckBox
 from utils.file_utils.load_datas import resource_path, load_json_file
 from utils.frontend_utils.style import StyleSheetHelper
 from PyQt6.QtCore import QSize, Qt
@@ -113,6 +113,22 @@ def create_common_ui(parent, window_title, visit_button_text, visit_button_func,
     else:
         max_links_label, max_links_input = None, None
 
+    # 下载完成后剔除近似重复图片（同一图片的不同尺寸/轻微裁剪）
+    if "dedup_checkbox" not in exclude_elements:
+        dedup_checkbox = QCheckBox('剔除近似重复图片')
+        dedup_checkbox.setToolTip("下载完成后把同一图片的不同尺寸、轻微裁剪版本移动到「近似重复」文件夹")
+        main_layout.addWidget(dedup_checkbox)
+    else:
+        dedup_checkbox = None
+
+    # 下载完成后生成缩略图、网页版图片和每个项目的联系表（在后台进程池中处理）
+    if "postprocess_checkbox" not in exclude_elements:
+        postprocess_checkbox = QCheckBox('生成缩略图和网页版')
+        postprocess_checkbox.setToolTip("为每张图片生成缩略图和去除元数据的 WebP 网页版，并为每个项目生成联系表")
+        main_layout.addWidget(postprocess_checkbox)
+    else:
+        postprocess_checkbox = None
+
     # 将横向布局添加到主布局
     layout.addLayout(main_layout)
 
@@ -178,5 +194,7 @@ def create_common_ui(parent, window_title, visit_button_text, visit_button_func,
         "status_label": status_label,
         "log_placeholder": log_output.placeholderText(), # 返回日志的 placeholder 文本
         "max_links_input": max_links_input, # 添加最大链接数量
-        "city_input": city_input # 返回新增的城市输入框
+        "city_input": city_input, # 返回新增的城市输入框
+        "dedup_checkbox": dedup_checkbox, # 返回近似重复剔除选项
+        "postprocess_checkbox": postprocess_checkbox # 返回图片后处理选项
     }
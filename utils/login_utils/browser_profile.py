@@ -0,0 +1,63 @@
+# browser_profile.py
+import os
+from utils.file_utils.file_path_and_creat_folder import get_app_data_dir
+
+# 各站点持久化浏览器配置（--user-data-dir）的根目录
+PROFILE_ROOT = get_app_data_dir("browser_profiles")
+
+
+def profile_dir(site, browser=None):
+    """
+    返回站点的浏览器配置目录：登录状态、本地存储和 HTTP 缓存保存在这里，下次启动直接沿用。
+    不同浏览器（Chrome / Edge）的配置格式不兼容，按浏览器分开保存。
+    """
+    parts = [PROFILE_ROOT, site] + ([browser] if browser else [])
+    return os.path.join(*parts)
+
+
+class ProfileLock:
+    """
+    站点配置目录的独占锁：同一个配置目录同时只能被一个浏览器使用（Chrome 不允许多个实例共用），
+    其他标签页或另一个程序实例拿不到锁时改用临时的隐身浏览器。
+    使用操作系统的文件锁，程序异常退出时锁会自动释放。
+    """
+
+    def __init__(self, site):
+        self.site = site
+        self.path = os.path.join(PROFILE_ROOT, f"{site}.lock")
+        self._file = None
+
+    def acquire(self):
+        """尝试加锁（不等待），返回是否成功"""
+        os.makedirs(PROFILE_ROOT, exist_ok=True)
+        file = open(self.path, 'a+')
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return False
+        self._file = file
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        except OSError:
+            pass
+        finally:
+            self._file.close()
+            self._file = None
@@ -1,4 +1,5 @@
 import os
+import time
 import platform
 import logging
 from selenium import webdriver
@@ -8,10 +9,39 @@ from selenium.webdriver.edge.service import Service as EdgeService
 from selenium.webdriver.edge.options import Options as EdgeOptions
 from webdriver_manager.chrome import ChromeDriverManager
 from webdriver_manager.microsoft import EdgeChromiumDriverManager
+from utils.scraper_utils.rate_governor import govern_driver
+from utils.login_utils.driver_cache import resolve_driver_path
+from utils.login_utils.resource_policy import apply_resource_policy
+from utils.login_utils.network_capture import enable_network_capture
+from utils.login_utils.browser_profile import profile_dir
 
 
 
-def create_driver(log_signal=None,  headless=True):
+def create_driver(log_signal=None,  headless=True, refresh_driver=False, resource_policy=None, network_capture=False,
+                  profile=None):
+    """
+    创建浏览器驱动，并让页面导航经过进程级的按域名限速器。
+    log_signal: pyqtSignal (可选) - 用于向 GUI 日志窗口输出信息。
+    refresh_driver: bool - 忽略驱动缓存，重新匹配浏览器驱动
+    resource_policy: str (可选) - 资源屏蔽方案（爬虫名，见 resource_policy.RESOURCE_POLICIES），
+                     浏览器不再加载被屏蔽的图片、视频、字体和统计脚本
+    network_capture: bool - 开启性能日志，爬虫可以用 network_capture.NetworkCapture 读取网站接口返回的数据
+    profile: str (可选) - 使用该站点的持久化浏览器配置目录（见 browser_profile.profile_dir），不再使用隐身模式，
+             登录状态、本地存储和 HTTP 缓存在多次运行之间保留；调用方负责持有该目录的 ProfileLock
+    """
+    started = time.monotonic()
+    driver = _launch_driver(log_signal, headless, refresh_driver, network_capture, profile)
+    if resource_policy:
+        apply_resource_policy(driver, resource_policy)
+    message = f"浏览器启动用时 {time.monotonic() - started:.1f} 秒"
+    if log_signal:
+        log_signal.emit(message)
+    else:
+        print(message)
+    return govern_driver(driver)
+
+
+def _launch_driver(log_signal=None,  headless=True, refresh_driver=False, network_capture=False, profile=None):
     # 设置国内镜像 URL
     MIRROR_URL = "https://registry.npmmirror.com/mirrors/chromedriver"
 
@@ -60,6 +90,29 @@ def create_driver(log_signal=None,  headless=True):
             raise
 
 
+    def launch_with_driver(browser, install_func, start_func):
+        """
+        用缓存的驱动启动浏览器（浏览器版本没变时不再调用 webdriver-manager）；
+        缓存的驱动启动失败时重新匹配一次驱动再试。
+        """
+        started = time.monotonic()
+        driver_path, cached = resolve_driver_path(
+            browser, lambda: install_driver_with_progress(install_func), refresh=refresh_driver)
+        if cached:
+            log_message(f"使用缓存的浏览器驱动: {driver_path}")
+        else:
+            log_message(f"驱动匹配用时 {time.monotonic() - started:.1f} 秒")
+        try:
+            return start_func(driver_path)
+        except Exception as e:
+            if not cached:
+                raise
+            log_message(f"缓存的驱动无法启动（{e}），重新匹配驱动...")
+            driver_path, _ = resolve_driver_path(
+                browser, lambda: install_driver_with_progress(install_func), refresh=True)
+            return start_func(driver_path)
+
+
     # 针对 MacOS 系统
     if system == 'Darwin':
         # log_message("检测是否安装了 Chrome 浏览器...")
@@ -89,8 +142,12 @@ def create_driver(log_signal=None,  headless=True):
                 chrome_options.add_argument("--disable-dev-shm-usage")
                 chrome_options.add_argument("--disable-software-rasterizer")
                 chrome_options.add_argument("--log-level=3")
-                chrome_options.add_argument("--disable-application-cache")  # 禁用应用缓存
-                chrome_options.add_argument("--incognito")  # 启用隐身模式（无缓存，无历史）
+                if profile:
+                    # 站点的持久化配置目录：保留登录状态、本地存储和 HTTP 缓存
+                    chrome_options.add_argument(f"--user-data-dir={profile_dir(profile, 'chrome')}")
+                else:
+                    chrome_options.add_argument("--disable-application-cache")  # 禁用应用缓存
+                    chrome_options.add_argument("--incognito")  # 启用隐身模式（无缓存，无历史）
                 chrome_options.add_experimental_option('excludeSwitches', ['enable-automation', 'enable-logging'])
                 chrome_options.add_argument("--disable-blink-features=AutomationControlled")
                 chrome_options.add_argument("--disable-features=UserAgentClientHint")
@@ -99,14 +156,15 @@ def create_driver(log_signal=None,  headless=True):
                 chrome_options.add_argument(
                     "user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Version/14.1.2 Safari/537.36"
                 )
-
-                # 使用国内镜像源安装 ChromeDriver 并监控下载进度
-                chrome_service = Service(
-                    install_driver_with_progress(
-                        lambda: ChromeDriverManager(url=MIRROR_URL).install()
-                    )
+                if network_capture:
+                    enable_network_capture(chrome_options, "chrome")
+
+                # 优先使用缓存的驱动，浏览器版本变化时才用国内镜像源重新匹配 ChromeDriver
+                driver = launch_with_driver(
+                    "chrome",
+                    lambda: ChromeDriverManager(url=MIRROR_URL).install(),
+                    lambda path: webdriver.Chrome(service=Service(path), options=chrome_options)
                 )
-                driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
                 log_message("使用 Chrome 浏览器成功！")
                 return driver
 
@@ -145,8 +203,12 @@ def create_driver(log_signal=None,  headless=True):
             edge_options.add_argument("--disable-dev-shm-usage")
             edge_options.add_argument("--disable-software-rasterizer")
             edge_options.add_argument("--log-level=3")
-            edge_options.add_argument("--disable-application-cache")  # 禁用应用缓存
-            edge_options.add_argument("--incognito")  # 启用隐身模式（无缓存，无历史）
+            if profile:
+                # 站点的持久化配置目录：保留登录状态、本地存储和 HTTP 缓存
+                edge_options.add_argument(f"--user-data-dir={profile_dir(profile, 'edge')}")
+            else:
+                edge_options.add_argument("--disable-application-cache")  # 禁用应用缓存
+                edge_options.add_argument("--incognito")  # 启用隐身模式（无缓存，无历史）
             edge_options.add_argument("--disable-blink-features=AutomationControlled")
             edge_options.add_argument("--disable-features=UserAgentClientHint")
             edge_options.add_experimental_option("useAutomationExtension", False)
@@ -154,14 +216,15 @@ def create_driver(log_signal=None,  headless=True):
             edge_options.add_argument(
                 "user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Version/14.1.2 Safari/537.36"
             )
-
-            # 使用 EdgeChromiumDriverManager 自动安装 EdgeDriver
-            edge_driver_path = install_driver_with_progress(
-                lambda: EdgeChromiumDriverManager().install()
+            if network_capture:
+                enable_network_capture(edge_options, "edge")
+
+            # 优先使用缓存的驱动，浏览器版本变化时才用 EdgeChromiumDriverManager 重新匹配 EdgeDriver
+            driver = launch_with_driver(
+                "edge",
+                lambda: EdgeChromiumDriverManager().install(),
+                lambda path: webdriver.Edge(service=EdgeService(path), options=edge_options)
             )
-            log_message(f"edge驱动路径： {edge_driver_path}")
-            edge_service = EdgeService(edge_driver_path)
-            driver = webdriver.Edge(service=edge_service, options=edge_options)
             log_message("使用 Edge 浏览器成功！")
             return driver
 
@@ -183,8 +246,12 @@ def create_driver(log_signal=None,  headless=True):
                 chrome_options.add_argument("--disable-dev-shm-usage")
                 chrome_options.add_argument("--disable-software-rasterizer")
                 chrome_options.add_argument("--log-level=3")
-                chrome_options.add_argument("--disable-application-cache")  # 禁用应用缓存
-                chrome_options.add_argument("--incognito")  # 启用隐身模式（无缓存，无历史）
+                if profile:
+                    # 站点的持久化配置目录：保留登录状态、本地存储和 HTTP 缓存
+                    chrome_options.add_argument(f"--user-data-dir={profile_dir(profile, 'chrome')}")
+                else:
+                    chrome_options.add_argument("--disable-application-cache")  # 禁用应用缓存
+                    chrome_options.add_argument("--incognito")  # 启用隐身模式（无缓存，无历史）
                 chrome_options.add_experimental_option('excludeSwitches', ['enable-automation', 'enable-logging'])
                 chrome_options.add_argument("--disable-blink-features=AutomationControlled")
                 chrome_options.add_argument("--disable-features=UserAgentClientHint")
@@ -193,15 +260,14 @@ def create_driver(log_signal=None,  headless=True):
                 chrome_options.add_argument(
                     "user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Version/14.1.2 Safari/537.36"
                 )
-                # 使用国内镜像源安装 ChromeDriver 并监控下载进度
-                chrome_driver_path = install_driver_with_progress(
-                    lambda: ChromeDriverManager(url=MIRROR_URL).install()
+                if network_capture:
+                    enable_network_capture(chrome_options, "chrome")
+                # 优先使用缓存的驱动，浏览器版本变化时才用国内镜像源重新匹配 ChromeDriver
+                driver = launch_with_driver(
+                    "chrome",
+                    lambda: ChromeDriverManager(url=MIRROR_URL).install(),
+                    lambda path: webdriver.Chrome(service=Service(path), options=chrome_options)
                 )
-                log_message(f"chrome驱动路径： {chrome_driver_path}")
-
-                chrome_service = Service(chrome_driver_path)
-
-                driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
                 log_message("使用 Chrome 浏览器成功！")
                 return driver
 
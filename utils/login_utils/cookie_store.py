@@ -0,0 +1,50 @@
+# cookie_store.py
+import os
+import time
+import pickle
+from utils.file_utils.file_path_and_creat_folder import get_app_data_dir
+
+# 只负责 cookie 文件的保存位置和读写，不依赖 selenium：
+# 不启动浏览器的模块（如按站点附加登录 cookie 的 HTTP 下载）也可以直接使用
+
+
+def get_cookie_dir(domain: str) -> str:
+    """返回保存指定域名 cookies 的文件夹路径（按操作系统放在用户数据目录下）"""
+    return get_app_data_dir("cookies", domain)
+
+
+def find_latest_cookie_file(domain: str):
+    """返回指定域名最新保存的 cookie 文件路径，没有时返回 None"""
+    cookies_dir = get_cookie_dir(domain)
+    if not os.path.exists(cookies_dir):
+        return None
+    existing_cookies = [f for f in os.listdir(cookies_dir) if f.startswith(f'cookies_{domain}')]
+    if not existing_cookies:
+        return None
+    return os.path.join(cookies_dir, sorted(existing_cookies)[-1])
+
+
+def read_cookie_file(cookie_file):
+    """读取 cookie 文件，返回浏览器导出的 cookies 列表（读取失败时抛出异常，由调用方处理）"""
+    with open(cookie_file, 'rb') as file:
+        return pickle.load(file)
+
+
+def write_cookie_file(domain, cookies):
+    """把 cookies 保存为新的带时间戳的 cookie 文件，返回文件路径"""
+    cookies_dir = get_cookie_dir(domain)
+
+    # 获取当前时间戳，用于生成 cookie 文件名
+    timestamp = time.strftime('%Y%m%d_%H%M%S')
+
+    # 创建 cookies 文件夹（如果不存在的话）
+    if not os.path.exists(cookies_dir):
+        os.makedirs(cookies_dir)
+
+    # 定义 cookie 文件的路径
+    cookie_file_path = os.path.join(cookies_dir, f'cookies_{domain}_{timestamp}.pkl')
+
+    # 保存 cookies 到文件
+    with open(cookie_file_path, 'wb') as file:
+        pickle.dump(cookies, file)
+    return cookie_file_path
@@ -1,13 +1,12 @@
 import time
-import pickle
 import os
-import platform
 from urllib.parse import urlparse
 from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
+from utils.login_utils.cookie_store import get_cookie_dir, find_latest_cookie_file, read_cookie_file, write_cookie_file
 
 # 定义每个网站的登录检查规则
 # """记录已经登陆的特征"""
@@ -28,9 +27,17 @@ def log_message(log_signal, message):
     else:
         print(message)
 
+def save_cookies(driver: WebDriver, domain: str, log_signal=None) -> str:
+    """把浏览器当前的 cookies 保存为新的带时间戳的 cookie 文件，返回文件路径"""
+    cookie_file_path = write_cookie_file(domain, driver.get_cookies())
+    log_message(log_signal, f"Cookies 已保存到: {cookie_file_path}")
+    return cookie_file_path
+
+
 def get_or_load_cookies(driver: WebDriver, login_url: str, site_key: str, log_signal=None, login_click_xpath=None, message_signal=None) -> str:
     """
     获取或加载网站的 cookies 并保存到文件。如果已经存在匹配的 cookies 文件夹则直接加载，否则获取新的 cookies。
+    使用持久化浏览器配置时，打开登录页面后已经是登录状态，直接返回，不再注入 cookies。
 
     :param driver: 已创建的浏览器驱动
     :param login_url: 要登录的网址
@@ -38,40 +45,32 @@ def get_or_load_cookies(driver: WebDriver, login_url: str, site_key: str, log_si
     :param login_click_xpath: 模拟点击的 XPath（如果有的话）
     :return: 返回 cookie 文件的路径
     """
-    # 检测操作系统类型
-    if platform.system() == "Darwin":  # macOS
-        base_cookie_dir = os.path.expanduser("~/Library/Application Support/DScraper/cookies")
-    elif platform.system() == "Windows":  # Windows
-        base_cookie_dir = os.path.expandvars(r"%APPDATA%\DScraper\cookies")
-    else:  # Linux 或其他系统
-        base_cookie_dir = os.path.expanduser("~/.DScraper/cookies")
-
     domain = urlparse(login_url).netloc
-    cookies_dir = os.path.join(base_cookie_dir, domain)
+    cookies_dir = get_cookie_dir(domain)
     log_message(log_signal, f"Cookies 将保存到目录: {cookies_dir}")
 
-    # 打开登录页面
+    # 打开登录页面，最多等待 2 秒确认页面加载完成；浏览器配置中保留了登录状态时会提前返回
     driver.get(login_url)
-    time.sleep(2)  # 确保页面加载完成
+    if wait_logged_in(driver, site_key, timeout=2):
+        log_message(log_signal, "浏览器配置中已保存登录状态，跳过加载 cookies")
+        # 浏览器中的会话可能已被网站续期，重新保存一份，供没有拿到配置锁的隐身浏览器使用
+        return save_cookies(driver, domain, log_signal)
 
     if os.path.exists(cookies_dir):
-        existing_cookies = [f for f in os.listdir(cookies_dir) if f.startswith(f'cookies_{domain}')]
+        latest_cookie_file = find_latest_cookie_file(domain)
 
-        if existing_cookies:
-            latest_cookie_file = os.path.join(cookies_dir, sorted(existing_cookies)[-1])
+        if latest_cookie_file:
             log_message(log_signal, f"发现已有的 Cookie 文件: {latest_cookie_file}")
 
             try:
                 driver.get(f"https://{domain}")
                 time.sleep(2)  # 确保页面加载
 
-                with open(latest_cookie_file, 'rb') as file:
-                    cookies = pickle.load(file)
-                    for cookie in cookies:
-                        try:
-                            driver.add_cookie(cookie)
-                        except Exception as e:
-                            log_message(log_signal, f"无法加载 cookie: {cookie}, 错误: {e}")
+                for cookie in read_cookie_file(latest_cookie_file):
+                    try:
+                        driver.add_cookie(cookie)
+                    except Exception as e:
+                        log_message(log_signal, f"无法加载 cookie: {cookie}, 错误: {e}")
 
                 # 在所有 cookie 加载完后刷新页面
                 log_message(log_signal, f"Cookies 已加载到浏览器: {latest_cookie_file}")
@@ -105,21 +104,7 @@ def get_or_load_cookies(driver: WebDriver, login_url: str, site_key: str, log_si
                 log_message(log_signal, "用户已登录，继续执行...")
                 break  # 登录成功，退出循环
 
-        # 获取当前时间戳，用于生成 cookie 文件名
-        timestamp = time.strftime('%Y%m%d_%H%M%S')
-
-        # 创建 cookies 文件夹（如果不存在的话）
-        if not os.path.exists(cookies_dir):
-            os.makedirs(cookies_dir)
-
-        # 定义 cookie 文件的路径
-        cookie_file_path = os.path.join(cookies_dir, f'cookies_{domain}_{timestamp}.pkl')
-
-        # 保存 cookies 到文件
-        with open(cookie_file_path, 'wb') as file:
-            pickle.dump(driver.get_cookies(), file)
-
-        log_message(log_signal, f"Cookies 已保存到: {cookie_file_path}")
+        cookie_file_path = save_cookies(driver, domain, log_signal)
 
     except Exception as e:
         log_message(log_signal, f"获取 Cookies 时出错: {e}")
@@ -169,3 +154,16 @@ def is_logged_in(driver: WebDriver, site_key: str) -> bool:
         return True  # 找到元素，表示已登录
     except NoSuchElementException:
         return False  # 没有找到元素，表示未登录
+
+
+def wait_logged_in(driver: WebDriver, site_key: str, timeout: float) -> bool:
+    """等待最多 timeout 秒，出现登录成功标志元素时立即返回 True"""
+    if site_key not in LOGIN_CHECK_RULES:
+        raise ValueError(f"No login check rule defined for site '{site_key}'")
+
+    rule = LOGIN_CHECK_RULES[site_key]
+    try:
+        WebDriverWait(driver, timeout).until(EC.presence_of_element_located((rule["by"], rule["value"])))
+        return True
+    except TimeoutException:
+        return False
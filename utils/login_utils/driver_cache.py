@@ -0,0 +1,100 @@
+# driver_cache.py
+import os
+import json
+import time
+import platform
+import plistlib
+import threading
+from utils.file_utils.file_path_and_creat_folder import get_app_data_dir
+
+# 驱动缓存文件：记录每种浏览器在某个版本下匹配到的驱动路径
+DRIVER_CACHE_FILE = get_app_data_dir("driver_cache.json")
+
+# 读取已安装浏览器版本的位置（不需要启动浏览器，也不需要联网）
+MAC_BROWSER_PLISTS = {
+    "chrome": "/Applications/Google Chrome.app/Contents/Info.plist",
+}
+WINDOWS_BROWSER_REGISTRY_KEYS = {
+    "chrome": r"Software\Google\Chrome\BLBeacon",
+    "edge": r"Software\Microsoft\Edge\BLBeacon",
+}
+
+_lock = threading.Lock()
+
+
+def browser_version(browser):
+    """
+    读取本机已安装浏览器的版本号。
+
+    :param browser: "chrome" 或 "edge"
+    :return: 版本号字符串，无法判断时返回 None（此时不使用缓存）
+    """
+    system = platform.system()
+    try:
+        if system == "Darwin" and browser in MAC_BROWSER_PLISTS:
+            with open(MAC_BROWSER_PLISTS[browser], 'rb') as file:
+                return plistlib.load(file).get("CFBundleShortVersionString")
+        if system == "Windows" and browser in WINDOWS_BROWSER_REGISTRY_KEYS:
+            import winreg
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, WINDOWS_BROWSER_REGISTRY_KEYS[browser]) as key:
+                return winreg.QueryValueEx(key, "version")[0]
+    except (OSError, ValueError, plistlib.InvalidFileException):
+        pass
+    return None
+
+
+def _load_cache():
+    try:
+        with open(DRIVER_CACHE_FILE, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache):
+    os.makedirs(os.path.dirname(DRIVER_CACHE_FILE), exist_ok=True)
+    temp_file = DRIVER_CACHE_FILE + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8') as file:
+        json.dump(cache, file, ensure_ascii=False, indent=2)
+    os.replace(temp_file, DRIVER_CACHE_FILE)
+
+
+def resolve_driver_path(browser, install_func, refresh=False):
+    """
+    返回浏览器驱动路径：浏览器版本与上次相同且驱动文件仍在时直接使用缓存的路径，
+    不调用 webdriver-manager（省去版本探测和联网检查）；否则调用 install_func 重新匹配并更新缓存。
+
+    :param browser: "chrome" 或 "edge"
+    :param install_func: 匹配并安装驱动的函数，返回驱动路径（如 ChromeDriverManager().install）
+    :param refresh: 为 True 时忽略缓存，强制重新匹配
+    :return: (驱动路径, 是否来自缓存)
+    """
+    version = browser_version(browser)
+    with _lock:
+        entry = _load_cache().get(browser)
+    if (not refresh and version and entry and entry.get("browser_version") == version
+            and os.path.exists(entry.get("driver_path", ""))):
+        return entry["driver_path"], True
+
+    driver_path = install_func()
+    if version:
+        with _lock:
+            cache = _load_cache()
+            cache[browser] = {
+                "browser_version": version,
+                "driver_path": driver_path,
+                "resolved_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            _save_cache(cache)
+    return driver_path, False
+
+
+def clear_driver_cache(browser=None):
+    """清除驱动缓存（浏览器更新后驱动无法启动等情况），browser 为 None 时清除全部"""
+    with _lock:
+        cache = _load_cache()
+        if browser is None:
+            cache = {}
+        else:
+            cache.pop(browser, None)
+        _save_cache(cache)
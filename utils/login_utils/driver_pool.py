@@ -0,0 +1,223 @@
+# driver_pool.py
+import atexit
+import threading
+import time
+from utils.login_utils.browser_setup import create_driver
+from utils.login_utils.browser_profile import ProfileLock
+
+# 浏览器实例最长使用时间（秒），超过后不再复用，避免长时间运行的浏览器内存膨胀、会话过期
+DRIVER_MAX_LIFETIME = 30 * 60
+# 空闲的浏览器最多保留多久（秒）
+DRIVER_MAX_IDLE = 10 * 60
+# 同时保留的空闲浏览器数量上限（所有站点合计）
+MAX_IDLE_DRIVERS = 3
+
+
+class _PooledDriver:
+    def __init__(self, driver, key, profile_lock=None):
+        self.driver = driver
+        self.key = key
+        self.profile_lock = profile_lock  # 使用持久化配置目录时持有的锁，浏览器关闭后释放
+        self.lease_args = {}  # 最近一次租用时的参数，重启浏览器时沿用
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+
+class DriverPool:
+    """
+    预热浏览器池：按站点方案（站点名 + 是否无头 + 是否读取网络响应 + 是否使用持久化配置）保留已启动、已登录的浏览器，
+    爬虫开始时租用，结束时归还，下一次运行直接复用，省去启动浏览器、匹配驱动和登录的时间。
+
+    租出前检查浏览器是否仍然可用；超过最长使用时间或空闲时间的浏览器直接关闭，重新启动。
+    空闲的浏览器由后台线程在到期后关闭，有头浏览器的窗口不会在运行结束后一直留着，持久化配置目录的锁也会及时释放。
+    """
+
+    def __init__(self, max_lifetime=DRIVER_MAX_LIFETIME, max_idle=DRIVER_MAX_IDLE, max_idle_drivers=MAX_IDLE_DRIVERS):
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.max_idle_drivers = max_idle_drivers
+        self._lock = threading.Lock()
+        self._idle = []    # 空闲的 _PooledDriver，按归还时间排序
+        self._leased = {}  # id(driver) -> 租出中的 _PooledDriver
+        self._reaper_cond = threading.Condition(self._lock)  # 有新的空闲浏览器时唤醒回收线程
+        self._reaper_thread = None
+
+    def lease(self, profile, log_signal=None, headless=True, login=None, network_capture=False,
+              persistent_profile=False):
+        """
+        租用一个浏览器。
+
+        :param profile: 站点方案名，例如 "xhs"；同一方案的浏览器带有该站点的登录状态和资源屏蔽方案
+        :param headless: 是否无头模式（有头和无头的浏览器不能互相复用）
+        :param login: 新启动浏览器时调用的登录函数 login(driver)，复用已登录的浏览器时不再调用
+        :param network_capture: 是否开启网络响应读取（见 network_capture.NetworkCapture）
+        :param persistent_profile: 是否使用站点的持久化浏览器配置目录（登录状态跨程序重启保留）；
+                                   配置目录正被其他浏览器使用时，改用临时的隐身浏览器
+        :return: WebDriver
+        """
+        key = (profile, headless, network_capture, persistent_profile)
+        lease_args = dict(profile=profile, headless=headless, login=login, network_capture=network_capture,
+                          persistent_profile=persistent_profile)
+        while True:
+            entry = self._take_idle(key)
+            if entry is None:
+                break
+            if self._is_healthy(entry):
+                self._log(log_signal, "复用已启动的浏览器")
+                return self._mark_leased(entry, lease_args)
+            self._quit(entry)
+
+        started = time.monotonic()
+        profile_lock = None
+        if persistent_profile:
+            profile_lock = ProfileLock(profile)
+            if not profile_lock.acquire():
+                self._log(log_signal, f"{profile} 的浏览器配置正在被另一个浏览器使用，本次使用临时浏览器")
+                profile_lock = None
+        try:
+            driver = create_driver(log_signal=log_signal, headless=headless, resource_policy=profile,
+                                   network_capture=network_capture, profile=profile if profile_lock else None)
+        except BaseException:
+            if profile_lock:
+                profile_lock.release()
+            raise
+        entry = _PooledDriver(driver, key, profile_lock)
+        try:
+            if login:
+                login(driver)
+        except BaseException:
+            self._quit(entry)
+            raise
+        self._log(log_signal, f"浏览器启动完成，用时 {time.monotonic() - started:.1f} 秒")
+        return self._mark_leased(entry, lease_args)
+
+    def release(self, driver, healthy=True):
+        """
+        归还浏览器。
+
+        :param healthy: 调用方发现浏览器已异常（崩溃、卡死）时传入 False，直接关闭
+        """
+        with self._lock:
+            entry = self._leased.pop(id(driver), None)
+        if entry is None:
+            try:
+                driver.quit()  # 不是从池中租出的浏览器（或重启失败、已被关闭的浏览器）
+            except Exception:
+                pass
+            return
+        entry.last_used = time.monotonic()
+        if not healthy or self._expired(entry) or not self._reset(entry):
+            self._quit(entry)
+            return
+
+        with self._reaper_cond:
+            self._idle.append(entry)
+            evicted = self._idle[:-self.max_idle_drivers] if len(self._idle) > self.max_idle_drivers else []
+            self._idle = self._idle[len(evicted):]
+            if self._reaper_thread is None:
+                self._reaper_thread = threading.Thread(target=self._reap_loop, name="DScraperDriverReaper",
+                                                       daemon=True)
+                self._reaper_thread.start()
+            self._reaper_cond.notify()
+        for old_entry in evicted:
+            self._quit(old_entry)
+
+    def recycle(self, driver, log_signal=None):
+        """
+        关闭正在使用的浏览器，按租用时的参数启动一个新的浏览器并登录（见 DriverWatchdog）。
+
+        :return: 新的 WebDriver；不是从池中租出的浏览器无法按原参数重启，原样返回
+        """
+        with self._lock:
+            entry = self._leased.pop(id(driver), None)
+        if entry is None:
+            return driver
+        self._quit(entry)  # 先关闭旧浏览器，释放内存和持久化配置目录的锁
+        return self.lease(log_signal=log_signal, **entry.lease_args)
+
+    def shutdown(self):
+        """关闭所有空闲的浏览器（程序退出时调用）"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._quit(entry)
+
+    def _reap_loop(self):
+        """单个后台线程负责关闭空闲超时（或超过最长使用时间）的浏览器，等到最早到期的浏览器到期时再检查"""
+        while True:
+            with self._reaper_cond:
+                while True:
+                    expired = [entry for entry in self._idle if self._expired(entry)]
+                    if expired:
+                        break
+                    deadline = min((self._expires_at(entry) for entry in self._idle), default=None)
+                    timeout = max(deadline - time.monotonic(), 0) + 1 if deadline is not None else None
+                    self._reaper_cond.wait(timeout)
+                self._idle = [entry for entry in self._idle if entry not in expired]
+            for entry in expired:
+                self._quit(entry)
+
+    def _take_idle(self, key):
+        with self._lock:
+            for index in range(len(self._idle) - 1, -1, -1):
+                if self._idle[index].key == key:
+                    return self._idle.pop(index)
+        return None
+
+    def _mark_leased(self, entry, lease_args):
+        entry.lease_args = lease_args
+        with self._lock:
+            self._leased[id(entry.driver)] = entry
+        return entry.driver
+
+    def _expired(self, entry):
+        now = time.monotonic()
+        return now - entry.created > self.max_lifetime or now - entry.last_used > self.max_idle
+
+    def _expires_at(self, entry):
+        return min(entry.created + self.max_lifetime, entry.last_used + self.max_idle)
+
+    def _is_healthy(self, entry):
+        """浏览器未过期，且仍能响应脚本调用"""
+        if self._expired(entry):
+            return False
+        try:
+            return entry.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _reset(self, entry):
+        """归还前关闭多余的标签页，只保留一个，返回浏览器是否仍然可用"""
+        driver = entry.driver
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, entry):
+        try:
+            entry.driver.quit()
+        except Exception:
+            pass  # 浏览器可能已经崩溃或被关闭
+        if entry.profile_lock:
+            entry.profile_lock.release()
+
+    def _log(self, log_signal, message):
+        if log_signal:
+            log_signal.emit(message)
+        else:
+            print(message)
+
+
+_pool = DriverPool()
+atexit.register(_pool.shutdown)
+
+
+def get_driver_pool():
+    """获取进程内共享的浏览器池（所有标签页共用）"""
+    return _pool
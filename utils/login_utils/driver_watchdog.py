@@ -0,0 +1,116 @@
+# driver_watchdog.py
+import logging
+from utils.login_utils.driver_pool import get_driver_pool
+
+try:
+    import psutil  # 可选依赖：安装 psutil 后才能读取浏览器进程的内存占用
+except ImportError:
+    psutil = None
+
+# 浏览器所有进程（驱动、主进程、渲染进程等）合计的内存上限（MB）
+BROWSER_MAX_RSS_MB = 2048
+# 当前页面 JS 堆内存上限（MB）
+BROWSER_MAX_HEAP_MB = 512
+# 同一个浏览器最多处理的页面数，达到后无论内存多少都重启
+BROWSER_MAX_PAGES = 200
+# 每处理多少个页面检查一次内存
+WATCHDOG_CHECK_EVERY = 10
+
+logger = logging.getLogger(__name__)
+
+
+def browser_rss_mb(driver):
+    """
+    浏览器驱动进程及其所有子进程（浏览器各进程）的常驻内存合计（MB）。
+    未安装 psutil 或无法获取进程时返回 None。
+    """
+    if psutil is None:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+    except (AttributeError, psutil.Error):
+        return None
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            continue  # 进程已退出
+    return total / 1024 / 1024
+
+
+def js_heap_mb(driver):
+    """通过 DevTools 协议（Performance.getMetrics）读取当前页面已使用的 JS 堆内存（MB），不支持时返回 None"""
+    if not hasattr(driver, "execute_cdp_cmd"):
+        return None
+    try:
+        driver.execute_cdp_cmd("Performance.enable", {})
+        metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+    except Exception as e:
+        logger.debug(f"读取 JS 堆内存失败: {e}")
+        return None
+    for metric in metrics:
+        if metric.get("name") == "JSHeapUsedSize":
+            return metric["value"] / 1024 / 1024
+    return None
+
+
+class DriverWatchdog:
+    """
+    浏览器内存看门狗：长时间运行（逐个处理上百个详情页）时，浏览器内存会不断增长。
+    在两个项目之间（安全点）调用 checkpoint()，处理的页面数达到上限，或浏览器内存、JS 堆内存超过阈值时，
+    通过浏览器池关闭当前浏览器、用相同的参数重新启动并登录，爬虫从下一个项目继续。
+
+    只适用于从浏览器池租用的浏览器；重启后页面状态不保留，下一个项目需要自己打开页面。
+    """
+
+    def __init__(self, driver, log_signal=None, max_pages=BROWSER_MAX_PAGES, max_rss_mb=BROWSER_MAX_RSS_MB,
+                 max_heap_mb=BROWSER_MAX_HEAP_MB, check_every=WATCHDOG_CHECK_EVERY):
+        self.driver = driver
+        self.log_signal = log_signal
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.max_heap_mb = max_heap_mb
+        self.check_every = check_every
+        self.pages = 0  # 当前浏览器已处理的页面数
+        self.restarts = 0
+
+    def checkpoint(self):
+        """
+        在处理下一个项目之前调用，必要时重启浏览器。
+
+        :return: 之后应使用的 WebDriver（没有重启时就是原来的浏览器）
+        """
+        reason = self._restart_reason()
+        self.pages += 1
+        if reason is None:
+            return self.driver
+
+        self._log(f"浏览器{reason}，正在重启浏览器...")
+        self.driver = get_driver_pool().recycle(self.driver, self.log_signal)
+        self.pages = 1
+        self.restarts += 1
+        self._log(f"浏览器已重启（第 {self.restarts} 次），继续处理")
+        return self.driver
+
+    def _restart_reason(self):
+        if self.pages == 0:
+            return None
+        if self.pages >= self.max_pages:
+            return f"已处理 {self.pages} 个页面"
+        if self.pages % self.check_every:
+            return None
+        rss = browser_rss_mb(self.driver)
+        if rss is not None and rss > self.max_rss_mb:
+            return f"内存占用 {rss:.0f} MB，超过 {self.max_rss_mb} MB"
+        heap = js_heap_mb(self.driver)
+        if heap is not None and heap > self.max_heap_mb:
+            return f"JS 堆内存 {heap:.0f} MB，超过 {self.max_heap_mb} MB"
+        return None
+
+    def _log(self, message):
+        if self.log_signal:
+            self.log_signal.emit(message)
+        else:
+            print(message)
@@ -0,0 +1,125 @@
+# network_capture.py
+import re
+import json
+import base64
+import logging
+
+# 开启浏览器性能日志的 capability 名称（日志中包含 DevTools 协议的 Network 事件）
+LOGGING_PREFS_CAPABILITIES = {
+    "chrome": "goog:loggingPrefs",
+    "edge": "ms:loggingPrefs",
+}
+
+logger = logging.getLogger(__name__)
+
+
+def enable_network_capture(options, browser="chrome"):
+    """在启动浏览器前开启性能日志（ChromeOptions / EdgeOptions），之后才能用 NetworkCapture 读取网络响应"""
+    options.set_capability(LOGGING_PREFS_CAPABILITIES[browser], {"performance": "ALL"})
+
+
+class NetworkCapture:
+    """
+    从浏览器的网络流量中读取网站接口返回的数据：页面滚动时浏览器自己发出的 XHR/fetch 请求
+    （如画板的图片列表、搜索结果）已经带有完整的结构化数据和原图地址，直接读取响应内容，
+    不需要再逐个元素解析 DOM。
+
+    浏览器需要用 create_driver(network_capture=True) 启动。性能日志读取一次后即被清空，
+    同一个浏览器同时只应使用一个 NetworkCapture。Safari 等不支持性能日志的浏览器返回空结果，
+    调用方照常使用 DOM 提取即可。
+
+    性能日志包含浏览器所有标签页的事件，而响应内容只能从发出请求的标签页读取：
+    多标签页同时加载时用 watch() 指定当前标签页的接口，其他标签页已完成的响应先保留，轮到它们时再读取。
+    """
+
+    def __init__(self, driver, url_pattern, mime_type="json"):
+        """
+        :param url_pattern: 接口 URL 的正则表达式，例如 r"/v3/boards/\\d+/pins"
+        :param mime_type: 只收集 Content-Type 中包含该字符串的响应
+        """
+        self.driver = driver
+        self.pattern = re.compile(url_pattern)
+        self.mime_type = mime_type
+        self._filter = None  # 只读取 URL 匹配的响应（见 watch），None 表示全部读取
+        self._pending = {}  # requestId -> URL，已收到响应头、响应体尚未接收完成
+        self._finished = []  # [(requestId, URL)]，已接收完成、尚未读取的响应
+        self.available = hasattr(driver, "get_log") and hasattr(driver, "execute_cdp_cmd")
+
+    def clear(self):
+        """丢弃之前的网络事件（导航到新页面前调用，旧页面的响应体已无法读取）"""
+        self._pending.clear()
+        self._finished.clear()
+        self._read_log()
+
+    def watch(self, url_filter=None):
+        """
+        之后只读取 URL 匹配 url_filter 的响应（如切换到另一个画板的标签页），None 表示全部读取。
+        匹配 url_pattern 但不匹配 url_filter 的响应（其他标签页中的画板）继续保留，不会丢失首批数据；
+        上一个 url_filter 匹配的、尚未读取的响应（已处理完的画板）被丢弃。
+        """
+        if self._filter is not None:
+            self._finished = [(request_id, url) for request_id, url in self._finished if not self._filter.search(url)]
+        self._filter = re.compile(url_filter) if url_filter else None
+
+    def responses(self):
+        """
+        返回自上次调用以来新完成的、URL 匹配的响应（设置了 watch 时只返回匹配其过滤条件的）。
+
+        :return: [(URL, 响应文本)]，读取失败的响应（已被浏览器丢弃等）跳过
+        """
+        for message in self._read_log():
+            method = message.get("method")
+            params = message.get("params", {})
+            request_id = params.get("requestId")
+            if method == "Network.responseReceived":
+                response = params.get("response", {})
+                if self.pattern.search(response.get("url", "")) and self.mime_type in response.get("mimeType", ""):
+                    self._pending[request_id] = response["url"]
+            elif method == "Network.loadingFinished" and request_id in self._pending:
+                self._finished.append((request_id, self._pending.pop(request_id)))
+            elif method == "Network.loadingFailed":
+                self._pending.pop(request_id, None)
+
+        finished, kept = [], []
+        for request_id, url in self._finished:
+            (finished if self._filter is None or self._filter.search(url) else kept).append((request_id, url))
+        self._finished = kept
+
+        results = []
+        for request_id, url in finished:
+            try:
+                body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            except Exception as e:
+                logger.debug(f"读取响应内容失败 {url}: {e}")
+                continue
+            text = body.get("body", "")
+            if body.get("base64Encoded"):
+                text = base64.b64decode(text).decode("utf-8", errors="replace")
+            results.append((url, text))
+        return results
+
+    def json_payloads(self):
+        """返回自上次调用以来新完成的 JSON 响应（已解析），无法解析的跳过"""
+        payloads = []
+        for url, text in self.responses():
+            try:
+                payloads.append(json.loads(text))
+            except ValueError:
+                logger.debug(f"响应不是有效的 JSON: {url}")
+        return payloads
+
+    def _read_log(self):
+        if not self.available:
+            return []
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception:
+            self.available = False  # 浏览器未开启性能日志
+            return []
+        messages = []
+        for entry in entries:
+            try:
+                messages.append(json.loads(entry["message"])["message"])
+            except (KeyError, TypeError, ValueError):
+                continue
+        return messages
@@ -0,0 +1,60 @@
+# resource_policy.py
+import logging
+
+# 可以屏蔽的资源类别（Network.setBlockedURLs 的 URL 通配符）
+# 爬虫只读取页面 DOM 中的链接和属性，图片由下载器单独下载，浏览器不需要真正加载这些资源
+BLOCK_PATTERNS = {
+    "images": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*.m4a*"],
+    "fonts": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"],
+    "trackers": [
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*facebook.net*",
+        "*hm.baidu.com*", "*cnzz.com*", "*growingio.com*", "*sensorsdata*", "*hotjar.com*",
+    ],
+}
+
+# 各爬虫的资源屏蔽方案（与浏览器池的站点方案名一致）
+# 需要登录的站点保留图片：登录二维码、验证码是图片，瀑布流的懒加载依赖图片撑开的高度
+RESOURCE_POLICIES = {
+    "archdaily": ("images", "media", "fonts", "trackers"),
+    "gooood": ("images", "media", "fonts", "trackers"),
+    "vcg": ("media", "fonts", "trackers"),            # 懒加载脚本在图片加载完成后才标记元素，需要图片
+    "pinterest": ("media", "fonts", "trackers"),      # 瀑布流按图片高度布局，懒加载需要图片
+    "xhs": ("media", "fonts", "trackers"),
+    "huaban": ("media", "fonts", "trackers"),
+    "znzmo": ("media", "fonts", "trackers"),
+    "dianping": ("media", "fonts", "trackers"),
+}
+
+logger = logging.getLogger(__name__)
+
+
+def blocked_patterns(policy):
+    """
+    把资源屏蔽方案转换成 URL 通配符列表。
+
+    :param policy: 爬虫名（见 RESOURCE_POLICIES）或资源类别的元组，None 表示不屏蔽
+    """
+    if policy is None:
+        return []
+    categories = RESOURCE_POLICIES.get(policy, ()) if isinstance(policy, str) else policy
+    return [pattern for category in categories for pattern in BLOCK_PATTERNS[category]]
+
+
+def apply_resource_policy(driver, policy):
+    """
+    通过 Chrome DevTools 协议（Network.setBlockedURLs）让浏览器不再请求被屏蔽的资源，
+    减少页面加载时间和浏览器内存占用。可以随时再次调用以切换方案（传入 None 取消屏蔽）。
+    不支持 DevTools 协议的浏览器（Safari）保持原样。
+
+    :return: 是否已生效
+    """
+    if not hasattr(driver, "execute_cdp_cmd"):
+        return False
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_patterns(policy)})
+        return True
+    except Exception as e:
+        logger.warning(f"设置资源屏蔽失败: {e}")
+        return False
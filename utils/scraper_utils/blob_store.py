@@ -0,0 +1,203 @@
+# blob_store.py
+import os
+import shutil
+import sqlite3
+import hashlib
+import platform
+import threading
+import time
+from utils.scraper_utils.download_journal import find_run_root
+from utils.scraper_utils.http_cache import CACHE_MAX_BYTES
+
+# 内容寻址存储目录名，放在保存路径（各次运行输出文件夹的上一级）下，保证与输出文件在同一磁盘以便硬链接
+STORE_DIR_NAME = ".DScraper_store"
+# 超出容量上限时淘汰到上限的多少比例，留出余量，避免每收入一张图片都要淘汰一次
+EVICT_TARGET_RATIO = 0.9
+
+
+def new_hasher():
+    """内容哈希算法（下载时边接收边计算）"""
+    return hashlib.sha256()
+
+
+class BlobStore:
+    """
+    内容寻址的图片存储：每张图片按内容 sha256 只保存一份，各次运行的输出文件通过 reflink/硬链接指向它。
+
+    同时记录 URL -> 哈希 的索引以及 HTTP 缓存校验信息（ETag / Last-Modified / 过期时间），
+    已知 URL 的图片只需条件请求验证甚至无需请求；
+    不同关键词、不同运行、小红书不同帖子中重复出现的同一张图片只占用一份磁盘空间。
+    """
+
+    # urls 表的缓存相关列（旧版本的库会自动补齐）
+    _CACHE_COLUMNS = {"etag": "TEXT", "last_modified": "TEXT", "expires": "REAL", "last_used": "REAL"}
+
+    def __init__(self, root, max_bytes=None):
+        """
+        :param max_bytes: 容量上限，收入新对象后总大小超过上限时按 LRU 淘汰；None 表示不限制
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(root, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, digest TEXT NOT NULL, size INTEGER, updated REAL)"
+        )
+        existing_columns = {row["name"] for row in self._db.execute("PRAGMA table_info(urls)")}
+        for column, column_type in self._CACHE_COLUMNS.items():
+            if column not in existing_columns:
+                self._db.execute(f"ALTER TABLE urls ADD COLUMN {column} {column_type}")
+        self._db.commit()
+        self._size = self.total_size()  # 当前总大小，收入和淘汰时同步更新
+
+    def object_path(self, digest):
+        """对象文件路径：objects/ab/abcdef..."""
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def lookup_entry(self, url):
+        """返回 URL 的索引记录（dict），没有记录或对象文件已丢失时返回 None"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM urls WHERE url = ?", (url,)).fetchone()
+        if row and os.path.exists(self.object_path(row["digest"])):
+            return dict(row)
+        return None
+
+    def link(self, url, digest, file_name, validators=None):
+        """把已有对象链接到 file_name，并更新该 URL 的最近使用时间（及新的校验信息）"""
+        link_file(self.object_path(digest), file_name)
+        with self._lock:
+            self._db.execute("UPDATE urls SET last_used = ? WHERE url = ?", (time.time(), url))
+            if validators:
+                self._update_validators(url, validators)
+            self._db.commit()
+
+    def ingest(self, temp_file, file_name, url, digest, validators=None):
+        """
+        把下载完成的临时文件收入库中并链接到 file_name。
+        内容已存在时丢弃临时文件，只建立链接。
+
+        :param validators: HTTP 缓存校验信息 {"etag", "last_modified", "expires"}
+        """
+        object_path = self.object_path(digest)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        size = os.path.getsize(temp_file)
+        now = time.time()
+        with self._lock:
+            if os.path.exists(object_path):
+                os.remove(temp_file)
+            else:
+                os.replace(temp_file, object_path)
+                self._size += size
+            self._db.execute(
+                "INSERT OR REPLACE INTO urls (url, digest, size, updated, last_used) VALUES (?, ?, ?, ?, ?)",
+                (url, digest, size, now, now)
+            )
+            if validators:
+                self._update_validators(url, validators)
+            self._db.commit()
+            over_limit = self.max_bytes is not None and self._size > self.max_bytes
+        link_file(object_path, file_name)
+        if over_limit:
+            # 长时间运行（多次爬取）时库会持续增长，超过上限后立即淘汰最久未使用的对象
+            self.evict_lru(int(self.max_bytes * EVICT_TARGET_RATIO))
+
+    def _update_validators(self, url, validators):
+        self._db.execute(
+            "UPDATE urls SET etag = ?, last_modified = ?, expires = ? WHERE url = ?",
+            (validators.get("etag"), validators.get("last_modified"), validators.get("expires"), url)
+        )
+
+    def total_size(self):
+        """库中所有对象的总字节数"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT SUM(size) FROM (SELECT MAX(size) AS size FROM urls GROUP BY digest)"
+            ).fetchone()
+        return row[0] or 0
+
+    def evict_lru(self, max_bytes):
+        """
+        按最近最少使用（LRU）淘汰对象，直到总大小不超过 max_bytes。
+        已链接到输出文件夹的硬链接副本不受影响。
+
+        :return: 淘汰的对象数量
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT digest, MAX(size) AS size, MAX(COALESCE(last_used, updated)) AS used "
+                "FROM urls GROUP BY digest ORDER BY used ASC"
+            ).fetchall()
+            total = sum(row["size"] or 0 for row in rows)
+            evicted = 0
+            for row in rows:
+                if total <= max_bytes:
+                    break
+                try:
+                    os.remove(self.object_path(row["digest"]))
+                except FileNotFoundError:
+                    pass
+                self._db.execute("DELETE FROM urls WHERE digest = ?", (row["digest"],))
+                total -= row["size"] or 0
+                evicted += 1
+            self._db.commit()
+            self._size = total
+        return evicted
+
+
+def link_file(source, target):
+    """
+    把对象文件放到输出路径：优先 reflink（写时复制，修改输出文件不影响库），
+    其次硬链接，都不支持时退回普通复制。
+    """
+    if os.path.exists(target):
+        os.remove(target)
+    if _reflink(source, target):
+        return
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def _reflink(source, target):
+    """尝试写时复制（Linux btrfs/xfs 的 FICLONE，macOS APFS 的 clonefile），不支持时返回 False"""
+    system = platform.system()
+    try:
+        if system == "Linux":
+            import fcntl
+            FICLONE = 0x40049409
+            with open(source, 'rb') as src, open(target, 'wb') as dst:
+                try:
+                    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                    return True
+                except OSError:
+                    pass
+            os.remove(target)
+        elif system == "Darwin":
+            import ctypes
+            libc = ctypes.CDLL("libc.dylib", use_errno=True)
+            return libc.clonefile(os.fsencode(source), os.fsencode(target), 0) == 0
+    except (OSError, AttributeError):
+        pass
+    return False
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store(folder_path):
+    """获取 folder_path 所在保存路径下的共享内容存储"""
+    base_dir = os.path.dirname(find_run_root(folder_path))
+    root = os.path.join(base_dir, STORE_DIR_NAME)
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = BlobStore(root, max_bytes=CACHE_MAX_BYTES)
+            # 每次启动时打开库，顺便把超出容量上限的旧对象淘汰掉（运行中由 ingest 持续检查）
+            store.evict_lru(CACHE_MAX_BYTES)
+            _stores[root] = store
+        return store
@@ -0,0 +1,108 @@
+# dead_letter.py
+import os
+import json
+import time
+import threading
+from utils.scraper_utils.download_journal import find_run_root
+from utils.scraper_utils.retry_policy import classify_error
+
+# 死信记录文件名，保存在每次运行的输出文件夹根目录
+DEAD_LETTER_FILE_NAME = ".failed_downloads.jsonl"
+
+
+class DeadLetterStore:
+    """
+    重试用尽后仍然失败的下载任务（JSON Lines，只追加写入）。
+
+    每条记录包含 url、相对输出文件夹的文件路径、错误类型、错误信息和已尝试次数；
+    任务之后下载成功时追加一条 resolved 记录。读取时以每个任务的最后一条记录为准。
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.path = os.path.join(root, DEAD_LETTER_FILE_NAME)
+        self._lock = threading.Lock()
+        self._records = {}  # (url, 相对路径) -> 最后一条记录
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 崩溃时最后一行可能只写了一半
+                self._records[(record["url"], record["file"])] = record
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._records[(record["url"], record["file"])] = record
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+                f.flush()
+
+    def add(self, url, file_name, error, attempts):
+        """记录一个放弃重试的任务"""
+        self._append({
+            "url": url,
+            "file": os.path.relpath(file_name, self.root),
+            "error_kind": classify_error(error) if isinstance(error, Exception) else None,
+            "error": str(error),
+            "attempts": attempts,
+            "time": time.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+
+    def resolve(self, url, file_name, reason=None):
+        """
+        任务已下载成功（或确定不需要下载），从死信中移除（没有记录时什么也不做）
+
+        :param reason: 不是下载成功时的原因，如 "probe_skipped"（探测后不符合站点的下载要求）
+        """
+        key = (url, os.path.relpath(file_name, self.root))
+        with self._lock:
+            record = self._records.get(key)
+        if record and not record.get("resolved"):
+            resolved = {"url": url, "file": key[1], "resolved": True, "time": time.strftime('%Y-%m-%d %H:%M:%S')}
+            if reason:
+                resolved["reason"] = reason
+            self._append(resolved)
+
+    def entries(self):
+        """返回所有仍未解决的失败任务，file 为绝对路径"""
+        with self._lock:
+            return [dict(record, file=os.path.join(self.root, record["file"]))
+                    for record in self._records.values() if not record.get("resolved")]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_dead_letter_store(folder_path):
+    """获取 folder_path 所属运行的死信记录（同一运行的所有子文件夹共用一个）"""
+    root = find_run_root(folder_path)
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = DeadLetterStore(root)
+            _stores[root] = store
+        return store
+
+
+def find_failed_runs(base_dir):
+    """
+    查找有未解决失败任务的运行文件夹。
+
+    :param base_dir: 保存路径（其下每个子文件夹是一次运行），也可以直接是某一次运行的输出文件夹
+    :return: 运行文件夹路径列表
+    """
+    candidates = [base_dir]
+    try:
+        candidates += [os.path.join(base_dir, name) for name in sorted(os.listdir(base_dir))]
+    except OSError:
+        return []
+    return [path for path in candidates
+            if os.path.isfile(os.path.join(path, DEAD_LETTER_FILE_NAME)) and get_dead_letter_store(path).entries()]
@@ -0,0 +1,71 @@
+# dom_extract.py
+
+# 在浏览器中一次性提取所有匹配元素的字段，结果以 JSON 返回（只需一次 WebDriver 往返）
+# arguments: [元素 XPath, 字段定义, 上下文元素（可为 null）]
+_EXTRACT_SCRIPT = """
+const [xpath, fields, context] = arguments;
+const root = context || document;
+
+function nodes(path, base) {
+    const snapshot = document.evaluate(path, base, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const result = [];
+    for (let i = 0; i < snapshot.snapshotLength; i++) {
+        result.push(snapshot.snapshotItem(i));
+    }
+    return result;
+}
+
+function read(element, what) {
+    if (what === 'text') {
+        return (element.innerText || element.textContent || '').trim();
+    }
+    // "@href"：与 Selenium 的 get_attribute 一致，src/href 等属性返回解析后的绝对 URL
+    const name = what.slice(1);
+    if (!element.hasAttribute(name)) {
+        return null;
+    }
+    return typeof element[name] === 'string' ? element[name] : element.getAttribute(name);
+}
+
+return nodes(xpath, root).map(element => {
+    if (typeof fields === 'string') {
+        return read(element, fields);
+    }
+    const item = {};
+    for (const [key, spec] of Object.entries(fields)) {
+        if (typeof spec === 'string') {
+            item[key] = read(element, spec);
+        } else {
+            const child = nodes(spec[0], element)[0];
+            item[key] = child ? read(child, spec[1]) : null;
+        }
+    }
+    return item;
+});
+"""
+
+
+def extract_all(driver, xpath, fields, context=None):
+    """
+    对页面上所有匹配 xpath 的元素按 fields 提取数据，整页只执行一次 execute_script，
+    代替逐个元素调用 get_attribute / find_element（每次调用都是一次与浏览器驱动的 HTTP 往返）。
+
+    字段写法：
+      "text"                        元素的可见文本（去掉首尾空白）
+      "@href"                       元素的属性，src/href 返回绝对 URL，与 get_attribute 一致
+      (".//a[@class='name']", "text")  元素内第一个匹配相对 XPath 的子元素的文本或属性
+
+    :param driver: WebDriver
+    :param xpath: 元素的 XPath（有 context 时可以是相对路径，如 ".//div"）
+    :param fields: 单个字段（返回值列表），或 {字段名: 字段写法} 字典（返回字典列表）；找不到的字段为 None
+    :param context: 可选的 WebElement，在该元素内查找
+    :return: 按页面顺序排列的列表
+    """
+    if isinstance(fields, dict):
+        fields = {key: list(spec) if isinstance(spec, tuple) else spec for key, spec in fields.items()}
+    return driver.execute_script(_EXTRACT_SCRIPT, xpath, fields, context) or []
+
+
+def extract_values(driver, xpath, field="@href", context=None):
+    """提取所有匹配元素的单个字段，去掉空值"""
+    return [value for value in extract_all(driver, xpath, field, context) if value]
@@ -0,0 +1,197 @@
+# download_engine.py
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+# 边滚动边下载时，每个批次最多积压的未完成任务数
+STREAM_MAX_PENDING = 64
+
+
+class RetryLater(Exception):
+    """
+    下载函数抛出该异常表示需要稍后重试：引擎在 delay 秒后以 func(url, *args, **kwargs) 重新执行，
+    等待期间不占用工作线程和域名并发名额，任务仍计入所属批次的未完成数。
+    """
+
+    def __init__(self, delay, func, *args, **kwargs):
+        super().__init__(f"{delay:.1f} 秒后重试")
+        self.delay = delay
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+
+class DownloadEngine:
+    """
+    共享下载引擎：有界线程池 + 每个域名的并发上限。
+
+    爬虫通过 DownloadBatch 提交下载任务后立即继续翻页/滚动，
+    在每个项目或每一页结束时调用 batch.join() 等待本批任务全部完成。
+    同一域名超过并发上限的任务会在引擎内部排队，不会占用工作线程。
+    """
+
+    def __init__(self, max_workers=8, per_host_limit=4):
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="DScraperDownload")
+        self._lock = threading.Lock()
+        self._host_active = {}  # 每个域名正在执行的任务数
+        self._host_queues = {}  # 每个域名等待执行的任务队列
+        self._timers = []  # 等待重试的任务堆: (到期时间, 序号, 任务)
+        self._timer_seq = itertools.count()
+        self._timer_cond = threading.Condition(self._lock)
+        self._timer_thread = None
+
+    def new_batch(self, log_signal=None, max_pending=None, post_processor=None):
+        """
+        创建一个新的任务批次，每个项目/每一页使用一个批次作为 join 点。
+
+        :param max_pending: 本批次最多积压的未完成任务数，超过时 submit 会阻塞（有界队列），None 表示不限制
+        :param post_processor: 可选的 PostProcessor，下载完成的文件会交给它在进程池中后处理
+        """
+        return DownloadBatch(self, log_signal, max_pending, post_processor)
+
+    def _submit(self, batch, func, url, args, kwargs):
+        """按域名并发上限调度任务"""
+        host = urlparse(url).netloc
+        job = (batch, func, url, args, kwargs)
+        with self._lock:
+            if self._host_active.get(host, 0) < self.per_host_limit:
+                self._host_active[host] = self._host_active.get(host, 0) + 1
+            else:
+                self._host_queues.setdefault(host, deque()).append(job)
+                return
+        self._executor.submit(self._run, host, job)
+
+    def _run(self, host, job):
+        """在工作线程中执行任务，完成后调度同一域名的下一个任务"""
+        batch, func, url, args, kwargs = job
+        retry = None
+        try:
+            saved_file = func(url, *args, **kwargs)
+            if saved_file and batch.post_processor:
+                batch.post_processor.submit(saved_file)  # 只提交任务，解码和编码在子进程中进行
+        except RetryLater as e:
+            retry = e
+        except Exception as e:
+            batch._record_error(url, e)
+        finally:
+            if retry is None:
+                batch._task_done()
+            self._dispatch_next(host)
+        if retry is not None:
+            self._schedule(retry.delay, (batch, retry.func, url, retry.args, retry.kwargs))
+
+    def _schedule(self, delay, job):
+        """把任务放入定时堆，到期后重新按域名并发上限调度"""
+        with self._timer_cond:
+            heapq.heappush(self._timers, (time.monotonic() + delay, next(self._timer_seq), job))
+            if self._timer_thread is None:
+                self._timer_thread = threading.Thread(target=self._timer_loop, name="DScraperRetryTimer",
+                                                      daemon=True)
+                self._timer_thread.start()
+            self._timer_cond.notify()
+
+    def _timer_loop(self):
+        """单个后台线程负责所有延迟重试，避免工作线程在原地 sleep"""
+        while True:
+            with self._timer_cond:
+                while not self._timers or self._timers[0][0] > time.monotonic():
+                    timeout = self._timers[0][0] - time.monotonic() if self._timers else None
+                    self._timer_cond.wait(timeout)
+                _, _, job = heapq.heappop(self._timers)
+            batch, func, url, args, kwargs = job
+            self._submit(batch, func, url, args, kwargs)
+
+    def _dispatch_next(self, host):
+        with self._lock:
+            queue = self._host_queues.get(host)
+            if queue:
+                next_job = queue.popleft()
+                if not queue:
+                    del self._host_queues[host]
+            else:
+                self._host_active[host] -= 1
+                if self._host_active[host] <= 0:
+                    del self._host_active[host]
+                return
+        self._executor.submit(self._run, host, next_job)
+
+    def shutdown(self, wait=True):
+        """关闭引擎（程序退出时调用）"""
+        self._executor.shutdown(wait=wait)
+
+
+class DownloadBatch:
+    """
+    一批下载任务（例如一个项目或一页图片），提供 submit/join 接口。
+    """
+
+    def __init__(self, engine, log_signal=None, max_pending=None, post_processor=None):
+        self.engine = engine
+        self.log_signal = log_signal
+        self.max_pending = max_pending
+        self.post_processor = post_processor
+        self.errors = []
+        self._pending = 0
+        self._cond = threading.Condition()
+
+    def submit(self, func, url, *args, **kwargs):
+        """
+        提交一个下载任务，立即返回。
+
+        :param func: 下载函数，第一个参数必须是图片 URL（如 download_project_image），成功时返回保存的文件路径
+        :param url: 图片 URL，用于按域名限流
+        """
+        with self._cond:
+            if self.max_pending:
+                # 积压任务过多时等待，避免滚动发现 URL 的速度远超下载速度
+                self._cond.wait_for(lambda: self._pending < self.max_pending)
+            self._pending += 1
+        self.engine._submit(self, func, url, args, kwargs)
+
+    def join(self, timeout=None):
+        """
+        等待本批次所有任务完成。
+
+        :param timeout: 最长等待秒数，None 表示一直等待
+        :return: 本批次是否已全部完成
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    @property
+    def pending(self):
+        """本批次尚未完成的任务数"""
+        with self._cond:
+            return self._pending
+
+    def _task_done(self):
+        with self._cond:
+            self._pending -= 1
+            self._cond.notify_all()
+
+    def _record_error(self, url, error):
+        self.errors.append((url, error))
+        message = f"图片下载失败: {url}，错误: {error}"
+        if self.log_signal:
+            self.log_signal.emit(message)
+        else:
+            print(message)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_download_engine():
+    """获取进程内共享的下载引擎（所有标签页的爬虫共用）"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = DownloadEngine()
+        return _engine
@@ -3,94 +3,330 @@ import os
 import re
 import requests
 import time
+from urllib.parse import urlparse
+from utils.scraper_utils.http_transport import http_get
+from utils.scraper_utils.download_engine import get_download_engine, RetryLater
+from utils.scraper_utils.retry_policy import get_retry_policy, get_circuit_breaker, classify_error, HOST_FAILURES
+from utils.scraper_utils.download_journal import get_journal, STATE_PENDING, STATE_DONE, STATE_FAILED, STATE_SKIPPED
+from utils.scraper_utils.dead_letter import get_dead_letter_store
+from utils.scraper_utils.blob_store import get_blob_store, new_hasher
+from utils.scraper_utils.rate_governor import get_rate_governor
+from utils.scraper_utils.image_validator import StreamValidator, InvalidImageError, sniff_file
+from utils.scraper_utils.stream_writer import write_response
+from utils.scraper_utils.ranged_download import should_split, download_segments, RangeNotSupported
+from utils.scraper_utils.image_probe import probe_rule_for, probe_image, rejection_reason
+from utils.scraper_utils.http_cache import parse_validators, conditional_headers, is_fresh, has_validators
 
+# 是否按 Content-Length 预分配文件空间（开启后中断的 .part 文件无法按长度断点续传，默认关闭）
+PREALLOCATE_FILES = False
 
-def download_project_image(url_slideshow, folder_path, image_number, log_signal=None, retries=4, delay=2, prefix=""):
-    """下载图片，带重试机制"""
-    for attempt in range(retries):
-        try:
-            response = requests.get(url_slideshow, stream=True)
-            response.raise_for_status()  # 如果响应码不是200，会引发异常
-            # 构建文件名，添加前缀
-            file_name = os.path.join(folder_path, f"{prefix}image_{image_number}.jpg")
-            # 保存图片到本地
-            with open(file_name, 'wb') as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    file.write(chunk)
-            # 获取文件名（不包含路径）
-            short_file_name = os.path.basename(file_name)
-            # 通过信号发送下载成功的日志
-            if log_signal:
-                log_signal.emit(f"<font color='#2BC840'>图片下载成功:{short_file_name}")
-            else:
-                print(f"图片下载成功:{short_file_name}")
-            return  # 下载成功后退出
-        except requests.exceptions.RequestException as e:
-            # 通过信号发送下载失败的日志
-            if log_signal:
-                log_signal.emit(f"下载图片失败: {e}，尝试 {attempt + 1}/{retries}")
-            else:
-                print(f"下载图片失败: {e}，尝试 {attempt + 1}/{retries}")
-            time.sleep(delay)  # 等待后重试
 
+def _log(log_signal, message):
+    """通过信号发送日志，没有信号时直接打印"""
     if log_signal:
-        log_signal.emit(f"下载图片失败: {url_slideshow}，已重试 {retries} 次")
+        log_signal.emit(message)
     else:
-        print(f"下载图片失败: {url_slideshow}，已重试 {retries} 次")
+        print(message)
 
 
-def download_vcg_image(url_slideshow, folder_path, page_number, image_number, log_signal, retries=4, delay=2):
-    """下载 VCG 图片，带重试机制"""
-    for attempt in range(retries):
+def _hash_existing(part_file, hasher, validator):
+    """续传前先把已下载部分计入哈希和校验"""
+    with open(part_file, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            hasher.update(chunk)
+            validator.feed(chunk)
+
+
+def _with_extension(file_name, extension):
+    """按图片的真实格式替换文件扩展名（文件名默认都是 .jpg）"""
+    if not extension:
+        return file_name
+    return os.path.splitext(file_name)[0] + extension
+
+
+def _expected_size(response, offset):
+    """根据 Content-Length 计算完整文件应有的字节数；内容经过压缩编码时无法判断，返回 None"""
+    content_length = response.headers.get("Content-Length")
+    if not content_length or response.headers.get("Content-Encoding", "identity") != "identity":
+        return None
+    return offset + int(content_length)
+
+
+def _fetch_to_file(url, file_name, store, cached=None):
+    """
+    下载到 file_name.part，边下载边计算内容哈希并校验图片完整性，完成后收入内容存储，
+    按真实格式修正扩展名后链接到输出路径。
+    如果 .part 文件已存在（上次中断），使用 HTTP Range 从断点继续下载；
+    大文件且服务器支持 Range 时分段并行下载，不支持时退回单连接下载。
+
+    :param cached: 该 URL 在内容存储中的缓存记录，有时发送条件请求，服务器返回 304 则直接使用本地副本
+    :return: (实际保存的文件路径, 是否由本地缓存副本满足（304）)
+    """
+    part_file = file_name + ".part"
+    offset = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+    if offset:
+        headers = {"Range": f"bytes={offset}-"}
+    elif cached:
+        headers = conditional_headers(cached)
+    else:
+        headers = None
+    hasher = new_hasher()
+    governor = get_rate_governor()
+
+    governor.acquire(url)  # 与同域名的其他下载、浏览器导航共用请求配额
+    response = http_get(url, stream=True, headers=headers)  # 走共享连接池，复用长连接
+    with response:
+        if cached and not offset and response.status_code == 304:
+            # 服务器确认内容未变化：沿用本地对象，只刷新校验信息和新鲜期
+            validators = parse_validators(response.headers)
+            validators["etag"] = validators["etag"] or cached.get("etag")
+            validators["last_modified"] = validators["last_modified"] or cached.get("last_modified")
+            saved_file = _with_extension(file_name, sniff_file(store.object_path(cached["digest"])))
+            store.link(url, cached["digest"], saved_file, validators)
+            return saved_file, True
+        if offset and response.status_code == 416:
+            # 断点已失效（例如服务器上的文件变了），删除 .part 后由下一次尝试从头下载
+            os.remove(part_file)
+            raise requests.exceptions.HTTPError(f"断点续传范围无效: {url}")
+        response.raise_for_status()  # 如果响应码不是200，会引发异常
+
+        # 服务器支持 Range 时返回 206，追加写入；否则返回 200，从头写入
+        mode = 'ab' if offset and response.status_code == 206 else 'wb'
+        expected_size = _expected_size(response, offset if mode == 'ab' else 0)
+        validator = StreamValidator(expected_size)
+
+        def on_chunk(chunk):
+            hasher.update(chunk)
+            validator.feed(chunk)  # HTML 错误页、损坏数据在接收过程中就能发现
+            governor.consume(url, len(chunk))
+
+        validators = parse_validators(response.headers)
+        single_stream_fallback = False
+        if mode == 'wb' and should_split(url, response, expected_size):
+            # 分段写入单独的临时文件（各段位置不连续，不能按 .part 长度续传），完成后再整体校验
+            segments_file = file_name + ".segments"
+            try:
+                download_segments(url, response, segments_file, expected_size)
+                _hash_existing(segments_file, hasher, validator)
+                extension = validator.close()
+                os.replace(segments_file, part_file)
+            except RangeNotSupported:
+                os.remove(segments_file)
+                single_stream_fallback = True
+            except BaseException:
+                os.remove(segments_file)
+                raise
+        else:
+            try:
+                if mode == 'ab':
+                    _hash_existing(part_file, hasher, validator)
+                with open(part_file, mode) as file:
+                    preallocate_size = expected_size if PREALLOCATE_FILES and mode == 'wb' else None
+                    write_response(response, file, on_chunk, preallocate_size)
+                extension = validator.close()  # 检查长度和图片是否完整
+            except InvalidImageError:
+                # 内容有问题时续传也没有意义，删除后从头下载
+                os.remove(part_file)
+                raise
+
+    if single_stream_fallback:
+        # 服务器声明支持 Range 却没有返回 206：该域名已被记住，改为单连接重新下载
+        return _fetch_to_file(url, file_name, store)
+
+    # 相同内容只在库中保存一份，输出文件为指向它的链接
+    saved_file = _with_extension(file_name, extension)
+    store.ingest(part_file, saved_file, url, hasher.hexdigest(), validators)
+    return saved_file, False
+
+
+def _probe_before_download(url, file_name, rule):
+    """
+    下载前只请求图片开头一小段，判断大小和尺寸是否达到站点阈值。
+
+    :return: 不下载的原因；应当下载时返回 None（已读到的开头会写入 .part，正式下载从断点继续）
+    """
+    try:
+        probe = probe_image(url)
+    except (requests.exceptions.RequestException, OSError):
+        return None  # 探测失败不影响正式下载，由正式下载的重试机制处理
+    reason = rejection_reason(probe, rule)
+    if not reason and probe.ranged and probe.total_size and probe.total_size > len(probe.head):
+        with open(file_name + ".part", 'wb') as file:
+            file.write(probe.head)
+    return reason
+
+
+def _download_with_retries(url_slideshow, file_name, log_signal, retries=4, delay=2, label="", attempt=0):
+    """
+    带重试机制和下载日志记录的通用下载流程（在下载引擎的工作线程中执行）。
+
+    失败后不在原地 sleep，而是按重试策略抛出 RetryLater，由引擎在退避时间后重新调度本函数（attempt + 1）；
+    域名被熔断时直接记为失败，不再请求。放弃重试的任务写入死信记录，之后可通过 retry_failures 单独重试。
+
+    :return: 本次保存的文件路径；跳过或失败时返回 None
+    """
+    journal = get_journal(os.path.dirname(file_name))
+    short_file_name = os.path.basename(file_name)
+
+    if journal.is_done(url_slideshow, file_name):
+        _log(log_signal, f"图片已下载，跳过: {short_file_name}")
+        return
+    if journal.state(url_slideshow, file_name) == STATE_SKIPPED:
+        return  # 之前已探测过，不符合下载要求
+    if not journal.claim(url_slideshow, file_name):
+        return  # 同一文件正在由其他任务下载
+
+    try:
+        # 以前任意一次运行下载过该 URL 时：仍在新鲜期内、或服务器没有给出校验信息（图片 URL 通常不变），
+        # 直接从内容存储链接过来，不再请求网络；否则发送条件请求验证
+        store = get_blob_store(os.path.dirname(file_name))
+        cached = store.lookup_entry(url_slideshow)
+        if cached and (is_fresh(cached) or not has_validators(cached)):
+            saved_file = _with_extension(file_name, sniff_file(store.object_path(cached["digest"])))
+            store.link(url_slideshow, cached["digest"], saved_file)
+            journal.record(url_slideshow, file_name, STATE_DONE, saved=journal.relative(saved_file))
+            _log(log_signal, f"<font color='#2BC840'>{label}图片已存在于本地库，直接复用: {os.path.basename(saved_file)}</font>")
+            return saved_file
+
+        host = urlparse(url_slideshow).netloc
+        breaker = get_circuit_breaker()
+        if not breaker.allow(host):
+            journal.record(url_slideshow, file_name, STATE_FAILED, error="站点熔断中")
+            # 与重试用尽时一致，attempts 记录算上本次在内的尝试次数
+            get_dead_letter_store(os.path.dirname(file_name)).add(url_slideshow, file_name, "站点熔断中", attempt + 1)
+            _log(log_signal, f"下载{label}图片失败: {host} 连续出错，暂时熔断，跳过 {short_file_name}")
+            return
+
+        # allow() 可能放行的是半开状态下的探测请求，之后必须记录成功或失败，
+        # 意外异常时在 finally 中结束探测，否则该域名会一直被拒绝
+        recorded = False
         try:
-            response = requests.get(url_slideshow, stream=True)
-            response.raise_for_status()  # 如果响应码不是200，会引发异常
-            # 构建文件名，加入页码信息
-            file_name = os.path.join(folder_path, f'image_page{page_number}_number{image_number}.jpg')
-            # 保存图片到本地
-            with open(file_name, 'wb') as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    file.write(chunk)
-            # 获取文件名（不包含路径）
-            short_file_name = os.path.basename(file_name)
+            if attempt == 0:
+                rule = probe_rule_for(url_slideshow)
+                if rule and not cached and not os.path.exists(file_name + ".part"):
+                    reason = _probe_before_download(url_slideshow, file_name, rule)
+                    if reason:
+                        breaker.record_success(host)  # 服务器已响应探测请求，说明站点本身正常
+                        recorded = True
+                        journal.record(url_slideshow, file_name, STATE_SKIPPED, error=reason)
+                        # 重试失败任务时被探测排除的，不再留在死信中（否则每次重试都会再探测一次并报告失败）
+                        get_dead_letter_store(os.path.dirname(file_name)).resolve(url_slideshow, file_name, reason="probe_skipped")
+                        _log(log_signal, f"{label}图片{reason}，不下载: {short_file_name}")
+                        return None
+                journal.record(url_slideshow, file_name, STATE_PENDING)
+            try:
+                saved_file, not_modified = _fetch_to_file(url_slideshow, file_name, store, cached)
+            except (requests.exceptions.RequestException, OSError, InvalidImageError) as e:
+                kind = classify_error(e)
+                if kind in HOST_FAILURES and breaker.record_failure(host):
+                    _log(log_signal, f"{host} 连续下载失败，暂停该站点的下载请求 {breaker.reset_timeout:.0f} 秒")
+                elif kind not in HOST_FAILURES:
+                    breaker.record_success(host)  # 服务器有响应（如 404/429），说明站点本身正常
+                recorded = True
+
+                wait = get_retry_policy().next_delay(e, attempt, max_attempts=retries, base_delay=delay)
+                if wait is None:
+                    journal.record(url_slideshow, file_name, STATE_FAILED, error=e)
+                    get_dead_letter_store(os.path.dirname(file_name)).add(url_slideshow, file_name, e, attempt + 1)
+                    _log(log_signal, f"下载{label}图片失败: {url_slideshow}，错误: {e}（已尝试 {attempt + 1} 次）")
+                    return
+                # 通过信号发送下载失败的日志，交给引擎在退避时间后重新调度
+                _log(log_signal, f"下载{label}图片失败: {e}，{wait:.1f} 秒后重试 {attempt + 2}/{retries}")
+                raise RetryLater(wait, _download_with_retries, file_name, log_signal, retries, delay, label,
+                                 attempt=attempt + 1)
+
+            breaker.record_success(host)
+            recorded = True
+            journal.record(url_slideshow, file_name, STATE_DONE, saved=journal.relative(saved_file))
+            get_dead_letter_store(os.path.dirname(file_name)).resolve(url_slideshow, file_name)
+            short_file_name = os.path.basename(saved_file)
             # 通过信号发送下载成功的日志
-            log_signal.emit(f"<font color='#2BC840'>图片下载成功: {short_file_name}")
-            return  # 下载成功后退出
-        except requests.exceptions.RequestException as e:
-            # 通过信号发送下载失败的日志
-            log_signal.emit(f"下载图片失败: {e}，尝试 {attempt + 1}/{retries}")
-            time.sleep(delay)  # 等待后重试
+            if not_modified:
+                _log(log_signal, f"<font color='#2BC840'>{label}图片未变化，使用本地缓存: {short_file_name}</font>")
+            else:
+                _log(log_signal, f"<font color='#2BC840'>{label}图片下载成功: {short_file_name}</font>")
+            return saved_file
+        finally:
+            if not recorded:
+                breaker.release_trial(host)
+    finally:
+        journal.release(url_slideshow, file_name)
+
 
-    log_signal.emit(f"下载图片失败: {url_slideshow}，已重试 {retries} 次")
+def download_project_image(url_slideshow, folder_path, image_number, log_signal=None, retries=4, delay=2, prefix=""):
+    """下载图片，带重试机制"""
+    # 构建文件名，添加前缀
+    file_name = os.path.join(folder_path, f"{prefix}image_{image_number}.jpg")
+    return _download_with_retries(url_slideshow, file_name, log_signal, retries, delay)
+
+
+def download_vcg_image(url_slideshow, folder_path, page_number, image_number, log_signal, retries=4, delay=2):
+    """下载 VCG 图片，带重试机制"""
+    # 构建文件名，加入页码信息
+    file_name = os.path.join(folder_path, f'image_page{page_number}_number{image_number}.jpg')
+    return _download_with_retries(url_slideshow, file_name, log_signal, retries, delay)
 
 
 def download_znzmo_image(url_slideshow, folder_path, page_number, image_number, log_signal, title, retries=4, delay=2):
     """下载 ZNZMO 图片，带重试机制"""
-    for attempt in range(retries):
-        try:
-            response = requests.get(url_slideshow, stream=True)
-            response.raise_for_status()  # 如果响应码不是200，会引发异常
+    # 同一 URL 之前下载过（或下载到一半）时沿用当时的文件名，以便跳过或续传
+    file_name = get_journal(folder_path).find_file(url_slideshow)
+    if not file_name:
+        # 获取当前时间戳，作为文件名的一部分
+        timestamp = int(time.time())
 
-            # 获取当前时间戳，作为文件名的一部分
-            timestamp = int(time.time())
+        # 构建文件名，加入标题、页面、序号和时间戳信息
+        sanitized_title = re.sub(r'[\\/*?:"<>|]', "_", title)  # 去除标题中可能不允许的字符
+        file_name = os.path.join(folder_path, f'{sanitized_title}_page{page_number}_number{image_number}_{timestamp}.jpg')
 
-            # 构建文件名，加入标题、页面、序号和时间戳信息
-            sanitized_title = re.sub(r'[\\/*?:"<>|]', "_", title)  # 去除标题中可能不允许的字符
-            file_name = os.path.join(folder_path, f'{sanitized_title}_page{page_number}_number{image_number}_{timestamp}.jpg')
+    return _download_with_retries(url_slideshow, file_name, log_signal, retries, delay, label="ZNZMO ")
 
-            # 保存图片到本地
-            with open(file_name, 'wb') as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    file.write(chunk)
 
-            # 获取文件名（不包含路径）
-            short_file_name = os.path.basename(file_name)
-            # 通过信号发送下载成功的日志
-            log_signal.emit(f"<font color='#2BC840'>ZNZMO 图片下载成功: {short_file_name}</font>")
-            return  # 下载成功后退出
-        except requests.exceptions.RequestException as e:
-            # 通过信号发送下载失败的日志
-            log_signal.emit(f"下载 ZNZMO 图片失败: {e}，尝试 {attempt + 1}/{retries}")
-            time.sleep(delay)  # 等待后重试
-
-    log_signal.emit(f"下载 ZNZMO 图片失败: {url_slideshow}，已重试 {retries} 次")
+def resume_from_journal(folder_path, log_signal=None, post_processor=None):
+    """
+    把上一次运行中未完成的下载任务重新提交到共享下载引擎（.part 文件会断点续传）。
+
+    :param folder_path: 运行的输出文件夹
+    :param post_processor: 可选的 PostProcessor，续传完成的图片同样进行后处理
+    :return: DownloadBatch，调用方在运行结束前调用 join
+    """
+    batch = get_download_engine().new_batch(log_signal, post_processor=post_processor)
+    unfinished = get_journal(folder_path).unfinished()
+    if unfinished:
+        _log(log_signal, f"发现上次未完成的下载任务 {len(unfinished)} 个，继续下载...")
+    for url, file_name in unfinished:
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        batch.submit(_download_with_retries, url, file_name, log_signal)
+    return batch
+
+
+def retry_failures(folder_paths, log_signal=None, post_processor=None):
+    """
+    把死信记录中的失败任务作为一个批次重新并发下载（不需要重新爬取源页面）。
+
+    :param folder_paths: 运行的输出文件夹列表（可用 dead_letter.find_failed_runs 查找）
+    :param post_processor: 可选的 PostProcessor，下载成功的图片同样进行后处理
+    :return: (重试的任务数, 重试后仍然失败的任务数)
+    """
+    batch = get_download_engine().new_batch(log_signal, post_processor=post_processor)
+    stores = [get_dead_letter_store(folder_path) for folder_path in folder_paths]
+    retried = 0
+    for store in stores:
+        journal = get_journal(store.root)
+        for entry in store.entries():
+            url, file_name = entry["url"], entry["file"]
+            if journal.is_done(url, file_name):
+                store.resolve(url, file_name)  # 已经在其他运行中补下载过
+                continue
+            if journal.state(url, file_name) == STATE_SKIPPED:
+                store.resolve(url, file_name, reason="probe_skipped")  # 之前已探测过，不符合下载要求
+                continue
+            os.makedirs(os.path.dirname(file_name), exist_ok=True)
+            batch.submit(_download_with_retries, url, file_name, log_signal)
+            retried += 1
+    if retried:
+        _log(log_signal, f"正在重试 {retried} 个失败的下载任务...")
+    batch.join()
+    remaining = sum(len(store.entries()) for store in stores)
+    _log(log_signal, f"失败任务重试完成：成功 {retried - remaining} 个，仍然失败 {remaining} 个")
+    return retried, remaining
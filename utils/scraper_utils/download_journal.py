@@ -0,0 +1,135 @@
+# download_journal.py
+import os
+import json
+import time
+import threading
+from utils.file_utils.file_path_and_creat_folder import RUN_INFO_FILE_NAME
+
+# 下载日志文件名，保存在每次运行的输出文件夹根目录
+JOURNAL_FILE_NAME = ".download_journal.jsonl"
+
+# 任务状态
+STATE_PENDING = "pending"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATE_SKIPPED = "skipped"  # 下载前探测发现不符合要求（如图片过小），不需要下载
+
+
+class DownloadJournal:
+    """
+    下载任务日志（JSON Lines，只追加写入）。
+
+    每条记录包含 url、相对输出文件夹的文件路径和状态，读取时以最后一条记录为准。
+    程序崩溃或用户终止后，下一次运行可根据日志跳过已完成的文件、续传未完成的文件。
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.path = os.path.join(root, JOURNAL_FILE_NAME)
+        self._lock = threading.Lock()
+        self._records = {}  # (url, 相对路径) -> 最后一条记录
+        self._in_flight = set()  # 当前进程中正在下载的任务，防止同一文件被并发写入
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 崩溃时最后一行可能只写了一半
+                self._records[(record["url"], record["file"])] = record
+
+    def _key(self, url, file_name):
+        return url, self.relative(file_name)
+
+    def relative(self, file_name):
+        """文件相对本次运行输出文件夹的路径（日志中保存相对路径，整个文件夹移动后仍然有效）"""
+        return os.path.relpath(file_name, self.root)
+
+    def record(self, url, file_name, state, error=None, **extra):
+        """追加一条任务状态记录"""
+        url, rel_file = self._key(url, file_name)
+        record = {"url": url, "file": rel_file, "state": state, "time": time.strftime('%Y-%m-%d %H:%M:%S')}
+        if error:
+            record["error"] = str(error)
+        record.update(extra)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._records[(url, rel_file)] = record
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+                f.flush()
+
+    def state(self, url, file_name):
+        """返回任务的最后状态，没有记录时返回 None"""
+        with self._lock:
+            record = self._records.get(self._key(url, file_name))
+        return record["state"] if record else None
+
+    def saved_file(self, url, file_name):
+        """任务实际保存的文件路径（扩展名按图片真实格式修正过，可能与 file_name 不同）"""
+        with self._lock:
+            record = self._records.get(self._key(url, file_name))
+        if record and record.get("saved"):
+            return os.path.join(self.root, record["saved"])
+        return file_name
+
+    def is_done(self, url, file_name):
+        """任务已完成且文件仍然存在"""
+        return self.state(url, file_name) == STATE_DONE and os.path.exists(self.saved_file(url, file_name))
+
+    def find_file(self, url):
+        """返回该 URL 最近一次记录的文件绝对路径（文件名不固定的下载用于续用同一个文件名）"""
+        with self._lock:
+            files = [rel_file for (record_url, rel_file) in self._records if record_url == url]
+        return os.path.join(self.root, files[-1]) if files else None
+
+    def claim(self, url, file_name):
+        """占用任务，同一任务已在本进程中下载时返回 False"""
+        key = self._key(url, file_name)
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            self._in_flight.add(key)
+            return True
+
+    def release(self, url, file_name):
+        with self._lock:
+            self._in_flight.discard(self._key(url, file_name))
+
+    def unfinished(self):
+        """返回所有未完成的任务 [(url, 文件绝对路径), ...]"""
+        with self._lock:
+            return [(url, os.path.join(self.root, rel_file))
+                    for (url, rel_file), record in self._records.items()
+                    if record["state"] not in (STATE_DONE, STATE_SKIPPED)]
+
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def find_run_root(folder_path):
+    """向上查找本次运行的输出文件夹根目录（含运行信息文件），找不到时返回 folder_path 本身"""
+    path = os.path.abspath(folder_path)
+    while True:
+        if os.path.exists(os.path.join(path, RUN_INFO_FILE_NAME)):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return os.path.abspath(folder_path)
+        path = parent
+
+
+def get_journal(folder_path):
+    """获取 folder_path 所属运行的下载日志（同一运行的所有子文件夹共用一个日志）"""
+    root = find_run_root(folder_path)
+    with _journals_lock:
+        journal = _journals.get(root)
+        if journal is None:
+            journal = DownloadJournal(root)
+            _journals[root] = journal
+        return journal
@@ -0,0 +1,57 @@
+# http_cache.py
+import re
+import time
+from email.utils import parsedate_to_datetime
+
+# 内容存储作为 HTTP 缓存时的容量上限（字节），超过后按最近最少使用淘汰
+CACHE_MAX_BYTES = 20 * 1024 ** 3
+
+
+def parse_validators(headers):
+    """
+    从响应头中提取缓存校验信息。
+
+    :return: {"etag", "last_modified", "expires"}，expires 为新鲜期截止的 Unix 时间戳（没有时为 None）
+    """
+    return {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "expires": _parse_expires(headers),
+    }
+
+
+def _parse_expires(headers):
+    """按 Cache-Control: max-age 或 Expires 计算新鲜期截止时间，no-cache/no-store 视为立即过期"""
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return None
+    match = re.search(r"max-age=(\d+)", cache_control)
+    if match:
+        return time.time() + int(match.group(1))
+    expires = headers.get("Expires")
+    if expires:
+        try:
+            return parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def is_fresh(entry):
+    """缓存记录仍在新鲜期内，可以不发请求直接使用"""
+    return bool(entry.get("expires")) and entry["expires"] > time.time()
+
+
+def has_validators(entry):
+    """缓存记录带有 ETag 或 Last-Modified，可以发送条件请求验证"""
+    return bool(entry.get("etag") or entry.get("last_modified"))
+
+
+def conditional_headers(entry):
+    """根据缓存记录生成条件请求头（If-None-Match / If-Modified-Since）"""
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
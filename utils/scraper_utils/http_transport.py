@@ -0,0 +1,146 @@
+# http_transport.py
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from urllib3.util.request import ACCEPT_ENCODING
+from utils.scraper_utils.request_profiles import headers_for
+
+try:
+    import httpx  # 可选依赖：安装 httpx[http2] 后才支持 HTTP/2
+    import h2  # noqa: F401
+except ImportError:
+    httpx = None
+
+# 连接池参数：缓存的域名连接池数量，以及每个域名保持的长连接数
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 16
+# 默认超时时间：(连接超时, 读取超时)，单位秒
+DEFAULT_TIMEOUT = (10, 60)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Version/14.1.2 Safari/537.36",
+    # urllib3 会根据是否安装 brotli 自动给出 "gzip,deflate" 或 "gzip,deflate,br"，响应会被透明解压
+    "Accept-Encoding": ACCEPT_ENCODING,
+}
+
+_lock = threading.Lock()
+_session = None
+_http2_client = None
+_http2_enabled = False
+_http2_hosts = None  # None 表示对所有域名启用 HTTP/2
+
+
+def get_session():
+    """
+    获取进程内共享的 requests.Session。
+    Session 内部为每个域名维护一个长连接池，同一 CDN 的后续请求不再重复 TCP/TLS 握手。
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            _session = session
+        return _session
+
+
+def configure_http2(enabled=True, hosts=None):
+    """
+    开启/关闭 HTTP/2 多路复用（需要安装 httpx[http2]，未安装时自动退回 HTTP/1.1 长连接池）。
+
+    :param enabled: 是否启用
+    :param hosts: 只对这些域名启用 HTTP/2，None 表示所有域名
+    """
+    global _http2_enabled, _http2_hosts
+    with _lock:
+        _http2_enabled = enabled
+        _http2_hosts = set(hosts) if hosts else None
+
+
+def _use_http2(url):
+    if not _http2_enabled or httpx is None:
+        return False
+    return _http2_hosts is None or urlparse(url).netloc in _http2_hosts
+
+
+def _get_http2_client():
+    global _http2_client
+    with _lock:
+        if _http2_client is None:
+            limits = httpx.Limits(max_connections=POOL_CONNECTIONS * POOL_MAXSIZE,
+                                  max_keepalive_connections=POOL_CONNECTIONS)
+            _http2_client = httpx.Client(http2=True, limits=limits, headers=DEFAULT_HEADERS,
+                                         timeout=httpx.Timeout(DEFAULT_TIMEOUT[1], connect=DEFAULT_TIMEOUT[0]),
+                                         follow_redirects=True)
+        return _http2_client
+
+
+def http_get(url, stream=True, headers=None, timeout=DEFAULT_TIMEOUT):
+    """
+    所有非浏览器请求（图片、页面）的统一入口。
+
+    返回值接口与 requests.Response 一致（status_code、headers、iter_content、raise_for_status、close），
+    出错时抛出 requests.exceptions.RequestException 的子类，调用方无需关心底层走的是 HTTP/1.1 还是 HTTP/2。
+    按域名注册的请求方案（Referer、登录 cookie 等，见 request_profiles.py）会自动附加，调用方传入的同名请求头优先。
+    """
+    profile_headers = headers_for(url)
+    if profile_headers:
+        headers = dict(profile_headers, **(headers or {}))
+    if _use_http2(url):
+        return _http2_get(url, stream=stream, headers=headers)
+    return get_session().get(url, stream=stream, headers=headers, timeout=timeout)
+
+
+def _http2_get(url, stream=True, headers=None):
+    client = _get_http2_client()
+    try:
+        request = client.build_request("GET", url, headers=headers)
+        response = client.send(request, stream=stream)
+    except httpx.HTTPError as e:
+        raise requests.exceptions.ConnectionError(str(e)) from e
+    return _Http2Response(response)
+
+
+class _Http2Response:
+    """把 httpx.Response 包装成 requests.Response 风格的接口"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            self.close()
+            error = requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}")
+            error.response = self
+            raise error
+
+    def iter_content(self, chunk_size=8192):
+        try:
+            yield from self._response.iter_bytes(chunk_size=chunk_size)
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ChunkedEncodingError(str(e)) from e
+        finally:
+            self.close()
+
+    @property
+    def content(self):
+        try:
+            return self._response.read()
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ChunkedEncodingError(str(e)) from e
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,167 @@
+# image_dedup.py
+import os
+import shutil
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from utils.scraper_utils.post_process import DERIVED_DIR_NAMES, CONTACT_SHEET_NAME
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif")
+# 汉明距离不超过该值视为近似重复（64 位哈希）
+DEFAULT_THRESHOLD = 6
+# 近似重复图片分组后移动到的子文件夹
+DUPLICATE_DIR_NAME = "近似重复"
+
+
+def _dct_matrix(n):
+    """n×n 的 DCT-II 变换矩阵（用 NumPy 计算，避免依赖 scipy）"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    matrix[0, :] = np.sqrt(1.0 / n)
+    return matrix
+
+
+_DCT_32 = _dct_matrix(32)
+
+
+def _bits_to_int(bits):
+    return int("".join("1" if b else "0" for b in bits.flatten()), 2)
+
+
+def dhash(image, hash_size=8):
+    """差值哈希：缩放到 (hash_size+1)×hash_size 灰度图，比较相邻像素"""
+    pixels = np.asarray(image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS), dtype=np.int16)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(image):
+    """感知哈希：32×32 灰度图做 DCT，取左上 8×8 低频分量与中位数比较"""
+    pixels = np.asarray(image.convert("L").resize((32, 32), Image.LANCZOS), dtype=np.float64)
+    low_freq = (_DCT_32 @ pixels @ _DCT_32.T)[:8, :8]
+    median = np.median(low_freq.flatten()[1:])  # 去掉直流分量
+    return _bits_to_int(low_freq > median)
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def compute_hashes(file_path):
+    """
+    计算一张图片的哈希（在子进程中执行）。
+
+    :return: (文件路径, phash, dhash, 像素数)，图片无法解码时哈希为 None
+    """
+    try:
+        with Image.open(file_path) as image:
+            pixel_count = image.size[0] * image.size[1]
+            image.draft("L", (64, 64))  # JPEG 解码时直接缩小，大图也很快
+            return file_path, phash(image), dhash(image), pixel_count
+    except Exception:
+        return file_path, None, None, 0
+
+
+class BKTree:
+    """
+    按汉明距离组织的 BK 树，查询距离阈值内的近邻时只需访问少量节点，避免两两比较的平方复杂度。
+    """
+
+    def __init__(self):
+        self.root = None  # 节点结构: [哈希值, 关联数据, {距离: 子节点}]
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = [value, item, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, item, {}]
+                return
+            node = child
+
+    def search(self, value, threshold):
+        """返回 [(距离, 关联数据), ...]"""
+        results = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= threshold:
+                results.append((distance, node[1]))
+            for child_distance, child in node[2].items():
+                if distance - threshold <= child_distance <= distance + threshold:
+                    stack.append(child)
+        return results
+
+
+def find_near_duplicates(file_paths, threshold=DEFAULT_THRESHOLD, max_workers=None):
+    """
+    找出近似重复的图片组（同一图片的不同尺寸、轻微裁剪等）。
+
+    :param file_paths: 图片路径列表
+    :param threshold: pHash 汉明距离阈值
+    :param max_workers: 计算哈希的进程数，None 表示 CPU 核数
+    :return: [[保留的图片, 重复图片1, 重复图片2, ...], ...]，每组第一张为分辨率最高的一张
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        hashes = [h for h in executor.map(compute_hashes, file_paths, chunksize=16) if h[1] is not None]
+
+    # 分辨率高的优先入组，作为每组保留的图片
+    hashes.sort(key=lambda h: h[3], reverse=True)
+
+    tree = BKTree()
+    groups = []
+    for file_path, p_hash, d_hash, _ in hashes:
+        # pHash 找候选，再用 dHash 复核，降低误判
+        matches = [group_index for distance, (group_index, group_dhash) in tree.search(p_hash, threshold)
+                   if hamming_distance(d_hash, group_dhash) <= threshold * 2]
+        if matches:
+            groups[min(matches)].append(file_path)
+        else:
+            tree.add(p_hash, (len(groups), d_hash))
+            groups.append([file_path])
+
+    return [group for group in groups if len(group) > 1]
+
+
+def dedup_folder(folder_path, threshold=DEFAULT_THRESHOLD, action="group", log_signal=None):
+    """
+    对一次运行的输出文件夹做近似重复清理（可选的下载后处理步骤）。
+
+    :param folder_path: 输出文件夹（递归处理子文件夹）
+    :param threshold: pHash 汉明距离阈值
+    :param action: "group" 把重复图片移动到「近似重复」子文件夹；"delete" 直接删除重复图片
+    :return: 处理的重复图片数量
+    """
+    file_paths = []
+    for dir_path, dir_names, file_names in os.walk(folder_path):
+        # 跳过已分组的重复图片和后处理生成的缩略图、网页版
+        dir_names[:] = [d for d in dir_names
+                        if d != DUPLICATE_DIR_NAME and d not in DERIVED_DIR_NAMES and not d.startswith(".")]
+        file_paths.extend(os.path.join(dir_path, name) for name in file_names
+                          if name.lower().endswith(IMAGE_EXTENSIONS) and name != CONTACT_SHEET_NAME)
+
+    groups = find_near_duplicates(file_paths, threshold)
+    removed = 0
+    for group_index, (keeper, *duplicates) in enumerate(groups, start=1):
+        for duplicate in duplicates:
+            if action == "delete":
+                os.remove(duplicate)
+            else:
+                target_dir = os.path.join(folder_path, DUPLICATE_DIR_NAME, f"组{group_index}")
+                os.makedirs(target_dir, exist_ok=True)
+                # 不同子文件夹里可能有同名文件，用相对路径作为新文件名
+                target_name = os.path.relpath(duplicate, folder_path).replace(os.sep, "_")
+                shutil.move(duplicate, os.path.join(target_dir, target_name))
+            removed += 1
+
+    message = f"近似重复检测完成：共 {len(file_paths)} 张图片，发现 {len(groups)} 组、{removed} 张近似重复图片"
+    if log_signal:
+        log_signal.emit(message)
+    else:
+        print(message)
+    return removed
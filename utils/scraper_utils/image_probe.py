@@ -0,0 +1,78 @@
+# image_probe.py
+import re
+from urllib.parse import urlparse
+from PIL import ImageFile
+from utils.scraper_utils.http_transport import http_get
+from utils.scraper_utils.rate_governor import get_rate_governor
+
+# 探测时读取的字节数：足够 Pillow 解析出绝大多数图片的文件头（尺寸信息）
+PROBE_BYTES = 32 * 1024
+
+# 按图片域名后缀设置的过滤阈值：小于 min_bytes 字节、或短边小于 min_side 像素的图片不下载
+# （头像、图标、占位图等）
+SITE_PROBE_RULES = {
+    "pinimg.com": {"min_bytes": 15 * 1024, "min_side": 236},
+    "xhscdn.com": {"min_bytes": 10 * 1024, "min_side": 200},
+    "huaban.com": {"min_bytes": 10 * 1024, "min_side": 200},
+    "hbimg.com": {"min_bytes": 10 * 1024, "min_side": 200},
+}
+
+
+class ProbeResult:
+    """探测结果：文件总字节数、像素尺寸（未知时为 None），以及已经读到的文件开头（可用于续传）"""
+
+    def __init__(self, total_size=None, dimensions=None, head=b"", ranged=False):
+        self.total_size = total_size
+        self.dimensions = dimensions
+        self.head = head
+        self.ranged = ranged  # 服务器是否按 Range 返回了 206（head 可作为 .part 续传）
+
+
+def probe_rule_for(url):
+    """返回 URL 所在站点的过滤阈值，没有配置时返回 None"""
+    host = urlparse(url).hostname or ""
+    for suffix, rule in SITE_PROBE_RULES.items():
+        if host == suffix or host.endswith("." + suffix):
+            return rule
+    return None
+
+
+def probe_image(url):
+    """
+    只请求图片开头的一小段（Range: bytes=0-PROBE_BYTES-1），从 Content-Range / Content-Length 得到文件大小，
+    用 Pillow 的增量解析器从文件头解析出像素尺寸，不下载整张图片。
+    """
+    get_rate_governor().acquire(url)
+    with http_get(url, stream=True, headers={"Range": f"bytes=0-{PROBE_BYTES - 1}"}) as response:
+        response.raise_for_status()
+        ranged = response.status_code == 206
+        total_size = None
+        match = re.search(r"/(\d+)$", response.headers.get("Content-Range", ""))
+        if match:
+            total_size = int(match.group(1))
+        elif not ranged and response.headers.get("Content-Length"):
+            total_size = int(response.headers["Content-Length"])
+
+        parser = ImageFile.Parser()
+        head = b""
+        for chunk in response.iter_content(chunk_size=8192):
+            head += chunk
+            try:
+                parser.feed(chunk)
+            except (OSError, SyntaxError, ValueError):
+                break  # 不是可解析的图片，交给正式下载时的校验处理
+            if parser.image is not None or len(head) >= PROBE_BYTES:
+                break
+        get_rate_governor().consume(url, len(head))
+
+    dimensions = parser.image.size if parser.image is not None else None
+    return ProbeResult(total_size, dimensions, head[:PROBE_BYTES], ranged)
+
+
+def rejection_reason(probe, rule):
+    """按阈值检查探测结果，返回不下载的原因；符合要求（或信息不足无法判断）时返回 None"""
+    if probe.total_size is not None and probe.total_size < rule.get("min_bytes", 0):
+        return f"文件过小（{probe.total_size} 字节）"
+    if probe.dimensions and min(probe.dimensions) < rule.get("min_side", 0):
+        return f"尺寸过小（{probe.dimensions[0]}x{probe.dimensions[1]}）"
+    return None
@@ -0,0 +1,100 @@
+# image_validator.py
+from PIL import ImageFile
+
+# 文件头魔数 -> 扩展名
+_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+    (b"BM", ".bmp"),
+    (b"II*\x00", ".tif"),
+    (b"MM\x00*", ".tif"),
+)
+# ISO BMFF（ftyp 盒子）的品牌 -> 扩展名
+_FTYP_BRANDS = {b"avif": ".avif", b"avis": ".avif", b"heic": ".heic", b"heix": ".heic", b"mif1": ".heic"}
+# 嗅探文件类型需要的字节数
+SNIFF_BYTES = 32
+# 用 Pillow 增量解码检查完整性的格式（AVIF/HEIC 需要额外插件，只检查文件头和长度）
+DECODE_CHECK_EXTENSIONS = (".jpg", ".png", ".gif", ".webp", ".bmp", ".tif")
+
+
+class InvalidImageError(Exception):
+    """下载到的内容不是完整的图片（HTML 错误页、被截断、长度不符等），应删除后立即重新下载"""
+
+
+def sniff_extension(head):
+    """根据文件头的魔数判断图片格式，返回扩展名（如 ".png"），无法识别时返回 None"""
+    for signature, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if head[4:8] == b"ftyp":
+        return _FTYP_BRANDS.get(head[8:12])
+    return None
+
+
+def sniff_file(file_path):
+    """读取文件头判断图片格式"""
+    with open(file_path, 'rb') as file:
+        return sniff_extension(file.read(SNIFF_BYTES))
+
+
+class StreamValidator:
+    """
+    边下载边校验图片：收到的前几个字节用于判断真实格式，之后的数据同时喂给 Pillow 的增量解析器，
+    下载结束时即可知道文件是否完整，无需事后再打开一遍。
+    """
+
+    def __init__(self, expected_size=None):
+        """
+        :param expected_size: 预期的文件总字节数（来自 Content-Length），None 表示不检查
+        """
+        self.expected_size = expected_size
+        self.size = 0
+        self.extension = None
+        self._head = b""
+        self._parser = None
+
+    def feed(self, chunk):
+        self.size += len(chunk)
+        if self.extension is None:
+            self._head += bytes(chunk)
+            if len(self._head) < SNIFF_BYTES:
+                return  # 文件头还没收全，先缓存
+            chunk = self._start()
+        self._parse(chunk)
+
+    def close(self):
+        """数据接收完毕时调用，返回扩展名；文件不完整时抛出 InvalidImageError"""
+        if self.extension is None:
+            if not self._head:
+                raise InvalidImageError("响应内容为空")
+            self._parse(self._start())
+        if self.expected_size is not None and self.size != self.expected_size:
+            raise InvalidImageError(f"文件长度不符: 收到 {self.size} 字节，应为 {self.expected_size} 字节")
+        if self._parser is not None:
+            try:
+                self._parser.close().close()
+            except (OSError, SyntaxError, ValueError) as e:
+                raise InvalidImageError(f"图片不完整: {e}") from e
+        return self.extension
+
+    def _start(self):
+        """根据缓存的文件头确定格式，返回需要交给解析器的数据"""
+        self.extension = sniff_extension(self._head)
+        if self.extension is None:
+            raise InvalidImageError(f"不是图片文件，开头内容: {self._head[:16]!r}")
+        if self.extension in DECODE_CHECK_EXTENSIONS:
+            self._parser = ImageFile.Parser()
+        head, self._head = self._head, b""
+        return head
+
+    def _parse(self, chunk):
+        if self._parser is None:
+            return
+        try:
+            self._parser.feed(bytes(chunk))  # 解析器会保留未处理完的数据，不能直接引用复用的缓冲区
+        except (OSError, SyntaxError, ValueError) as e:
+            raise InvalidImageError(f"图片数据损坏: {e}") from e
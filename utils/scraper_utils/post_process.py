@@ -0,0 +1,163 @@
+# post_process.py
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps, features
+
+# 后处理输出的子文件夹（位于每个项目文件夹内）
+THUMBNAIL_DIR_NAME = "缩略图"
+WEB_DIR_NAME = "网页版"
+DERIVED_DIR_NAMES = (THUMBNAIL_DIR_NAME, WEB_DIR_NAME)
+CONTACT_SHEET_NAME = "联系表.jpg"
+
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif")
+DEFAULT_OPTIONS = {
+    "thumbnail_size": 400,   # 缩略图最长边（像素）
+    "web_size": 1920,        # 网页版最长边（像素）
+    "web_format": "webp",    # 网页版格式：webp 或 avif（当前 Pillow 不支持 AVIF 时自动改用 webp）
+    "web_quality": 80,
+    "sheet_columns": 6,      # 联系表每行图片数
+    "sheet_cell": 240,       # 联系表每格边长（像素）
+}
+
+
+def _web_format(options):
+    if options["web_format"] == "avif" and features.check("avif"):
+        return "AVIF", ".avif"
+    return "WEBP", ".webp"
+
+
+def process_image(file_path, options):
+    """
+    生成一张图片的缩略图和网页版（在子进程中执行）。
+
+    输出文件不带 EXIF 等元数据（只保存像素数据，方向按 EXIF 旋转后再丢弃）；
+    原图是内容存储中对象的硬链接，不能原地修改，因此不动原图。
+
+    :return: (缩略图路径, 网页版路径)
+    """
+    folder_path, base_name = os.path.split(file_path)
+    stem = os.path.splitext(base_name)[0]
+    pil_format, extension = _web_format(options)
+
+    with Image.open(file_path) as image:
+        image.draft("RGB", (options["web_size"], options["web_size"]))  # JPEG 解码时直接缩小，省 CPU 和内存
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+        web_image = image.copy()
+        web_image.thumbnail((options["web_size"], options["web_size"]), Image.LANCZOS)
+        web_path = os.path.join(folder_path, WEB_DIR_NAME, stem + extension)
+        os.makedirs(os.path.dirname(web_path), exist_ok=True)
+        web_image.save(web_path, pil_format, quality=options["web_quality"])
+
+        thumbnail = image.convert("RGB")
+        thumbnail.thumbnail((options["thumbnail_size"], options["thumbnail_size"]), Image.LANCZOS)
+        thumbnail_path = os.path.join(folder_path, THUMBNAIL_DIR_NAME, stem + ".jpg")
+        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+        thumbnail.save(thumbnail_path, "JPEG", quality=85, optimize=True)
+
+    return thumbnail_path, web_path
+
+
+def make_contact_sheet(folder_path, options):
+    """
+    把项目文件夹中的所有图片拼成一张联系表（在子进程中执行）。
+
+    :return: 联系表路径，文件夹中没有图片时返回 None
+    """
+    file_names = sorted(name for name in os.listdir(folder_path)
+                        if name.lower().endswith(SOURCE_EXTENSIONS) and name != CONTACT_SHEET_NAME)
+    if not file_names:
+        return None
+
+    columns = min(options["sheet_columns"], len(file_names))
+    rows = (len(file_names) + columns - 1) // columns
+    cell = options["sheet_cell"]
+    sheet = Image.new("RGB", (columns * cell, rows * cell), "white")
+    for index, name in enumerate(file_names):
+        try:
+            with Image.open(os.path.join(folder_path, name)) as image:
+                image.draft("RGB", (cell, cell))
+                image = ImageOps.exif_transpose(image).convert("RGB")
+                image.thumbnail((cell - 8, cell - 8), Image.LANCZOS)
+        except Exception:
+            continue  # 个别图片无法解码时跳过，不影响整张联系表
+        row, column = divmod(index, columns)
+        sheet.paste(image, (column * cell + (cell - image.width) // 2, row * cell + (cell - image.height) // 2))
+
+    sheet_path = os.path.join(folder_path, CONTACT_SHEET_NAME)
+    sheet.save(sheet_path, "JPEG", quality=85, optimize=True)
+    return sheet_path
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """进程内共享的后处理进程池（所有标签页共用，避免 CPU 被多个进程池抢占）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) - 1))
+        return _executor
+
+
+class PostProcessor:
+    """
+    可选的下载后处理阶段：下载完成的图片交给进程池生成缩略图和网页版，每个项目结束时生成联系表。
+
+    与下载线程完全解耦：下载线程只负责提交任务，CPU 密集的解码和编码在子进程中进行，不会拖慢传输。
+    使用方式：创建批次时传入 new_batch(..., post_processor=processor)，运行结束前调用 close()。
+    """
+
+    def __init__(self, log_signal=None, **options):
+        self.log_signal = log_signal
+        self.options = dict(DEFAULT_OPTIONS, **options)
+        self._lock = threading.Lock()
+        self._futures = []
+        self.processed = 0
+        self.failed = 0
+
+    def submit(self, file_path):
+        """提交一张下载完成的图片"""
+        if not file_path or not file_path.lower().endswith(SOURCE_EXTENSIONS):
+            return
+        future = _get_executor().submit(process_image, file_path, self.options)
+        future.add_done_callback(lambda f, path=file_path: self._on_done(f, path))
+        with self._lock:
+            self._futures.append(future)
+
+    def contact_sheet(self, folder_path):
+        """项目图片全部下载完成后调用，生成该项目的联系表"""
+        future = _get_executor().submit(make_contact_sheet, folder_path, self.options)
+        future.add_done_callback(lambda f, path=folder_path: self._on_done(f, path))
+        with self._lock:
+            self._futures.append(future)
+
+    def _on_done(self, future, path):
+        error = future.exception()
+        with self._lock:
+            if error is None:
+                self.processed += 1
+            else:
+                self.failed += 1
+        if error is not None:
+            self._log(f"图片后处理失败: {path}，错误: {error}")
+
+    def close(self):
+        """等待本次运行提交的所有后处理任务完成"""
+        with self._lock:
+            futures, self._futures = self._futures, []
+        if futures:
+            self._log(f"正在等待图片后处理完成（{len(futures)} 个任务）...")
+        for future in futures:
+            future.exception()  # 只等待完成，错误已在回调中记录
+        self._log(f"图片后处理完成：成功 {self.processed} 个，失败 {self.failed} 个")
+
+    def _log(self, message):
+        if self.log_signal:
+            self.log_signal.emit(message)
+        else:
+            print(message)
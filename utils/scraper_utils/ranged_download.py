@@ -0,0 +1,119 @@
+# ranged_download.py
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from utils.scraper_utils.http_transport import http_get
+from utils.scraper_utils.rate_governor import get_rate_governor
+from utils.scraper_utils.stream_writer import write_response
+
+# 超过该大小（字节）且服务器支持 Range 的文件分段并行下载
+MULTIPART_THRESHOLD = 4 * 1024 * 1024
+# 每个文件最多分成几段
+MULTIPART_SEGMENTS = 4
+# 每段至少多大，避免把中等大小的文件切得过碎
+MIN_SEGMENT_SIZE = 1024 * 1024
+# 所有文件的分段共用的下载线程数
+SEGMENT_WORKERS = 8
+
+_lock = threading.Lock()
+_executor = None
+_no_range_hosts = set()  # 实际不支持分段下载的域名（声明了 Accept-Ranges 却不返回 206）
+
+
+class RangeNotSupported(Exception):
+    """服务器没有按 Range 返回 206，需要改为单连接下载"""
+
+
+def configure_multipart(threshold=None, segments=None):
+    """
+    调整分段下载参数。
+
+    :param threshold: 分段下载的文件大小阈值（字节），0 表示关闭分段下载
+    :param segments: 每个文件最多分成几段
+    """
+    global MULTIPART_THRESHOLD, MULTIPART_SEGMENTS
+    if threshold is not None:
+        MULTIPART_THRESHOLD = threshold
+    if segments is not None:
+        MULTIPART_SEGMENTS = max(1, segments)
+
+
+def should_split(url, response, total_size):
+    """根据首个响应的头判断是否值得分段下载"""
+    if not MULTIPART_THRESHOLD or MULTIPART_SEGMENTS < 2 or total_size is None:
+        return False
+    if response.status_code != 200 or response.headers.get("Accept-Ranges", "").lower() != "bytes":
+        return False
+    with _lock:
+        if urlparse(url).netloc in _no_range_hosts:
+            return False
+    return total_size >= max(MULTIPART_THRESHOLD, MIN_SEGMENT_SIZE * 2)
+
+
+def plan_segments(total_size):
+    """把文件切成若干 (起始字节, 长度) 段"""
+    count = max(2, min(MULTIPART_SEGMENTS, total_size // MIN_SEGMENT_SIZE))
+    size = -(-total_size // count)
+    return [(start, min(size, total_size - start)) for start in range(0, total_size, size)]
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=SEGMENT_WORKERS, thread_name_prefix="DScraperSegment")
+        return _executor
+
+
+def _write_segment(response, target_file, start, length, url):
+    """把响应体的前 length 字节写到文件的 start 位置"""
+    governor = get_rate_governor()
+    with open(target_file, 'r+b') as file:
+        file.seek(start)
+        written = write_response(response, file, lambda chunk: governor.consume(url, len(chunk)), limit=length)
+    if written != length:
+        raise requests.exceptions.ConnectionError(f"分段下载不完整: {start}-{start + length - 1}，收到 {written} 字节")
+
+
+def _fetch_segment(url, target_file, start, length):
+    get_rate_governor().acquire(url)
+    headers = {"Range": f"bytes={start}-{start + length - 1}"}
+    with http_get(url, stream=True, headers=headers) as response:
+        if response.status_code == 200:
+            raise RangeNotSupported(url)
+        response.raise_for_status()
+        content_range = response.headers.get("Content-Range", "")
+        if not content_range.startswith(f"bytes {start}-"):
+            raise RangeNotSupported(f"{url} 返回的范围不符: {content_range}")
+        _write_segment(response, target_file, start, length, url)
+
+
+def download_segments(url, first_response, target_file, total_size):
+    """
+    分段并行下载到 target_file：第一段直接读取已经打开的 first_response，其余各段用 Range 请求并行下载，
+    各段写入文件中各自的位置。任意一段失败时抛出异常（由调用方删除文件后重试）；
+    服务器不支持分段时抛出 RangeNotSupported，并记住该域名，之后都用单连接下载。
+    """
+    segments = plan_segments(total_size)
+    with open(target_file, 'wb') as file:
+        file.truncate(total_size)
+
+    executor = _get_executor()
+    futures = [executor.submit(_fetch_segment, url, target_file, start, length) for start, length in segments[1:]]
+    errors = []
+    try:
+        _write_segment(first_response, target_file, 0, segments[0][1], url)
+    except Exception as e:
+        errors.append(e)
+    for future in futures:
+        error = future.exception()
+        if error is not None:
+            errors.append(error)
+
+    if any(isinstance(error, RangeNotSupported) for error in errors):
+        with _lock:
+            _no_range_hosts.add(urlparse(url).netloc)
+        raise RangeNotSupported(url)
+    if errors:
+        raise errors[0]
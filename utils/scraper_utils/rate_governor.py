@@ -0,0 +1,167 @@
+# rate_governor.py
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+# 每个域名默认的请求速率（次/秒）和突发容量；浏览器导航和图片下载共用
+DEFAULT_REQUESTS_PER_SECOND = 8.0
+DEFAULT_REQUEST_BURST = 8
+# 每个域名默认的下载带宽上限（字节/秒），None 表示不限制
+DEFAULT_BYTES_PER_SECOND = None
+# 统计实时占用率的滑动窗口（秒）
+UTILIZATION_WINDOW = 5.0
+
+
+class TokenBucket:
+    """
+    令牌桶：按 rate 匀速补充令牌，最多积累 capacity 个。
+    take 允许令牌透支，返回调用方需要等待的秒数，这样大块数据也不会永远拿不到令牌。
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, amount):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class _DomainState:
+    def __init__(self, requests_per_second, bytes_per_second):
+        self.request_bucket = None
+        self.byte_bucket = None
+        self.events = deque()  # (时间, 请求数, 字节数)，用于统计实时速率
+        self.set_limits(requests_per_second, bytes_per_second)
+
+    def set_limits(self, requests_per_second, bytes_per_second):
+        self.requests_per_second = requests_per_second
+        self.bytes_per_second = bytes_per_second
+        self.request_bucket = TokenBucket(requests_per_second, max(DEFAULT_REQUEST_BURST, requests_per_second)) \
+            if requests_per_second else None
+        # 带宽桶容量为 1 秒的流量，避免空闲后瞬间突发
+        self.byte_bucket = TokenBucket(bytes_per_second, bytes_per_second) if bytes_per_second else None
+
+
+class RateGovernor:
+    """
+    进程级的按域名限速器。
+
+    所有标签页的浏览器导航（driver.get）和图片下载都先经过这里：请求数和下载字节数分别用令牌桶限速，
+    超出配额的线程在这里等待，而不是把请求发出去后被网站限流。
+    """
+
+    def __init__(self, requests_per_second=DEFAULT_REQUESTS_PER_SECOND, bytes_per_second=DEFAULT_BYTES_PER_SECOND):
+        self.default_requests_per_second = requests_per_second
+        self.default_bytes_per_second = bytes_per_second
+        self._lock = threading.Lock()
+        self._domains = {}
+
+    def _state(self, domain):
+        state = self._domains.get(domain)
+        if state is None:
+            state = _DomainState(self.default_requests_per_second, self.default_bytes_per_second)
+            self._domains[domain] = state
+        return state
+
+    def set_limits(self, domain, requests_per_second=None, bytes_per_second=None):
+        """
+        单独设置某个域名的限速。
+
+        :param requests_per_second: 请求速率（次/秒），None 表示不限制
+        :param bytes_per_second: 下载带宽（字节/秒），None 表示不限制
+        """
+        with self._lock:
+            self._state(domain).set_limits(requests_per_second, bytes_per_second)
+
+    def acquire(self, url_or_domain):
+        """发送一个请求前调用，超出请求速率时阻塞等待"""
+        domain = _domain_of(url_or_domain)
+        with self._lock:
+            state = self._state(domain)
+            wait = state.request_bucket.take(1) if state.request_bucket else 0.0
+            state.events.append((time.monotonic() + wait, 1, 0))
+        if wait:
+            time.sleep(wait)
+
+    def consume(self, url_or_domain, size):
+        """收到 size 字节数据后调用，超出带宽上限时阻塞等待"""
+        domain = _domain_of(url_or_domain)
+        with self._lock:
+            state = self._state(domain)
+            wait = state.byte_bucket.take(size) if state.byte_bucket else 0.0
+            state.events.append((time.monotonic() + wait, 0, size))
+        if wait:
+            time.sleep(wait)
+
+    def utilization(self):
+        """
+        各域名最近 UTILIZATION_WINDOW 秒内的实时速率和占用率。
+
+        :return: {域名: {"requests_per_second", "bytes_per_second", "request_limit", "byte_limit", "utilization"}}，
+                 utilization 为请求和带宽两项占用率中较高的一项（0~1，无限制时为 None）
+        """
+        now = time.monotonic()
+        result = {}
+        with self._lock:
+            for domain, state in self._domains.items():
+                while state.events and state.events[0][0] < now - UTILIZATION_WINDOW:
+                    state.events.popleft()
+                requests = sum(event[1] for event in state.events if event[0] <= now) / UTILIZATION_WINDOW
+                size = sum(event[2] for event in state.events if event[0] <= now) / UTILIZATION_WINDOW
+                ratios = [value / limit for value, limit in ((requests, state.requests_per_second),
+                                                             (size, state.bytes_per_second)) if limit]
+                result[domain] = {
+                    "requests_per_second": requests,
+                    "bytes_per_second": size,
+                    "request_limit": state.requests_per_second,
+                    "byte_limit": state.bytes_per_second,
+                    "utilization": min(1.0, max(ratios)) if ratios else None,
+                }
+        return result
+
+    def summary(self, limit=3):
+        """返回最繁忙的几个域名的简短描述，用于界面状态栏"""
+        active = [(domain, stats) for domain, stats in self.utilization().items()
+                  if stats["requests_per_second"] or stats["bytes_per_second"]]
+        if not active:
+            return "空闲"
+        active.sort(key=lambda item: (item[1]["utilization"] or 0, item[1]["bytes_per_second"]), reverse=True)
+        parts = []
+        for domain, stats in active[:limit]:
+            text = f"{domain} {stats['requests_per_second']:.1f}次/秒 {stats['bytes_per_second'] / 1024:.0f}KB/秒"
+            if stats["utilization"] is not None:
+                text += f" ({stats['utilization']:.0%})"
+            parts.append(text)
+        return "；".join(parts)
+
+
+def govern_driver(driver, governor=None):
+    """让浏览器的 driver.get 导航也经过限速器（对 create_driver 返回的驱动调用一次）"""
+    governor = governor or get_rate_governor()
+    original_get = driver.get
+
+    def governed_get(url):
+        governor.acquire(url)
+        return original_get(url)
+
+    driver.get = governed_get
+    return driver
+
+
+def _domain_of(url_or_domain):
+    return urlparse(url_or_domain).netloc if "://" in url_or_domain else url_or_domain
+
+
+_governor = RateGovernor()
+
+
+def get_rate_governor():
+    """获取进程内共享的限速器（所有标签页共用）"""
+    return _governor
@@ -0,0 +1,97 @@
+# request_profiles.py
+import os
+import pickle
+import threading
+import time
+from urllib.parse import urlparse
+from utils.login_utils.cookie_store import find_latest_cookie_file, read_cookie_file
+
+# 按图片域名后缀配置的请求方案：部分 CDN 没有匹配的 Referer 或登录 cookie 时直接返回 403
+#   headers:       额外的请求头
+#   referer:       固定发送的 Referer（站点防盗链检查）
+#   cookie_domain: 从哪个站点保存的登录 cookies（get_or_load_cookies 保存的 .pkl 文件）中取 cookie，
+#                  只发送 domain 与请求域名匹配的 cookie
+SITE_REQUEST_PROFILES = {
+    "huaban.com": {"referer": "https://huaban.com/", "cookie_domain": "huaban.com"},
+    "hbimg.com": {"referer": "https://huaban.com/"},
+    "xhscdn.com": {"referer": "https://www.xiaohongshu.com/"},
+    "znzmo.com": {"referer": "https://www.znzmo.com/", "cookie_domain": "www.znzmo.com"},
+    "pinimg.com": {"referer": "https://www.pinterest.com/"},
+}
+
+_lock = threading.Lock()
+_cookie_cache = {}  # cookie_domain -> (cookie 文件路径, 修改时间, cookies 列表)
+
+
+def register_profile(host_suffix, headers=None, referer=None, cookie_domain=None):
+    """
+    注册（或覆盖）一个域名的请求方案，之后该域名及其子域名的所有下载请求都会自动带上。
+
+    :param host_suffix: 域名后缀，例如 "xhscdn.com"
+    :param headers: 额外的请求头
+    :param referer: 固定的 Referer
+    :param cookie_domain: 使用哪个站点保存的登录 cookies，例如 "huaban.com"
+    """
+    profile = {"headers": dict(headers or {})}
+    if referer:
+        profile["referer"] = referer
+    if cookie_domain:
+        profile["cookie_domain"] = cookie_domain
+    with _lock:
+        SITE_REQUEST_PROFILES[host_suffix] = profile
+
+
+def profile_for(url):
+    """返回 URL 所在域名的请求方案（匹配最长的后缀），没有配置时返回 None"""
+    host = urlparse(url).hostname or ""
+    with _lock:
+        matches = [suffix for suffix in SITE_REQUEST_PROFILES if host == suffix or host.endswith("." + suffix)]
+        return SITE_REQUEST_PROFILES[max(matches, key=len)] if matches else None
+
+
+def _load_cookies(cookie_domain):
+    """读取站点最新的 cookie 文件；文件没有变化时使用内存中的副本"""
+    cookie_file = find_latest_cookie_file(cookie_domain)
+    if not cookie_file:
+        return []
+    mtime = os.path.getmtime(cookie_file)
+    with _lock:
+        cached = _cookie_cache.get(cookie_domain)
+        if cached and cached[0] == cookie_file and cached[1] == mtime:
+            return cached[2]
+    try:
+        cookies = read_cookie_file(cookie_file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return []
+    with _lock:
+        _cookie_cache[cookie_domain] = (cookie_file, mtime, cookies)
+    return cookies
+
+
+def _cookie_header(cookies, host):
+    """从浏览器导出的 cookies 中挑出对该域名有效且未过期的，拼成 Cookie 请求头"""
+    now = time.time()
+    pairs = []
+    for cookie in cookies:
+        domain = cookie.get("domain", "").lstrip(".")
+        if not domain or not (host == domain or host.endswith("." + domain)):
+            continue
+        if cookie.get("expiry") and cookie["expiry"] < now:
+            continue
+        pairs.append(f"{cookie['name']}={cookie['value']}")
+    return "; ".join(pairs)
+
+
+def headers_for(url):
+    """返回该 URL 按站点请求方案应附加的请求头，没有配置时返回空字典"""
+    profile = profile_for(url)
+    if not profile:
+        return {}
+    headers = dict(profile.get("headers", {}))
+    if profile.get("referer"):
+        headers["Referer"] = profile["referer"]
+    if profile.get("cookie_domain"):
+        cookie = _cookie_header(_load_cookies(profile["cookie_domain"]), urlparse(url).hostname or "")
+        if cookie:
+            headers["Cookie"] = cookie
+    return headers
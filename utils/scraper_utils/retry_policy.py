@@ -0,0 +1,160 @@
+# retry_policy.py
+import random
+import threading
+import time
+import requests
+from email.utils import parsedate_to_datetime
+from utils.scraper_utils.image_validator import InvalidImageError
+
+# 错误分类
+ERROR_CLIENT = "client"        # 4xx（除 408/429）：请求本身有问题，重试无意义
+ERROR_THROTTLED = "throttled"  # 429/503：服务器要求放慢速度，按 Retry-After 等待
+ERROR_SERVER = "server"        # 其他 5xx：服务器暂时出错
+ERROR_NETWORK = "network"      # 连接失败、超时、传输中断
+ERROR_CONTENT = "content"      # 收到的内容不是完整图片（HTML 错误页、截断），立即重新下载
+ERROR_LOCAL = "local"          # 本地文件读写错误等
+
+# 计入熔断器的错误类型（说明站点可能已经挂了）
+HOST_FAILURES = (ERROR_SERVER, ERROR_NETWORK)
+
+
+def classify_error(error):
+    """按异常类型和 HTTP 状态码对下载错误分类"""
+    if isinstance(error, InvalidImageError):
+        return ERROR_CONTENT
+    if isinstance(error, requests.exceptions.HTTPError):
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+        if status is None:
+            return ERROR_NETWORK
+        if status in (429, 503):
+            return ERROR_THROTTLED
+        if status == 408:
+            return ERROR_NETWORK
+        if 400 <= status < 500:
+            return ERROR_CLIENT
+        return ERROR_SERVER
+    if isinstance(error, requests.exceptions.RequestException):
+        return ERROR_NETWORK
+    return ERROR_LOCAL
+
+
+def parse_retry_after(error):
+    """从错误响应的 Retry-After 头中取出等待秒数（支持秒数和 HTTP 日期两种格式），没有时返回 None"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    下载重试策略：指数退避 + 随机抖动（full jitter），服务器给出 Retry-After 时以其为准，
+    4xx 客户端错误不重试，内容损坏立即重试。
+    """
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=60.0, max_retry_after=300.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def next_delay(self, error, attempt, max_attempts=None, base_delay=None):
+        """
+        计算第 attempt 次（从 0 开始）失败后的重试等待时间。
+
+        :return: 等待秒数；不应再重试时返回 None
+        """
+        max_attempts = max_attempts or self.max_attempts
+        base_delay = self.base_delay if base_delay is None else base_delay
+        kind = classify_error(error)
+        if kind == ERROR_CLIENT or attempt + 1 >= max_attempts:
+            return None
+        if kind == ERROR_CONTENT:
+            return 0.0
+        if kind == ERROR_THROTTLED:
+            retry_after = parse_retry_after(error)
+            if retry_after is not None:
+                return min(retry_after, self.max_retry_after)
+        # 多个任务同时失败时随机分散重试时间，避免同时打到刚恢复的服务器上
+        return random.uniform(0, min(self.max_delay, base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    按域名的熔断器：连续失败 failure_threshold 次后熔断，reset_timeout 秒内该域名的任务直接失败；
+    冷却结束后放行一个探测请求（半开状态），成功则恢复，失败则继续熔断。
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = {}    # 域名 -> 连续失败次数
+        self._open_until = {}  # 域名 -> 熔断结束时间
+        self._probing = set()  # 半开状态下正在探测的域名
+
+    def allow(self, host):
+        """该域名当前是否允许发送请求"""
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return True
+            if time.monotonic() < open_until or host in self._probing:
+                return False
+            self._probing.add(host)
+            return True
+
+    def record_success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._open_until.pop(host, None)
+            self._probing.discard(host)
+
+    def record_failure(self, host):
+        """记录一次失败，返回该域名是否因此进入熔断状态"""
+        with self._lock:
+            was_probing = host in self._probing
+            self._probing.discard(host)
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if was_probing or failures >= self.failure_threshold:
+                self._open_until[host] = time.monotonic() + self.reset_timeout
+                return True
+            return False
+
+    def release_trial(self, host):
+        """
+        放行后既没有记录成功也没有记录失败（如任务中途出现意外异常）时调用：
+        结束可能正在进行的半开探测，否则该域名会一直被判定为“正在探测”，之后的请求全部被拒绝。
+        熔断状态保持不变，下一次 allow() 重新放行一个探测请求。
+        """
+        with self._lock:
+            self._probing.discard(host)
+
+    def is_open(self, host):
+        with self._lock:
+            open_until = self._open_until.get(host)
+            return open_until is not None and time.monotonic() < open_until
+
+
+_policy = RetryPolicy()
+_breaker = CircuitBreaker()
+
+
+def get_retry_policy():
+    """获取进程内共享的重试策略"""
+    return _policy
+
+
+def get_circuit_breaker():
+    """获取进程内共享的熔断器（所有标签页的下载共用各域名的健康状态）"""
+    return _breaker
@@ -4,17 +4,19 @@ import inspect
 
 
 def on_scraper_finished(window):
-    """爬虫完成时更新状态"""
-    window.status_signal.emit("爬虫已完成")  # 更新状态栏
+    """爬虫完成（或被停止后退出）时更新状态"""
+    stopped = window.scraper_thread is not None and not getattr(window.scraper_thread, "is_running", True)
+    status = "爬虫已终止" if stopped else "爬虫已完成"
+    window.status_signal.emit(status)  # 更新状态栏
     log_output = window.ui_elements.get("log_output")
     if log_output:
-        log_output.append("爬虫执行完毕")  # 日志记录
+        log_output.append("爬虫已终止" if stopped else "爬虫执行完毕")  # 日志记录
     else:
         print("Error: log_output is not initialized")  # 错误信息
 
     status_label = window.ui_elements.get("status_label")
     if status_label:
-        status_label.setText("状态: 爬虫已完成")  # 更新爬虫窗口的状态标签
+        status_label.setText(f"状态: {status}")  # 更新爬虫窗口的状态标签
     else:
         print("Error: status_label is not initialized")  # 错误信息
 
@@ -52,6 +54,16 @@ def start_scraper(window, ScraperThreadClass):
     if "max_links_input" in window.ui_elements and window.ui_elements["max_links_input"]:
         max_links = window.ui_elements["max_links_input"].value()
 
+    # 动态检查是否存在 dedup_checkbox
+    dedup = None
+    if "dedup_checkbox" in window.ui_elements and window.ui_elements["dedup_checkbox"]:
+        dedup = window.ui_elements["dedup_checkbox"].isChecked()
+
+    # 动态检查是否存在 postprocess_checkbox
+    postprocess = None
+    if "postprocess_checkbox" in window.ui_elements and window.ui_elements["postprocess_checkbox"]:
+        postprocess = window.ui_elements["postprocess_checkbox"].isChecked()
+
     if not keyword:
         QMessageBox.warning(window, "提示", "请输入关键词")
         window.ui_elements["keyword_input"].setFocus()
@@ -76,6 +88,10 @@ def start_scraper(window, ScraperThreadClass):
             scraper_params["max_links"] = max_links
         if city_required and city:
             scraper_params["city"] = city
+        if "dedup" in init_params and dedup is not None:
+            scraper_params["dedup"] = dedup
+        if "postprocess" in init_params and postprocess is not None:
+            scraper_params["postprocess"] = postprocess
 
         # 初始化爬虫线程
         print(f"Starting scraper with parameters: {scraper_params}")
@@ -96,17 +112,20 @@ def start_scraper(window, ScraperThreadClass):
         return False
 
 def stop_scraper(window):
-    """强制终止爬虫线程"""
-    if window.scraper_thread:
-        window.scraper_thread.terminate()
-        window.scraper_thread.wait()
+    """
+    停止爬虫线程：通知爬虫在处理完当前项目后退出，不强制终止线程。
+    爬虫自己退出时会归还浏览器、释放持久化配置目录的锁（强制终止会让锁一直被占用），
+    线程结束后由 finished 信号调用 on_scraper_finished 更新状态。
+    """
+    if window.scraper_thread and window.scraper_thread.isRunning():
+        window.scraper_thread.is_running = False
         log_output = window.ui_elements.get("log_output")
         if log_output:
-            log_output.append("爬虫已终止")
+            log_output.append("正在停止爬虫，当前项目处理完成后结束...")
         else:
             print("Error: log_output is not initialized")  # 错误信息
 
-        window.update_status_all("爬虫已终止")
+        window.update_status_all("爬虫正在停止...")
 
 
 def update_log(window, message):
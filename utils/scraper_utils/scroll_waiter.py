@@ -0,0 +1,94 @@
+# scroll_waiter.py
+
+# 每次滚动后最多等待的时间（秒），页面迟迟不安静时也不会一直等下去
+SCROLL_TIMEOUT = 3.0
+# DOM 和网络请求连续多久没有变化，视为本次滚动加载完成（秒）
+SCROLL_SETTLE = 0.3
+
+# 滚动并等待加载完成（异步脚本，最后一个参数是 Selenium 提供的回调）
+# arguments: [滚动方式 "by"/"bottom", 滚动距离, 滚动的元素（null 表示整个页面）, 计数用的 XPath（可为 null）,
+#             超时毫秒数, 安静毫秒数, 回调]
+_SCROLL_SCRIPT = """
+const [mode, amount, element, selector, timeoutMs, settleMs] = arguments;
+const done = arguments[arguments.length - 1];
+
+// 每个页面只安装一次：MutationObserver 记录 DOM 最后变化的时间，包装 fetch/XHR 统计进行中的请求
+let state = window.__dscraperScroll;
+if (!state) {
+    state = window.__dscraperScroll = {lastChange: 0, lastNetwork: 0, inflight: 0};
+    new MutationObserver(() => { state.lastChange = performance.now(); })
+        .observe(document.documentElement, {childList: true, subtree: true});
+    const started = () => { state.inflight++; state.lastNetwork = performance.now(); };
+    const finished = () => { state.inflight = Math.max(0, state.inflight - 1); state.lastNetwork = performance.now(); };
+    if (window.fetch) {
+        const originalFetch = window.fetch;
+        window.fetch = function () {
+            started();
+            return originalFetch.apply(this, arguments).finally(finished);
+        };
+    }
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        started();
+        this.addEventListener('loadend', finished, {once: true});
+        return originalSend.apply(this, arguments);
+    };
+}
+
+const target = element || document.scrollingElement || document.documentElement;
+const count = () => selector
+    ? document.evaluate('count(' + selector + ')', document, null, XPathResult.NUMBER_TYPE, null).numberValue
+    : 0;
+const before = {count: count(), height: target.scrollHeight};
+const startedAt = performance.now();
+
+if (mode === 'bottom') {
+    if (element) { element.scrollTop = element.scrollHeight; } else { window.scrollTo(0, document.body.scrollHeight); }
+} else {
+    if (element) { element.scrollTop += amount; } else { window.scrollBy(0, amount); }
+}
+
+function finish(timedOut) {
+    done({
+        added: count() - before.count,
+        height: target.scrollHeight,
+        grew: target.scrollHeight > before.height,
+        at_bottom: target.scrollTop + target.clientHeight >= target.scrollHeight - 2,
+        timed_out: timedOut,
+        elapsed: (performance.now() - startedAt) / 1000,
+    });
+}
+
+function check() {
+    const now = performance.now();
+    const quiet = now - Math.max(state.lastChange, state.lastNetwork, startedAt) >= settleMs;
+    // 出现了新的匹配元素，或者没有进行中的请求，并且 DOM 已经安静下来
+    if (quiet && (state.inflight === 0 || count() > before.count)) {
+        finish(false);
+    } else if (now - startedAt >= timeoutMs) {
+        finish(true);
+    } else {
+        setTimeout(check, 50);
+    }
+}
+setTimeout(check, 50);
+"""
+
+
+def scroll_and_wait(driver, step=None, element=None, selector=None, timeout=SCROLL_TIMEOUT, settle=SCROLL_SETTLE):
+    """
+    滚动页面（或可滚动的元素），然后只等到新内容加载完成为止，代替滚动后固定 sleep 几秒。
+
+    页面中安装 MutationObserver 和 fetch/XHR 计数：出现了新的匹配元素、或者没有进行中的请求，
+    并且 DOM 连续 settle 秒没有变化时立即返回；最多等待 timeout 秒。
+    timeout 需要小于驱动的异步脚本超时（Selenium 默认 30 秒）。
+
+    :param step: 滚动距离（像素），None 表示直接滚动到底部
+    :param element: 要滚动的元素（如评论区容器），None 表示整个页面
+    :param selector: 用于计数的 XPath（如列表项），出现新的匹配元素即视为加载完成
+    :return: {"added": 新增匹配元素数, "height": 滚动后的内容高度, "grew": 高度是否增加,
+              "at_bottom": 是否已到底部, "timed_out": 是否等待超时, "elapsed": 等待秒数}
+    """
+    mode = "bottom" if step is None else "by"
+    return driver.execute_async_script(_SCROLL_SCRIPT, mode, step or 0, element, selector,
+                                       int(timeout * 1000), int(settle * 1000))
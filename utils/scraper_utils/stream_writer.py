@@ -0,0 +1,107 @@
+# stream_writer.py
+import os
+import threading
+import time
+import requests
+import urllib3
+
+# 每次读取的块大小范围（字节），根据实测吞吐量在两者之间自动调整
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+# 每次读取的目标耗时（秒）：块太大时限速、进度和取消都不够及时，太小时系统调用和循环开销大
+TARGET_READ_SECONDS = 0.1
+
+_local = threading.local()
+
+
+def _get_buffer():
+    """每个下载线程复用一块预分配的缓冲区，避免每个数据块都分配新的 bytes 对象"""
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        buffer = memoryview(bytearray(MAX_CHUNK_SIZE))
+        _local.buffer = buffer
+    return buffer
+
+
+def _can_readinto(response):
+    """响应体未经压缩编码、且底层是 urllib3 响应时，才能直接读入缓冲区（否则需要 requests 解压）"""
+    raw = getattr(response, "raw", None)
+    encoding = response.headers.get("Content-Encoding", "identity")
+    return raw is not None and hasattr(raw, "readinto") and encoding == "identity"
+
+
+def _next_chunk_size(chunk_size, size, elapsed):
+    """按上一块的吞吐量调整块大小，取 2 的幂以便对齐"""
+    if elapsed <= 0:
+        target = chunk_size * 2
+    else:
+        target = size / elapsed * TARGET_READ_SECONDS
+    new_size = MIN_CHUNK_SIZE
+    while new_size < target and new_size < MAX_CHUNK_SIZE:
+        new_size *= 2
+    return new_size
+
+
+def preallocate(file, size):
+    """按 Content-Length 预先分配文件空间，减少磁盘碎片（不支持 fallocate 的系统上扩展文件长度）"""
+    try:
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(file.fileno(), file.tell(), size)
+        else:
+            position = file.tell()
+            file.truncate(position + size)
+            file.seek(position)
+    except OSError:
+        pass  # 预分配只是优化，失败时照常写入
+
+
+def write_response(response, file, on_chunk=None, preallocate_size=None, limit=None):
+    """
+    把响应体写入已打开的文件：读入线程内复用的缓冲区，通过 memoryview 切片写文件，
+    块大小根据吞吐量在 MIN_CHUNK_SIZE 与 MAX_CHUNK_SIZE 之间自适应。
+    不能直接读取底层流时（压缩编码、HTTP/2 响应）退回 iter_content。
+
+    :param on_chunk: 每块数据写入前的回调 on_chunk(chunk)，chunk 为 memoryview，只在回调期间有效，需要保留时请复制
+    :param preallocate_size: 预分配的字节数（通常为 Content-Length），None 表示不预分配；
+                             预分配后 .part 文件长度不再代表已下载量，只适合不需要断点续传的场景
+    :param limit: 最多写入的字节数（分段下载时只读取响应的一部分），None 表示读到结束
+    :return: 写入的字节数
+    """
+    start = file.tell()
+    if preallocate_size:
+        preallocate(file, preallocate_size)
+
+    total = 0
+    if not _can_readinto(response):
+        for chunk in response.iter_content(chunk_size=MIN_CHUNK_SIZE):
+            if limit is not None:
+                chunk = chunk[:limit - total]
+            if on_chunk:
+                on_chunk(memoryview(chunk))
+            file.write(chunk)
+            total += len(chunk)
+            if limit is not None and total >= limit:
+                break
+    else:
+        buffer = _get_buffer()
+        chunk_size = MIN_CHUNK_SIZE
+        while limit is None or total < limit:
+            started = time.monotonic()
+            read_size = chunk_size if limit is None else min(chunk_size, limit - total)
+            try:
+                size = response.raw.readinto(buffer[:read_size])
+            except urllib3.exceptions.HTTPError as e:
+                # 与 iter_content 保持一致，对外只抛出 requests 的异常
+                raise requests.exceptions.ConnectionError(e) from e
+            if not size:
+                break
+            chunk = buffer[:size]
+            if on_chunk:
+                on_chunk(chunk)
+            file.write(chunk)
+            total += size
+            chunk_size = _next_chunk_size(chunk_size, size, time.monotonic() - started)
+
+    if preallocate_size and total != preallocate_size:
+        file.truncate(start + total)  # 实际长度与预分配不符时去掉多余的空白部分
+    return total
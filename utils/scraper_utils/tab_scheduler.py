@@ -0,0 +1,136 @@
+# tab_scheduler.py
+import time
+from utils.scraper_utils.rate_governor import get_rate_governor
+from utils.login_utils.resource_policy import apply_resource_policy
+
+# 同一个浏览器中同时加载的详情页数量（每个页面一个标签页）
+DETAIL_TABS = 3
+# 页面最多等待多久（秒）就交给处理函数，处理函数自己的 WebDriverWait 会继续等待并处理超时
+TAB_READY_TIMEOUT = 10
+# 检查各标签页是否加载完成的间隔（秒）
+TAB_POLL_INTERVAL = 0.2
+
+# 不阻塞地让当前标签页开始加载新页面（driver.get 会一直等到页面加载完成）
+# 先给旧页面打上标记，页面真正切换之前不会被误判为已加载完成
+_NAVIGATE_SCRIPT = "window.__dscraperLeaving = true; window.location.href = arguments[0];"
+
+# 页面已开始解析，且出现了 ready_xpath 匹配的元素
+_READY_SCRIPT = """
+const xpath = arguments[0];
+if (window.__dscraperLeaving || location.href === 'about:blank' || document.readyState === 'loading') {
+    return false;
+}
+return !xpath || document.evaluate('count(' + xpath + ')', document, null, XPathResult.NUMBER_TYPE, null).numberValue > 0;
+"""
+
+
+class TabScheduler:
+    """
+    多标签页详情页调度器：在同一个（已登录的）浏览器中开多个标签页，同时加载 N 个详情页，
+    哪个页面先加载完成就切换过去交给处理函数，处理完后该标签页立即开始加载下一个链接。
+    处理一个页面（提取信息、等待图片下载）的同时，其余页面在后台加载，不再逐个等待。
+
+    所有标签页共用同一个浏览器的 cookies，比多开浏览器节省内存；页面导航同样经过按域名限速器。
+    """
+
+    def __init__(self, driver, tabs=DETAIL_TABS, ready_xpath=None, timeout=TAB_READY_TIMEOUT, log_signal=None,
+                 resource_policy=None):
+        """
+        :param driver: WebDriver
+        :param tabs: 同时加载的页面数量
+        :param ready_xpath: 页面加载完成的标志元素（如正文、标题），None 表示只等待文档开始解析
+        :param timeout: 每个页面最多等待的时间
+        :param resource_policy: 资源屏蔽方案（与租用浏览器时的站点方案名一致）。
+                                屏蔽规则只对设置时所在的标签页生效，新开的标签页需要重新设置
+        """
+        self.driver = driver
+        self.resource_policy = resource_policy
+        self.tabs = max(1, tabs)
+        self.ready_xpath = ready_xpath
+        self.timeout = timeout
+        self.log_signal = log_signal
+
+    def run(self, items, process, url_for=None, should_stop=None):
+        """
+        依次加载 items 对应的页面，并在页面加载完成后调用 process(item)（此时浏览器已切换到该页面的标签页）。
+        process 抛出的异常会被记录，不影响其他页面。结束后关闭多开的标签页，回到原来的标签页。
+
+        :param items: 详情页列表（链接，或可由 url_for 得到链接的对象）
+        :param process: 处理函数 process(item)
+        :param url_for: 由 item 得到页面 URL 的函数，默认 item 本身就是 URL
+        :param should_stop: 返回 True 时停止调度（如用户终止爬虫）
+        """
+        pending = [item for item in items if item]
+        if not pending:
+            return
+        url_for = url_for or (lambda item: item)
+        driver = self.driver
+        main_handle = driver.current_window_handle
+        handles = [main_handle]
+        loading = {}  # 标签页 -> (item, 开始加载的时间)
+        self._log(f"同时加载 {min(self.tabs, len(pending))} 个详情页，共 {len(pending)} 个")
+
+        try:
+            while len(handles) < min(self.tabs, len(pending)):
+                driver.switch_to.new_window('tab')
+                handles.append(driver.current_window_handle)
+                if self.resource_policy:
+                    apply_resource_policy(driver, self.resource_policy)
+            for handle in handles:
+                self._navigate(handle, pending.pop(0), url_for, loading)
+
+            while loading:
+                if should_stop and should_stop():
+                    break
+                handle = self._wait_ready(loading)
+                item, _ = loading.pop(handle)
+                driver.switch_to.window(handle)
+                try:
+                    process(item)
+                except Exception as e:
+                    self._log(f"处理 {url_for(item)} 时出错: {e}")
+                if pending and not (should_stop and should_stop()):
+                    self._navigate(handle, pending.pop(0), url_for, loading)
+        finally:
+            self._close_tabs(handles, main_handle)
+
+    def _navigate(self, handle, item, url_for, loading):
+        url = url_for(item)
+        self.driver.switch_to.window(handle)
+        get_rate_governor().acquire(url)
+        self.driver.execute_script(_NAVIGATE_SCRIPT, url)
+        loading[handle] = (item, time.monotonic())
+
+    def _wait_ready(self, loading):
+        """返回最先加载完成（或已等待超时）的标签页，先开始加载的优先"""
+        while True:
+            for handle, (_, started) in sorted(loading.items(), key=lambda entry: entry[1][1]):
+                if time.monotonic() - started >= self.timeout:
+                    return handle
+                try:
+                    self.driver.switch_to.window(handle)
+                    if self.driver.execute_script(_READY_SCRIPT, self.ready_xpath):
+                        return handle
+                except Exception:
+                    return handle  # 标签页异常（崩溃、被关闭），交给处理函数记录错误
+            time.sleep(TAB_POLL_INTERVAL)
+
+    def _close_tabs(self, handles, main_handle):
+        for handle in handles:
+            if handle == main_handle:
+                continue
+            try:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            except Exception:
+                pass  # 标签页可能已经关闭
+        try:
+            self.driver.switch_to.window(main_handle)
+        except Exception:
+            pass
+
+    def _log(self, message):
+        if self.log_signal:
+            self.log_signal.emit(message)
+        else:
+            print(message)
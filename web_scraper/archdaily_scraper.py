@@ -7,9 +7,12 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from utils.login_utils.browser_setup import create_driver
-from utils.file_utils.file_path_and_creat_folder import create_output_folder
-from utils.scraper_utils.download_image import download_project_image
+from utils.login_utils.driver_pool import get_driver_pool
+from utils.file_utils.file_path_and_creat_folder import create_output_folder, mark_output_folder_finished
+from utils.scraper_utils.download_image import download_project_image, resume_from_journal
+from utils.scraper_utils.download_engine import get_download_engine
+from utils.scraper_utils.post_process import PostProcessor
+from utils.scraper_utils.tab_scheduler import TabScheduler
 
 
 class ArScraper:
@@ -21,15 +24,18 @@ class ArScraper:
     page_count: int - 爬取的页数
     log_signal: pyqtSignal (可选) - 用于向 GUI 日志窗口输出信息
     thread_instance: ScraperThread (可选) - 用于检查爬虫状态
+    postprocess: bool - 是否生成缩略图、网页版和每个项目的联系表
     """
 
 
-    def __init__(self, key_word, page_count, log_signal=None, thread_instance=None):
+    def __init__(self, key_word, page_count, log_signal=None, thread_instance=None, postprocess=False):
         self.key_word = key_word.replace(' ', '')  # 去除关键词中的空格
         self.page_count = page_count
         self.log_signal = log_signal
         self.thread_instance = thread_instance
-        self.driver = create_driver(log_signal=self.log_signal)
+        # 图片后处理在进程池中进行，不占用下载线程
+        self.post_processor = PostProcessor(log_signal) if postprocess else None
+        self.driver = get_driver_pool().lease("archdaily", self.log_signal)
 
     def scrape(self, custom_base_dir=None):
         """开始爬取指定页数的内容"""
@@ -38,14 +44,20 @@ class ArScraper:
 
         try:
             # 获取用户输入的文件夹路径
-            output_folder = create_output_folder(base_url, custom_base_dir=custom_base_dir)
+            output_folder = create_output_folder(base_url, custom_base_dir=custom_base_dir, resume=True)
+            # 续跑上一次中断时未完成的下载任务（如果有）
+            resumed_batch = resume_from_journal(output_folder, self.log_signal, self.post_processor)
             self.log_message('正在加载ArchDaily页面...')
             all_links = self._get_all_links(base_url)
             # open_folder(output_folder)  # 打开文件夹
             self._process_links(all_links, output_folder)
+            resumed_batch.join()
+            if self.post_processor:
+                self.post_processor.close()
+            mark_output_folder_finished(output_folder)
             self.log_message("所有页面爬取完成")
         finally:
-            self.driver.quit()
+            get_driver_pool().release(self.driver)
 
     def _get_all_links(self, base_url):
         """获取所有页面的链接"""
@@ -80,20 +92,21 @@ class ArScraper:
         return all_links
 
     def _process_links(self, all_links, output_folder):
-        """处理每个链接，获取项目信息和图片"""
-        for link in all_links:
-            self.log_message(f"正在处理链接: {link}")
-            if self.thread_instance and not self.thread_instance.is_running:
-                self.log_message("爬虫任务已终止")
-                break
+        """处理每个链接，获取项目信息和图片（多个标签页同时加载，先加载完成的先处理）"""
+        scheduler = TabScheduler(self.driver, ready_xpath="//article//p", log_signal=self.log_signal,
+                                 resource_policy="archdaily")
+        scheduler.run(all_links, lambda link: self._process_single_link(link, output_folder),
+                      should_stop=self._should_stop)
+        if self._should_stop():
+            self.log_message("爬虫任务已终止")
 
-            self._process_single_link(link, output_folder)
+    def _should_stop(self):
+        return bool(self.thread_instance and not self.thread_instance.is_running)
 
     def _process_single_link(self, link, output_folder):
-        """处理单个项目链接"""
+        """处理单个项目链接（页面已由标签页调度器在当前标签页中打开）"""
+        self.log_message(f"正在处理链接: {link}")
         try:
-            self.driver.get(link)
-
             # 设置等待时间，例如10秒
             next_page_article = WebDriverWait(self.driver, 10).until(EC.presence_of_all_elements_located((By.XPATH, "//article//p")))
             article_text = [element.text for element in next_page_article]
@@ -195,11 +208,17 @@ class ArScraper:
             # 解析 JSON 数据
             data_images_list = json.loads(data_images)
 
-            # 遍历列表并提取 "url_slideshow" 的值并下载
+            # 遍历列表并提取 "url_slideshow" 的值，提交到共享下载引擎并发下载
+            batch = get_download_engine().new_batch(self.log_signal, post_processor=self.post_processor)
             for i, item in enumerate(data_images_list):
                 url_slideshow = item.get("url_slideshow")
                 if url_slideshow:
-                    download_project_image(url_slideshow, folder_path, i + 1, self.log_signal)  # 使用已实现的下载方法
+                    batch.submit(download_project_image, url_slideshow, folder_path, i + 1, self.log_signal)
+
+            # 等待本项目的图片全部下载完成
+            batch.join()
+            if self.post_processor:
+                self.post_processor.contact_sheet(folder_path)
 
         except Exception as e:
             self.log_message(f"下载图片时发生错误: {e}")
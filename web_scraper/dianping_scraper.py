@@ -3,7 +3,9 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
-from utils.login_utils.browser_setup import create_driver
+from utils.login_utils.driver_pool import get_driver_pool
+from utils.login_utils.driver_watchdog import DriverWatchdog
+from utils.login_utils.resource_policy import apply_resource_policy
 from utils.login_utils.cookies_manager import get_or_load_cookies
 from utils.file_utils.file_path_and_creat_folder import create_output_folder
 from selenium.common.exceptions import NoSuchElementException
@@ -27,14 +29,15 @@ class Dpscraper:
         self.log_signal = log_signal
         self.city = city  # 添加城市参数
         self.thread_instance = thread_instance
-        self.driver = create_driver(log_signal=self.log_signal, headless=False)
 
         # 调用方法生成文件名
         self.filename = self.generate_filename()
 
-        # 尝试获取或加载 cookies
+        # 租用浏览器实例：复用已登录的浏览器，新启动时获取或加载 cookies
         login_url = "https://www.dianping.com/chengdu"  # 替换为实际的登录 URL
-        get_or_load_cookies(self.driver, login_url, "dianping", self.log_signal, login_click_xpath="//*[@id='__next']/div/div[1]/div[1]/div/div[3]/div[3]")
+        self.driver = get_driver_pool().lease(
+            "dianping", self.log_signal, headless=False, persistent_profile=True,
+            login=lambda driver: get_or_load_cookies(driver, login_url, "dianping", self.log_signal, login_click_xpath="//*[@id='__next']/div/div[1]/div[1]/div/div[3]/div[3]"))
 
 
     def generate_filename(self):
@@ -65,7 +68,15 @@ class Dpscraper:
 
 
     def scrape(self, custom_base_dir=None):
-        """开始爬取"""
+        """开始爬取，结束（包括出错、中途返回）时归还浏览器"""
+        try:
+            self._scrape(custom_base_dir)
+        finally:
+            # 归还浏览器，同时释放持久化配置目录的锁，下一次运行才能继续使用该配置
+            get_driver_pool().release(self.driver)
+
+
+    def _scrape(self, custom_base_dir=None):
 
         # Step 1: 从 JSON 文件加载城市链接映射
         try:
@@ -119,6 +130,7 @@ class Dpscraper:
             # 切换到新标签页
             new_tab = self.driver.window_handles[-1]  # 获取最新的标签页句柄
             self.driver.switch_to.window(new_tab)
+            apply_resource_policy(self.driver, "dianping")  # 屏蔽规则只对设置时所在的标签页生效
             self.log_message(f"已切换到新标签页: {self.driver.current_url}")
 
         except TimeoutException:
@@ -153,6 +165,9 @@ class Dpscraper:
             random.shuffle(pages)  # 只有多页时打乱页面顺序
 
         for page in pages:
+            if self.thread_instance and not self.thread_instance.is_running:
+                self.log_message("爬虫已停止")
+                break
             url = base_url.format(page)
             self.log_message(f"正在访问: {url}")
             self.driver.get(url)
@@ -210,11 +225,17 @@ class Dpscraper:
 
         random.shuffle(all_links)
 
+        # 浏览器内存过高时在两个店铺之间重启浏览器（重新登录），从下一个店铺继续
+        watchdog = DriverWatchdog(self.driver, self.log_signal)
         for link_item in all_links:
+            if self.thread_instance and not self.thread_instance.is_running:
+                self.log_message("爬虫已停止")
+                break
             # 转换链接
             old_link = convert_to_old_link(link_item["链接"])
 
             if old_link:  # 检查转换后的链接是否有效
+                self.driver = watchdog.checkpoint()
                 self.log_message(f"正在访问店铺: {old_link}")
                 self.driver.get(old_link)  # 传入字符串链接
                 time.sleep(random.uniform(1.5, 2.5))  # 随机延时
@@ -327,7 +348,6 @@ class Dpscraper:
             save_to_excel(results, output_folder, self.filename)
         else:
             self.log_message("没有数据保存到文件中")
-        self.driver.quit()
         # return results, output_folder
 
 
@@ -1,22 +1,29 @@
 import os
 import re
 import warnings
-import time
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from utils.login_utils.browser_setup import create_driver
-from utils.scraper_utils.download_image import download_project_image
-from utils.file_utils.file_path_and_creat_folder import create_output_folder
+from utils.login_utils.driver_pool import get_driver_pool
+from utils.scraper_utils.download_image import download_project_image, resume_from_journal
+from utils.scraper_utils.download_engine import get_download_engine
+from utils.scraper_utils.image_dedup import dedup_folder
+from utils.scraper_utils.post_process import PostProcessor
+from utils.scraper_utils.scroll_waiter import scroll_and_wait
+from utils.scraper_utils.tab_scheduler import TabScheduler
+from utils.file_utils.file_path_and_creat_folder import create_output_folder, mark_output_folder_finished
 
 class Goooodscraper:
 
-    def __init__(self, key_word, page_count, log_signal=None, thread_instance=None):
+    def __init__(self, key_word, page_count, log_signal=None, thread_instance=None, dedup=False, postprocess=False):
         self.key_word = key_word.replace(' ', '')  # 去除关键词中的空格
         self.page_count = page_count
         self.log_signal = log_signal
         self.thread_instance = thread_instance
-        self.driver = create_driver(log_signal=self.log_signal)
+        self.dedup = dedup  # 下载完成后是否剔除近似重复图片
+        # 生成缩略图、网页版和联系表（在进程池中进行，不占用下载线程）
+        self.post_processor = PostProcessor(log_signal) if postprocess else None
+        self.driver = get_driver_pool().lease("gooood", self.log_signal)
 
 
     def log_message(self, message):
@@ -33,7 +40,9 @@ class Goooodscraper:
 
         try:
             # 获取用户输入的文件夹路径
-            output_folder = create_output_folder(base_url, custom_base_dir=custom_base_dir)
+            output_folder = create_output_folder(base_url, custom_base_dir=custom_base_dir, resume=True)
+            # 续跑上一次中断时未完成的下载任务（如果有）
+            resumed_batch = resume_from_journal(output_folder, self.log_signal, self.post_processor)
             for page in range(1, self.page_count + 1):
                 if self.thread_instance and not self.thread_instance.is_running:
                     self.log_message("爬虫任务已终止")
@@ -47,24 +56,32 @@ class Goooodscraper:
                 post_links = [post.get_attribute('href') for post in
                               self.driver.find_elements(By.XPATH, '//div[@class="post-thumbnail"]//a')]
 
-                # 遍历链接并访问
-                for post_url in post_links:
-                    self._scrape_post(post_url, output_folder)
-
+                # 多个标签页同时加载文章，先加载完成的先处理
+                scheduler = TabScheduler(self.driver, ready_xpath='//h1[@class="entry-title"]', log_signal=self.log_signal,
+                                         resource_policy="gooood")
+                scheduler.run(post_links, lambda post_url: self._scrape_post(post_url, output_folder),
+                              url_for=lambda post_url: post_url + "?lang=cn",
+                              should_stop=lambda: self.thread_instance and not self.thread_instance.is_running)
+
+            resumed_batch.join()
+            if self.post_processor:
+                self.post_processor.close()
+            if self.dedup:
+                self.log_message("正在检测近似重复图片...")
+                dedup_folder(output_folder, log_signal=self.log_signal)
+            mark_output_folder_finished(output_folder)
             self.log_message("所有页数已完成爬取")
 
         finally:
-            self.driver.quit()
+            get_driver_pool().release(self.driver)
 
     def _scroll_to_bottom(self):
-        """滚动到页面底部并等待加载更多内容"""
-        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2)
+        """滚动到页面底部，等到加载更多内容的请求结束（最多等待 SCROLL_TIMEOUT 秒）"""
+        scroll_and_wait(self.driver)
 
     def _scrape_post(self, post_url, output_folder):
-        """爬取每个文章的详细内容"""
+        """爬取每个文章的详细内容（页面已由标签页调度器在当前标签页中打开）"""
         self.log_message(f"正在处理{post_url}")
-        self.driver.get(post_url + "?lang=cn")
         project_name = self._get_text(By.XPATH, '//h1[@class="entry-title"]').split('/')[0].strip()
         folder_path = os.path.join(output_folder, project_name)
         os.makedirs(folder_path, exist_ok=True)
@@ -89,9 +106,13 @@ class Goooodscraper:
             f.write(project_info)
 
         image_elements = self.driver.find_elements(By.XPATH, '//a[@class="colorbox_gallery"]/img')
+        batch = get_download_engine().new_batch(self.log_signal, post_processor=self.post_processor)
         for i, image in enumerate(image_elements):
             image_src = re.sub(r'-\d+x\d+', '', image.get_attribute('src'))
-            download_project_image(image_src, folder_path, i, self.log_signal)  # 注意 image_number 参数为 i
+            batch.submit(download_project_image, image_src, folder_path, i, self.log_signal)  # 注意 image_number 参数为 i
+        batch.join()  # 等待本项目的图片全部下载完成
+        if self.post_processor:
+            self.post_processor.contact_sheet(folder_path)
 
         self.log_message(f"{project_name} 信息和图片已保存")
 
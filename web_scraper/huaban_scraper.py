@@ -5,10 +5,15 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from utils.login_utils.browser_setup import create_driver
+from utils.login_utils.driver_pool import get_driver_pool
 from utils.login_utils.cookies_manager import get_or_load_cookies
-from utils.scraper_utils.download_image import download_project_image
-from utils.file_utils.file_path_and_creat_folder import create_output_folder
+from utils.login_utils.network_capture import NetworkCapture
+from utils.scraper_utils.dom_extract import extract_values
+from utils.scraper_utils.scroll_waiter import scroll_and_wait, SCROLL_TIMEOUT
+from utils.scraper_utils.tab_scheduler import TabScheduler
+from utils.scraper_utils.download_image import download_project_image, resume_from_journal
+from utils.scraper_utils.download_engine import get_download_engine, STREAM_MAX_PENDING
+from utils.file_utils.file_path_and_creat_folder import create_output_folder, mark_output_folder_finished
 
 
 class Huabanscraper:
@@ -23,15 +28,20 @@ class Huabanscraper:
             self.log_message("<font color='#FEBC2E'>链接似乎无效哦，请检查主页链接有没有粘贴错～\n链接应该长这个样子：https://huaban.com/user/xxxx")
             raise ValueError("无效链接")
 
-        # 创建浏览器实例
-        self.driver = create_driver(log_signal=self.log_signal, headless=False)
-
-        # 尝试获取或加载 cookies
+        # 租用浏览器实例：复用已登录的浏览器，新启动时获取或加载 cookies
         login_url = "https://huaban.com"  # 替换为实际的登录 URL
-        get_or_load_cookies(self.driver, login_url, "huaban", self.log_signal, login_click_xpath="//*[@id='__next']/main/div[1]/div/div/div[4]")
+        self.driver = get_driver_pool().lease(
+            "huaban", self.log_signal, headless=False, network_capture=True, persistent_profile=True,
+            login=lambda driver: get_or_load_cookies(driver, login_url, "huaban", self.log_signal, login_click_xpath="//*[@id='__next']/main/div[1]/div/div/div[4]"))
+        try:
+            # 画板滚动时浏览器请求的图片列表接口，响应中带有所有图片的原图 key（包括尚未渲染到页面上的）
+            self.pins_capture = NetworkCapture(self.driver, r"/v3/boards/\d+/pins")
 
-        # 加载用户画板页面
-        self.driver.get(self.key_word)
+            # 加载用户画板页面
+            self.driver.get(self.key_word)
+        except BaseException:
+            get_driver_pool().release(self.driver)  # 构造失败时归还浏览器，释放持久化配置目录的锁
+            raise
 
 
     def is_valid_huaban_user_url(self, url):
@@ -56,12 +66,13 @@ class Huabanscraper:
 
         :param custom_base_dir: 自定义的输出文件夹路径
         """
-        base_url = "https://huaban.com"
         self.log_message('请稍等，正在加载网址')
         post_urls = set()  # 用集合去重
         try:
-            # 获取用户输入的文件夹路径
-            output_folder = create_output_folder(base_url, custom_base_dir=custom_base_dir)
+            # 获取用户输入的文件夹路径（以用户主页链接区分不同用户的备份，便于中断后续跑）
+            output_folder = create_output_folder(self.key_word, custom_base_dir=custom_base_dir, resume=True)
+            # 续跑上一次中断时未完成的下载任务（如果有）
+            resumed_batch = resume_from_journal(output_folder, self.log_signal)
 
             # 确保页面完全加载
             WebDriverWait(self.driver, 20).until(
@@ -72,41 +83,37 @@ class Huabanscraper:
             self.log_message("页面初次加载完成，提取初始内容...")
             time.sleep(2)  # 初始加载等待时间
             all_links = {
-                re.sub(r'_fw.*$', '', post.get_attribute("href"))
-                for post in self.driver.find_elements(By.XPATH, "//div[@class='oyIO61fv']/a")
-                if post.get_attribute("href")
+                re.sub(r'_fw.*$', '', href)
+                for href in extract_values(self.driver, "//div[@class='oyIO61fv']/a", "@href")
             }
             self.log_message(f"初始提取的链接数量: {len(all_links)}")
             post_urls.update(all_links)
 
             # 滚动逻辑
-            last_height = self.driver.execute_script("return document.body.scrollHeight")
+            last_height = self.driver.execute_script("return document.scrollingElement.scrollHeight")
             no_change_count = 0  # 页面高度不变且无新链接的计数器
             attempts = 0
             max_attempts = 100
-            wait_time = 1.5
             scroll_step = 500  # 每次滚动的距离
             no_change_limit = 5  # 连续无法滚动且无新链接的最大次数
 
             while attempts < max_attempts:
-                # **逐步滚动**
-                self.driver.execute_script(f"window.scrollBy(0, {scroll_step});")
-                self.log_message(f"第 {attempts + 1} 次滚动，滚动 {scroll_step} 像素...")
-                time.sleep(wait_time)  # 等待加载
+                # **逐步滚动，等到新画板出现或页面请求结束**
+                scroll = scroll_and_wait(self.driver, scroll_step, selector="//div[@class='oyIO61fv']/a")
+                self.log_message(f"第 {attempts + 1} 次滚动，滚动 {scroll_step} 像素，加载用时 {scroll['elapsed']:.1f} 秒")
 
                 # **滚动后提取当前页面的链接**
                 self.log_message("提取滚动后加载的内容...")
                 current_links = {
-                    re.sub(r'_fw.*$', '', post.get_attribute("href"))
-                    for post in self.driver.find_elements(By.XPATH, "//div[@class='oyIO61fv']/a")
-                    if post.get_attribute("href")
+                    re.sub(r'_fw.*$', '', href)
+                    for href in extract_values(self.driver, "//div[@class='oyIO61fv']/a", "@href")
                 }
                 new_links = current_links - post_urls
                 self.log_message(f"新增链接数量: {len(new_links)}")
                 post_urls.update(new_links)
 
                 # **检查页面高度变化**
-                new_height = self.driver.execute_script("return document.body.scrollHeight")
+                new_height = scroll["height"]
                 if new_height == last_height and not new_links:
                     # 仅在页面高度无变化且无新链接时递增计数器
                     no_change_count += 1
@@ -126,25 +133,26 @@ class Huabanscraper:
 
             self.log_message(f"滚动结束，总提取到的画板链接数量: {len(post_urls)}")
 
-            # 遍历提取的链接并访问
-            for post_url in post_urls:
-                try:
-                    if post_url:  # 确保 URL 不为空
-                        self._scrape_post(post_url, output_folder)
-                except Exception as e:
-                    self.log_message(f"处理 URL {post_url} 时出错: {str(e)}")
+            # 多个标签页同时加载画板，先加载完成的先处理（空链接已在调度器中跳过）
+            scheduler = TabScheduler(self.driver, ready_xpath="//h1[@class='nvk0Il6c']", log_signal=self.log_signal,
+                                     resource_policy="huaban")
+            scheduler.run(list(post_urls), lambda post_url: self._scrape_post(post_url, output_folder),
+                          should_stop=lambda: self.thread_instance and not self.thread_instance.is_running)
+
+            resumed_batch.join()
+            mark_output_folder_finished(output_folder)
         finally:
-            self.driver.quit()
+            get_driver_pool().release(self.driver)
 
     def _scrape_post(self, post_url, output_folder):
         try:
+            # 页面已由标签页调度器在当前标签页中打开；只读取本画板的图片列表接口，
+            # 其他标签页在后台加载的画板的接口响应先保留，轮到它们时再读取
             self.log_message(f"正在处理画板: {post_url}")
-            self.driver.get(post_url)
-
-            # 滚动并提取图片链接
-            all_image_links = self._scroll_and_extract_links()
+            board_id = re.search(r'/boards/(\d+)', post_url)
+            self.pins_capture.watch(rf"/v3/boards/{board_id.group(1)}/pins" if board_id else None)
 
-            # 提取画板标题
+            # 提取画板标题（先确定输出目录，滚动过程中即可开始下载）
             try:
                 self.log_message("开始提取画板标题...")
                 board_title_element = WebDriverWait(self.driver, 10).until(
@@ -159,12 +167,18 @@ class Huabanscraper:
                 os.makedirs(board_output_folder, exist_ok=True)
                 self.log_message(f"画板子文件夹创建成功: {board_output_folder}")
 
-                # 下载图片
-                for i, image_url in enumerate(all_image_links):
-                    try:
-                        download_project_image(image_url, board_output_folder, i + 1, self.log_signal)
-                    except Exception as e:
-                        self.log_message(f"图片下载失败: {e}")
+                # 滚动并提取图片链接，新链接立即提交到共享下载引擎，在滚动等待期间并行下载
+                batch = get_download_engine().new_batch(self.log_signal, max_pending=STREAM_MAX_PENDING)
+                image_count = 0
+
+                def submit_new_links(new_links):
+                    nonlocal image_count
+                    for image_url in new_links:
+                        image_count += 1
+                        batch.submit(download_project_image, image_url, board_output_folder, image_count, self.log_signal)
+
+                self._scroll_and_extract_links(on_new_links=submit_new_links)
+                batch.join()  # 等待本画板的图片全部下载完成
             except TimeoutException:
                 self.log_message("未找到标题元素，跳过画板。")
             except Exception as e:
@@ -172,18 +186,20 @@ class Huabanscraper:
         except Exception as e:
             self.log_message(f"处理画板 {post_url} 时出错: {e}")
 
-    def _scroll_and_extract_links(self, max_attempts=200, wait_time=0.5, scroll_step=300, no_change_limit=10):
+    def _scroll_and_extract_links(self, max_attempts=200, timeout=SCROLL_TIMEOUT, scroll_step=300, no_change_limit=10,
+                                  on_new_links=None):
         """
         逐步滚动页面，每次滚动后提取图片链接，直到页面连续无法滚动且没有新链接。
 
         :param max_attempts: 最大滚动次数，防止死循环
-        :param wait_time: 每次滚动后等待的时间，用于加载内容
+        :param timeout: 每次滚动后最多等待加载的时间（新图片出现或页面请求结束时提前返回）
         :param scroll_step: 每次滚动的距离（像素值）
         :param no_change_limit: 连续无法滚动且无新链接的最大次数
+        :param on_new_links: 回调函数，每次发现新链接时以新链接集合调用（用于边滚动边下载）
         :return: 所有提取到的图片链接集合
         """
         all_image_links = set()
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
+        last_height = self.driver.execute_script("return document.scrollingElement.scrollHeight")
         no_change_count = 0  # 连续无法滚动且无新链接的计数器
         attempts = 0
 
@@ -192,12 +208,13 @@ class Huabanscraper:
         current_links = self._extract_image_links()
         all_image_links.update(current_links)
         self.log_message(f"初次提取到的图片链接数量: {len(current_links)}")
+        if on_new_links and current_links:
+            on_new_links(current_links)
 
         while attempts < max_attempts:
-            # **滚动页面一点点**
-            self.driver.execute_script(f"window.scrollBy(0, {scroll_step});")
-            self.log_message(f"第 {attempts + 1} 次滚动，滚动 {scroll_step} 像素...")
-            time.sleep(wait_time)
+            # **滚动页面一点点，等到新图片出现或页面请求结束**
+            scroll = scroll_and_wait(self.driver, scroll_step, selector="//a[@class='__7D5D_BHJ']/img", timeout=timeout)
+            self.log_message(f"第 {attempts + 1} 次滚动，滚动 {scroll_step} 像素，加载用时 {scroll['elapsed']:.1f} 秒")
 
             # **抓取滚动后的图片链接**
             self.log_message("抓取滚动后的图片链接...")
@@ -206,9 +223,11 @@ class Huabanscraper:
             all_image_links.update(current_links)
 
             self.log_message(f"新增图片链接数量: {len(new_links)}")
+            if on_new_links and new_links:
+                on_new_links(new_links)
 
             # **检查页面高度变化**
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
+            new_height = scroll["height"]
             if new_height == last_height and not new_links:
                 # 只有页面高度不变且没有新链接时，才增加计数器
                 no_change_count += 1
@@ -232,16 +251,17 @@ class Huabanscraper:
 
     def _extract_image_links(self):
         """
-        提取当前页面上的所有图片链接。
+        提取当前页面上的所有图片链接：页面中的缩略图去掉尺寸后缀，
+        再加上图片列表接口响应中的原图地址（两者格式相同，集合自动去重）。
 
         :return: 图片链接集合
         """
         try:
-            image_elements = self.driver.find_elements(By.XPATH, "//a[@class='__7D5D_BHJ']/img")
             image_links = {
-                re.sub(r'_fw.*$', '', img.get_attribute("src"))
-                for img in image_elements if img.get_attribute("src")
+                re.sub(r'_fw.*$', '', src)
+                for src in extract_values(self.driver, "//a[@class='__7D5D_BHJ']/img", "@src")
             }
+            image_links.update(self._captured_image_links())
             self.log_message(f"当前提取到的图片链接数量: {len(image_links)}")
             return image_links
         except Exception as e:
@@ -249,6 +269,18 @@ class Huabanscraper:
             return set()
 
 
+    def _captured_image_links(self):
+        """读取自上次调用以来图片列表接口返回的图片原图地址"""
+        links = set()
+        for payload in self.pins_capture.json_payloads():
+            pins = payload.get("pins") if isinstance(payload, dict) else None
+            for pin in pins or []:
+                key = (pin.get("file") or {}).get("key")
+                if key:
+                    links.add(f"https://gd-hbimg.huaban.com/{key}")
+        return links
+
+
     # def close(self):
     #     if self.driver:
     #         self.driver.quit()
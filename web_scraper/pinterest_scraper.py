@@ -2,25 +2,30 @@
 
 import time
 import warnings
-from selenium.webdriver.common.by import By
-from utils.file_utils.file_path_and_creat_folder import create_output_folder
-from utils.login_utils.browser_setup import create_driver
-from utils.scraper_utils.download_image import download_vcg_image
+from utils.file_utils.file_path_and_creat_folder import create_output_folder, mark_output_folder_finished
+from utils.login_utils.driver_pool import get_driver_pool
+from utils.scraper_utils.dom_extract import extract_all
+from utils.scraper_utils.scroll_waiter import scroll_and_wait
+from utils.scraper_utils.download_image import download_vcg_image, resume_from_journal
+from utils.scraper_utils.download_engine import get_download_engine, STREAM_MAX_PENDING
+from utils.scraper_utils.image_dedup import dedup_folder
 from utils.login_utils.cookies_manager import get_or_load_cookies
 
 
 class PinScraper:
-    def __init__(self, key_word, log_signal=None):
+    def __init__(self, key_word, log_signal=None, dedup=False):
         """
         Pinterest 爬虫类，用于爬取指定关键词的图片内容。
 
         参数：
         key_word: str - 搜索关键词
         log_signal: pyqtSignal (可选) - 用于向 GUI 日志窗口输出信息
+        dedup: bool - 下载完成后是否剔除近似重复图片
         """
         self.key_word = key_word
         self.log_signal = log_signal
-        self.driver = create_driver(log_signal=self.log_signal)  # 创建浏览器实例
+        self.dedup = dedup
+        self.driver = get_driver_pool().lease("pinterest", self.log_signal)  # 租用浏览器实例（复用已启动的）
         self.all_image_urls = set()
 
     def log_message(self, message):
@@ -46,53 +51,61 @@ class PinScraper:
         self.log_message('请稍等，正在加载网址...')
 
         # 设置文件夹路径
-        folder_path = create_output_folder(base_url, custom_base_dir=custom_base_dir)
+        folder_path = create_output_folder(base_url, custom_base_dir=custom_base_dir, resume=True)
         self.log_message(f"文件夹创建成功：{folder_path}")
-
-        # 开始滚动和图片链接收集
-        self._collect_image_links()
-
-        # 下载图片
-        self._download_images(folder_path)
-
-    def _collect_image_links(self):
-        """滚动页面并收集所有图片链接"""
+        resumed_batch = resume_from_journal(folder_path, self.log_signal)
+
+        # 开始滚动和图片链接收集，新链接边滚动边下载
+        batch = get_download_engine().new_batch(self.log_signal, max_pending=STREAM_MAX_PENDING)
+        self._collect_image_links(batch, folder_path)
+
+        # 等待剩余图片下载完成
+        batch.join()
+        resumed_batch.join()
+        if self.dedup:
+            self.log_message("正在检测近似重复图片...")
+            dedup_folder(folder_path, log_signal=self.log_signal)
+        mark_output_folder_finished(folder_path)
+
+    def _collect_image_links(self, batch, folder_path):
+        """滚动页面并收集所有图片链接，新发现的链接立即提交到下载批次"""
         scroll_step = 1000  # 每次滚动的像素步长
         max_scroll_time = 100  # 最大滚动时间（秒）
+        no_change_limit = 3  # 懒加载请求可能在页面安静之后才发出，连续多次没有变化才认为到底
+        no_change_count = 0
         start_time = time.time()
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
 
         while True:
-            img_elements = self.driver.find_elements(By.XPATH, '//img[@alt]')
-            for link in img_elements:
-                srcset = link.get_attribute('srcset')
-                src = link.get_attribute('src')
+            # 一次脚本调用取出所有图片的 srcset 和 src
+            for image in extract_all(self.driver, '//img[@alt]', {"srcset": "@srcset", "src": "@src"}):
+                srcset = image['srcset']
+                src = image['src']
                 if srcset:
                     for entry in srcset.split(','):
                         url, descriptor = entry.strip().split(' ')
                         if descriptor == '4x':  # 仅添加高分辨率图片
-                            self.all_image_urls.add(url)
+                            self._add_image_url(url, batch, folder_path)
                 elif src:
-                    self.all_image_urls.add(src)
+                    self._add_image_url(src, batch, folder_path)
 
             self.log_message(f"当前收集到的图片链接数: {len(self.all_image_urls)}")
 
-            # 向下滚动页面并等待加载
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(3)
+            # 向下滚动页面，等到新图片出现或页面请求结束
+            scroll = scroll_and_wait(self.driver, selector='//img[@alt]')
 
-            # 检查是否滚动到底部
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height or time.time() - start_time > max_scroll_time:
+            # 检查是否滚动到底部：连续多次没有变高也没有新图片
+            no_change_count = 0 if scroll["grew"] or scroll["added"] else no_change_count + 1
+            if no_change_count >= no_change_limit or time.time() - start_time > max_scroll_time:
                 break
-            last_height = new_height
 
-    def _download_images(self, folder_path):
-        """下载所有收集到的图片"""
-        for url in self.all_image_urls:
-            download_vcg_image(url, folder_path, log_signal=self.log_signal)
+    def _add_image_url(self, url, batch, folder_path):
+        """记录图片链接，首次出现时提交下载"""
+        if url in self.all_image_urls:
+            return
+        self.all_image_urls.add(url)
+        batch.submit(download_vcg_image, url, folder_path, 1, len(self.all_image_urls), self.log_signal)
 
     def close(self):
-        """关闭浏览器驱动"""
+        """归还浏览器驱动"""
         if self.driver:
-            self.driver.quit()
+            get_driver_pool().release(self.driver)
@@ -1,14 +1,20 @@
 import os
 import time
 import warnings
-from selenium.webdriver.common.by import By
-from utils.file_utils.file_path_and_creat_folder import create_output_folder
-from utils.login_utils.browser_setup import create_driver
-from utils.scraper_utils.download_image import download_vcg_image
+from utils.file_utils.file_path_and_creat_folder import create_output_folder, mark_output_folder_finished
+from utils.login_utils.driver_pool import get_driver_pool
+from utils.scraper_utils.dom_extract import extract_values
+from utils.scraper_utils.scroll_waiter import scroll_and_wait
+from utils.scraper_utils.download_image import download_vcg_image, resume_from_journal
+from utils.scraper_utils.download_engine import get_download_engine, STREAM_MAX_PENDING
+from utils.scraper_utils.image_dedup import dedup_folder
+
+# 搜索结果中的懒加载图片（加载完成后才会加上 ll_loaded，因此只匹配 lazyload_hk）
+VCG_IMAGE_XPATH = '//img[contains(@class, "lazyload_hk")]'
 
 
 class VCGScraper:
-    def __init__(self, key_word, page_count, log_signal=None):
+    def __init__(self, key_word, page_count, log_signal=None, dedup=False):
         """
         视觉中国VCG 爬虫类，爬取指定关键词和页数的内容。
 
@@ -16,11 +22,14 @@ class VCGScraper:
         key_word: str - 搜索关键词
         page_count: int - 爬取的页数
         log_signal: pyqtSignal (可选) - 用于向 GUI 日志窗口输出信息
+        dedup: bool - 下载完成后是否剔除近似重复图片
         """
         self.key_word = key_word
         self.page_count = page_count
         self.log_signal = log_signal
-        self.driver = create_driver(log_signal=self.log_signal)  # 创建浏览器实例
+        self.dedup = dedup
+        self.thread_instance = None  # 由 GUI 线程设置，用于检查是否已被停止
+        self.driver = get_driver_pool().lease("vcg", self.log_signal)  # 租用浏览器实例（复用已启动的）
 
     def log_message(self, message):
         """日志输出函数，如果 log_signal 存在，则发送信号；否则直接打印"""
@@ -40,16 +49,22 @@ class VCGScraper:
 
         try:
             # 获取用户输入的文件夹路径
-            output_folder = create_output_folder(base_url, custom_base_dir=custom_base_dir)
+            output_folder = create_output_folder(base_url, custom_base_dir=custom_base_dir, resume=True)
 
             if not os.path.exists(output_folder):
                 os.makedirs(output_folder)
                 self.log_message("文件夹创建成功")
 
+            # 续跑上一次中断时未完成的下载任务（如果有）
+            resumed_batch = resume_from_journal(output_folder, self.log_signal)
+
             # open_folder(output_folder)
 
             # 遍历每一页
             for page in range(1, self.page_count + 1):
+                if self.thread_instance and not self.thread_instance.is_running:
+                    self.log_message("爬虫已停止")
+                    break
                 self.log_message(f"正在处理第 {page} 页")
                 # 构建当前页的 URL
                 current_page_url = base_url.format(page)
@@ -58,38 +73,41 @@ class VCGScraper:
 
                 # 存储当前页面所有图片链接
                 all_image_urls = set()
+                # 新发现的图片链接立即提交到下载引擎，在滚动等待期间并行下载
+                batch = get_download_engine().new_batch(self.log_signal, max_pending=STREAM_MAX_PENDING)
 
                 # 模拟滚动加载所有内容
-                last_height = self.driver.execute_script("return document.body.scrollHeight")
+                no_change_count = 0  # 连续没有变高也没有新图片的滚动次数
+                no_change_limit = 3  # 懒加载请求可能在页面安静之后才发出，连续多次没有变化才认为到底
                 while True:
-                    # 用find_elements的By查询图片链接，并打印出来调试
-                    image_url_elements = self.driver.find_elements(By.XPATH, '//img[@class="lazyload_hk ll_loaded"]')
-                    for image in image_url_elements:
-                        img_url = image.get_attribute("data-src")
-                        if img_url:
-                            # 修正 URL
-                            if img_url.startswith("//"):
-                                img_url = "https:" + img_url
+                    # 一次脚本调用取出页面上所有懒加载图片的 data-src（不依赖图片是否已加载完成）
+                    for img_url in extract_values(self.driver, VCG_IMAGE_XPATH, "@data-src"):
+                        # 修正 URL
+                        if img_url.startswith("//"):
+                            img_url = "https:" + img_url
+                        if img_url not in all_image_urls:
                             all_image_urls.add(img_url)
-
-                    # 向下滚动到页面底部
-                    new_height = self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    # 等待一段时间以确保新内容加载完成
-                    time.sleep(3)
-                    # 判断是否滚动到底部
-                    if new_height == last_height:
-                        break
-                    last_height = new_height
-
-                # 打印所有图片链接并下载
-                for index, url1 in enumerate(all_image_urls, start=1):
-                    # self.log_message(url1)
-                    try:
-                        # 使用你写的 download_vcg_image 函数下载图片
-                        download_vcg_image(url1, output_folder, page, index, self.log_signal)  # 这里添加 page 参数
-                    except Exception as e:
-                        self.log_signal.emit(f"图片下载失败: {e}")
-
+                            batch.submit(download_vcg_image, img_url, output_folder, page,
+                                         len(all_image_urls), self.log_signal)
+
+                    # 向下滚动到页面底部，等到新图片出现或页面请求结束
+                    scroll = scroll_and_wait(self.driver, selector=VCG_IMAGE_XPATH)
+                    # 页面连续多次没有变高也没有新图片时，说明已经到底
+                    if not scroll["grew"] and not scroll["added"]:
+                        no_change_count += 1
+                        if no_change_count >= no_change_limit:
+                            break
+                    else:
+                        no_change_count = 0
+
+                self.log_message(f"第 {page} 页滚动结束，共发现 {len(all_image_urls)} 张图片，等待剩余下载完成...")
+                batch.join()  # 等待本页图片全部下载完成
+
+            resumed_batch.join()
+            if self.dedup:
+                self.log_message("正在检测近似重复图片...")
+                dedup_folder(output_folder, log_signal=self.log_signal)
+            mark_output_folder_finished(output_folder)
         finally:
-            # 关闭浏览器实例
-            self.driver.quit()
+            # 归还浏览器实例，下一次运行直接复用
+            get_driver_pool().release(self.driver)
@@ -6,11 +6,15 @@ import random
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from utils.login_utils.browser_setup import create_driver
+from selenium.common.exceptions import TimeoutException
+from utils.login_utils.driver_pool import get_driver_pool
+from utils.login_utils.driver_watchdog import DriverWatchdog
 from utils.login_utils.cookies_manager import get_or_load_cookies
-from utils.scraper_utils.download_image import download_project_image
-from utils.file_utils.file_path_and_creat_folder import create_output_folder
+from utils.scraper_utils.dom_extract import extract_all, extract_values
+from utils.scraper_utils.scroll_waiter import scroll_and_wait
+from utils.scraper_utils.download_image import download_project_image, resume_from_journal
+from utils.scraper_utils.download_engine import get_download_engine
+from utils.file_utils.file_path_and_creat_folder import create_output_folder, mark_output_folder_finished
 from utils.scraper_utils.word_cloud import WordCloudGenerator
 from utils.file_utils.load_datas import resource_path
 
@@ -26,13 +30,14 @@ class XhsScraper():
         self.key_word = key_word
         self.log_signal = log_signal
         self.max_links = max_links
-        self.driver = create_driver(log_signal=self.log_signal, headless=False)  # 创建浏览器实例
         self.thread_instance = None  # 初始化 thread_instance 属性
         self.all_comments = []  # 用于存储所有帖子的评论
 
-        # 尝试获取或加载 cookies
+        # 租用浏览器实例：复用已登录的浏览器，新启动时获取或加载 cookies
         login_url = "https://www.xiaohongshu.com"  # 替换为实际的登录 URL
-        get_or_load_cookies(self.driver, login_url, "xhs", self.log_signal, login_click_xpath="//*[@id='login-btn']")
+        self.driver = get_driver_pool().lease(
+            "xhs", self.log_signal, headless=False, persistent_profile=True,
+            login=lambda driver: get_or_load_cookies(driver, login_url, "xhs", self.log_signal, login_click_xpath="//*[@id='login-btn']"))
 
         # input("test")
 
@@ -53,7 +58,9 @@ class XhsScraper():
 
         try:
             # 获取用户输入的文件夹路径
-            output_folder = create_output_folder(base_url, custom_base_dir=custom_base_dir)
+            output_folder = create_output_folder(base_url, custom_base_dir=custom_base_dir, resume=True)
+            # 续跑上一次中断时未完成的下载任务（如果有）
+            resumed_batch = resume_from_journal(output_folder, self.log_signal)
 
             # 打开初始页面
             self.driver.get(base_url)
@@ -75,33 +82,30 @@ class XhsScraper():
 
             # 提取初始页面的链接
             initial_links = {
-                re.sub(r'_fw.*$', '', post.get_attribute("href"))
-                for post in
-                self.driver.find_elements(By.XPATH, "//a[contains(@class, 'cover') and contains(@class, 'mask')]")
-                if post.get_attribute("href")
+                re.sub(r'_fw.*$', '', href)
+                for href in
+                extract_values(self.driver, "//a[contains(@class, 'cover') and contains(@class, 'mask')]", "@href")
             }
             post_urls.update(initial_links)
             self.log_message(f"初始页面链接数量: {len(initial_links)}，总链接数量: {len(post_urls)}")
 
             # 滚动逻辑
-            last_height = self.driver.execute_script("return document.body.scrollHeight")
+            last_height = self.driver.execute_script("return document.scrollingElement.scrollHeight")
             no_change_count = 0
-            wait_time = 1.5
             scroll_step = 300
             no_change_limit = 50
 
             while len(post_urls) < self.max_links:
-                # 滚动页面
-                self.driver.execute_script(f"window.scrollBy(0, {scroll_step});")
-                self.log_message(f"滚动页面，滚动 {scroll_step} 像素...")
-                time.sleep(wait_time)
+                # 滚动页面，等到新笔记出现或页面请求结束
+                scroll = scroll_and_wait(self.driver, scroll_step,
+                                         selector="//a[contains(@class, 'cover') and contains(@class, 'mask')]")
+                self.log_message(f"滚动页面，滚动 {scroll_step} 像素，加载用时 {scroll['elapsed']:.1f} 秒")
 
                 # 提取新链接
                 current_links = {
-                    re.sub(r'_fw.*$', '', post.get_attribute("href"))
-                    for post in
-                    self.driver.find_elements(By.XPATH, "//a[contains(@class, 'cover') and contains(@class, 'mask')]")
-                    if post.get_attribute("href")
+                    re.sub(r'_fw.*$', '', href)
+                    for href in
+                    extract_values(self.driver, "//a[contains(@class, 'cover') and contains(@class, 'mask')]", "@href")
                 }
                 new_links = current_links - post_urls
                 post_urls.update(new_links)
@@ -109,7 +113,7 @@ class XhsScraper():
                 self.log_message(f"新增链接数量: {len(new_links)}，总链接数量: {len(post_urls)}")
 
                 # 检查页面高度变化
-                new_height = self.driver.execute_script("return document.body.scrollHeight")
+                new_height = scroll["height"]
                 if new_height == last_height and not new_links:
                     no_change_count += 1
                     self.log_message(f"页面未变化且无新链接，第 {no_change_count} 次检测到此情况。")
@@ -123,12 +127,23 @@ class XhsScraper():
             self.log_message(f"滚动结束，总提取到的链接数量: {len(post_urls)}")
             post_urls = list(post_urls)[:self.max_links]  # 如果超出限制，裁剪到上限
 
-            # 遍历提取的链接并访问
+            # 遍历提取的链接并访问；浏览器内存过高时在两个帖子之间重启浏览器，从下一个帖子继续
+            watchdog = DriverWatchdog(self.driver, self.log_signal)
             for link_index, post_url in enumerate(post_urls, start=1):
+                if self.thread_instance and not self.thread_instance.is_running:
+                    self.log_message("爬虫已停止")
+                    break
+                if not post_url:  # 确保 URL 不为空
+                    continue
                 try:
-                    if post_url:  # 确保 URL 不为空
-                        self.log_message(f"开始处理链接 {link_index}/{len(post_urls)}: {post_url}")
-                        self._scrape_post(post_url, output_folder, link_index, len(post_urls))
+                    self.driver = watchdog.checkpoint()
+                except Exception as e:
+                    # 旧浏览器已关闭、新浏览器没有启动成功，后面的帖子都无法处理，保存已提取的评论后结束
+                    self.log_message(f"重启浏览器失败，停止处理剩余帖子: {str(e)}")
+                    break
+                try:
+                    self.log_message(f"开始处理链接 {link_index}/{len(post_urls)}: {post_url}")
+                    self._scrape_post(post_url, output_folder, link_index, len(post_urls))
                 except Exception as e:
                     self.log_message(f"处理 URL {post_url} 时出错: {str(e)}")
 
@@ -146,8 +161,10 @@ class XhsScraper():
             except Exception as e:
                 self.log_message(f"生成词云时出错: {str(e)}")
 
+            resumed_batch.join()
+            mark_output_folder_finished(output_folder)
         finally:
-            self.driver.quit()
+            get_driver_pool().release(self.driver)
 
     def _scrape_post(self, post_url, output_folder, link_index, link_total):
         try:
@@ -159,6 +176,7 @@ class XhsScraper():
 
             # 提取帖子标题
             post_title = None
+            batch = None
             try:
                 self.log_message("开始提取帖子标题...")
                 title_element = WebDriverWait(self.driver, 10).until(
@@ -168,13 +186,11 @@ class XhsScraper():
                 post_title = re.sub(r'[\\/:*?"<>|]', '_', raw_title)  # 替换非法字符
                 self.log_message(f"提取到的标题: {post_title}")
 
-                # 下载图片
+                # 提交图片到共享下载引擎，不阻塞评论提取
+                batch = get_download_engine().new_batch(self.log_signal)
                 for i, image_url in enumerate(all_image_links):
-                    try:
-                        download_project_image(image_url, output_folder, i + 1, self.log_signal,
-                                               prefix=f"{post_title}_")
-                    except Exception as e:
-                        self.log_message(f"图片下载失败: {e}")
+                    batch.submit(download_project_image, image_url, output_folder, i + 1, self.log_signal,
+                                 prefix=f"{post_title}_")
             except TimeoutException:
                 self.log_message("未找到标题元素，跳过帖子。")
             except Exception as e:
@@ -191,6 +207,10 @@ class XhsScraper():
                     })
             except Exception as e:
                 self.log_message(f"提取评论时发生错误: {e}")
+
+            # 等待本帖子的图片全部下载完成
+            if batch:
+                batch.join()
         except Exception as e:
             self.log_message(f"处理帖子 {post_url} 时出错: {e}")
 
@@ -213,41 +233,22 @@ class XhsScraper():
             self.scroll_note_scroller(note_scroller)
             self.log_message("正在提取评论")
 
-            # 获取评论
-            comment_elements = note_scroller.find_elements(By.XPATH, ".//div[contains(@class, 'comment-item')]")
-            total_comments = len(comment_elements)
-            self.log_message(f"检测到 {total_comments} 条评论元素。")
-
-            for comment_index, comment_element in enumerate(comment_elements, start=1):
-                try:
-                    # 显示进度信息
-                    self.log_message(
-                        f"提取评论进度: {comment_index}/{total_comments} (链接进度: {link_index}/{link_total})")
-
-                    username = comment_element.find_element(By.XPATH, ".//a[@class='name']").text.strip()
-                    comment_text = comment_element.find_element(By.XPATH, ".//span[@class='note-text']").text.strip()
-                    try:
-                        comment_image = comment_element.find_element(By.XPATH,
-                                                                     ".//div[@class='img-box']/img").get_attribute(
-                            "src")
-                    except NoSuchElementException:
-                        comment_image = None
-                    try:
-                        likes = comment_element.find_element(By.XPATH,
-                                                             ".//div[contains(@class, 'like-wrapper')]//span[@class='count']").text.strip()
-                    except NoSuchElementException:
-                        likes = "0"
-                    date = comment_element.find_element(By.XPATH, ".//div[@class='date']/span").text.strip()
-
-                    comments.append({
-                        "username": username,
-                        "comment_text": comment_text,
-                        "comment_image": comment_image,
-                        "likes": likes,
-                        "date": date
-                    })
-                except Exception as e:
-                    self.log_message(f"提取单条评论失败: {e}")
+            # 获取评论：一次脚本调用取出所有评论的各个字段
+            comment_items = extract_all(self.driver, ".//div[contains(@class, 'comment-item')]", {
+                "username": (".//a[@class='name']", "text"),
+                "comment_text": (".//span[@class='note-text']", "text"),
+                "comment_image": (".//div[@class='img-box']/img", "@src"),
+                "likes": (".//div[contains(@class, 'like-wrapper')]//span[@class='count']", "text"),
+                "date": (".//div[@class='date']/span", "text"),
+            }, context=note_scroller)
+            self.log_message(f"检测到 {len(comment_items)} 条评论元素。(链接进度: {link_index}/{link_total})")
+
+            for comment in comment_items:
+                if comment["username"] is None or comment["comment_text"] is None or comment["date"] is None:
+                    self.log_message("提取单条评论失败: 缺少用户名、内容或日期")
+                    continue
+                comment["likes"] = comment["likes"] if comment["likes"] is not None else "0"
+                comments.append(comment)
 
             self.log_message(f"提取到 {len(comments)} 条评论。")
         except Exception as e:
@@ -264,13 +265,10 @@ class XhsScraper():
             max_attempts = 3
 
             while scroll_attempts < max_attempts:
-                # 随机滚动的距离（50~300像素之间）
+                # 随机滚动的距离（700~1000像素之间），等到新评论出现或评论请求结束
                 scroll_distance = random.randint(700, 1000)
-                self.driver.execute_script(f"arguments[0].scrollTop += {scroll_distance};", container)
-
-                # 随机暂停时间（0.5 ~ 2.0 秒之间）
-                pause_time = random.uniform(0.5, 1)
-                time.sleep(pause_time)
+                scroll = scroll_and_wait(self.driver, scroll_distance, element=container,
+                                         selector="//div[contains(@class, 'comment-item')]")
 
                 # 检查滚动位置是否变化
                 current_scroll_top = self.driver.execute_script("return arguments[0].scrollTop;", container)
@@ -289,9 +287,7 @@ class XhsScraper():
                     time.sleep(long_pause_time)
 
                 # 检查是否滚动到底部
-                max_scroll = self.driver.execute_script("return arguments[0].scrollHeight - arguments[0].clientHeight;",
-                                                        container)
-                if current_scroll_top >= max_scroll:
+                if scroll["at_bottom"] and not scroll["added"]:
                     self.log_message("已滚动到底部，停止滚动。")
                     break
 
@@ -315,10 +311,9 @@ class XhsScraper():
         # no_change_count = 0  # 连续无法滚动且无新链接的计数器
         # attempts = 0
         try:
-            image_elements = self.driver.find_elements(By.XPATH, "//img[contains(@class, 'note-slider-img')]")
             image_links = {
-                re.sub(r'_fw.*$', '', img.get_attribute("src"))
-                for img in image_elements if img.get_attribute("src")
+                re.sub(r'_fw.*$', '', src)
+                for src in extract_values(self.driver, "//img[contains(@class, 'note-slider-img')]", "@src")
             }
             all_image_links.update(image_links)
             self.log_message(f"当前提取到的图片链接数量: {len(image_links)}")
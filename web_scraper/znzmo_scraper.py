@@ -1,10 +1,12 @@
 import re
-import time
 import warnings
-from utils.file_utils.file_path_and_creat_folder import create_output_folder
-from utils.login_utils.browser_setup import create_driver
-from utils.scraper_utils.download_image import download_znzmo_image
+from utils.file_utils.file_path_and_creat_folder import create_output_folder, mark_output_folder_finished
+from utils.login_utils.driver_pool import get_driver_pool
+from utils.scraper_utils.download_image import download_znzmo_image, resume_from_journal
+from utils.scraper_utils.download_engine import get_download_engine
 from utils.login_utils.cookies_manager import get_or_load_cookies
+from utils.scraper_utils.scroll_waiter import scroll_and_wait
+from utils.scraper_utils.tab_scheduler import TabScheduler
 from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -25,15 +27,20 @@ class ZnzmoScraper(QObject):
         self.key_word = key_word
         self.page_count = page_count
         self.log_signal = log_signal
-        self.driver = create_driver(log_signal=self.log_signal, headless=False)  # 创建浏览器实例
         self.thread_instance = None  # 初始化 thread_instance 属性
 
-        # 尝试获取或加载 cookies
+        # 租用浏览器实例：复用已登录的浏览器，新启动时获取或加载 cookies
         login_url = "https://www.znzmo.com"  # 替换为实际的登录 URL
-        get_or_load_cookies(self.driver, login_url, "znzmo", self.log_signal, login_click_xpath="//*[@id='__next']/main/div/div[1]/div[1]/div/div/div[2]/div[5]/span[1]")
+        self.driver = get_driver_pool().lease(
+            "znzmo", self.log_signal, headless=False, persistent_profile=True,
+            login=lambda driver: get_or_load_cookies(driver, login_url, "znzmo", self.log_signal, login_click_xpath="//*[@id='__next']/main/div/div[1]/div[1]/div/div/div[2]/div[5]/span[1]"))
 
-        # 测试访问一个需要登录的页面
-        self.driver.get("https://xiaoguotu.znzmo.com/xgt/1112994507.html?hsQuery=河岸")
+        try:
+            # 测试访问一个需要登录的页面
+            self.driver.get("https://xiaoguotu.znzmo.com/xgt/1112994507.html?hsQuery=河岸")
+        except BaseException:
+            get_driver_pool().release(self.driver)  # 构造失败时归还浏览器，释放持久化配置目录的锁
+            raise
 
 
     def log_message(self, message):
@@ -55,7 +62,9 @@ class ZnzmoScraper(QObject):
 
         try:
             # 获取用户输入的文件夹路径
-            output_folder = create_output_folder(base_url, custom_base_dir=custom_base_dir)
+            output_folder = create_output_folder(base_url, custom_base_dir=custom_base_dir, resume=True)
+            # 续跑上一次中断时未完成的下载任务（如果有）
+            resumed_batch = resume_from_journal(output_folder, self.log_signal)
             for page in range(1, self.page_count + 1):
                 if self.thread_instance and not self.thread_instance.is_running:
                     self.log_message("爬虫任务已终止")
@@ -84,28 +93,28 @@ class ZnzmoScraper(QObject):
                 # 打印所有提取的 URL
                 # self.log_message(f"提取到的 URL 列表: {post_urls}")
 
-                # 遍历链接并访问
-                for post_url in post_urls:
-                    try:
-                        if post_url:  # 确保 URL 不为空
-                            self._scrape_post(post_url, output_folder, page)
-
-                    except Exception as e:
-                        self.log_message(f"处理 URL {post_url} 时出错: {str(e)}")  # 记录错误信息
+                # 多个标签页同时加载详情页，先加载完成的先处理（空链接已在调度器中跳过）
+                scheduler = TabScheduler(
+                    self.driver, ready_xpath="//*[contains(@class, 'pages-xiaoguotuDetail-index__image__bdP2o')]",
+                    log_signal=self.log_signal, resource_policy="znzmo")
+                scheduler.run(post_urls, lambda post_url: self._scrape_post(post_url, output_folder, page),
+                              should_stop=lambda: self.thread_instance and not self.thread_instance.is_running)
 
                 self.log_message("<b>所有 URL 提取完成")
+
+            resumed_batch.join()
+            mark_output_folder_finished(output_folder)
         finally:
-            self.driver.quit()
+            get_driver_pool().release(self.driver)
 
     def _scroll_to_bottom(self):
-        """滚动到页面底部并等待加载更多内容"""
-        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2)
+        """滚动到页面底部，等到加载更多内容的请求结束（最多等待 SCROLL_TIMEOUT 秒）"""
+        scroll_and_wait(self.driver)
 
     def _scrape_post(self, post_url, output_folder, page):
         try:
+            # 页面已由标签页调度器在当前标签页中打开
             self.log_message(f"正在处理 {post_url}")
-            self.driver.get(post_url)
 
             # 使用显示等待来确保效果图链接加载完毕
             try:
@@ -144,13 +153,11 @@ class ZnzmoScraper(QObject):
             image_name_element = self.driver.find_element(By.CSS_SELECTOR, ".pages-xiaoguotuDetail-index__title__MNhvk")
             image_name = re.sub(r'[<>:"/\\|?*]', '_', image_name_element.text.strip())
 
-            # 打印所有图片链接并下载
+            # 提交所有图片链接到共享下载引擎并发下载
+            batch = get_download_engine().new_batch(self.log_signal)
             for i, image_url in enumerate(processed_links):
-                # 下载图片
-                try:
-                    download_znzmo_image(image_url, output_folder, page, i + 1, self.log_signal, title_name)
-                except Exception as e:
-                    self.log_signal.emit(f"图片下载失败: {e}")
+                batch.submit(download_znzmo_image, image_url, output_folder, page, i + 1, self.log_signal, title_name)
+            batch.join()  # 等待本项目的图片全部下载完成
 
             self.log_message(f"{image_name} 图片已保存")
         except StaleElementReferenceException: